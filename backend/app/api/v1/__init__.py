@@ -3,7 +3,7 @@ API V1 Router
 Aggregates all API endpoints
 """
 from fastapi import APIRouter
-from app.api.v1.endpoints import contacts, chat, auth, analytics
+from app.api.v1.endpoints import contacts, chat, auth, analytics, admin
 
 api_router = APIRouter()
 
@@ -12,3 +12,4 @@ api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(contacts.router, prefix="/contacts", tags=["contacts"])
 api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,151 @@
+"""
+Admin Endpoints
+Operational statistics and maintenance jobs for superusers
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db, get_read_db, replica_router
+from app.core.db_metrics import pool_stats
+from app.core.rate_limit import rate_limit_stats
+from app.core.security import get_current_active_superuser, password_hasher, token_cache, user_cache
+from app.models.user import User
+from app.schemas.rescore import RescoreRequest, RescoreStatus
+from app.schemas.user import UserActiveUpdate, UserResponse
+from app.services.ai_service import get_ai_service
+from app.services.analytics_service import AnalyticsService, analytics_cache
+from app.services.chat_service import chat_service
+from app.services.contact_service import idempotency_cache, submission_cache
+from app.services import rescore_service
+from app.services.user_service import UserService
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.get("/stats")
+async def get_stats(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Get internal counters
+
+    Returns:
+    - AI score cache hits, misses and evictions per tier
+    - Analytics response cache hits, stale hits and misses
+    - Password hashing queue depth, rejections, hash latency and queue wait
+    - Authenticated user and verified token cache hits and misses
+    - Read replica health, lag and primary fallbacks
+    - Idempotency-Key and repeated submission lookups
+    - Rate limit decisions per rule, admission pressure and shed requests
+    - Chat replies being streamed
+    """
+    ai_service = get_ai_service()
+
+    return {
+        "ai_score_cache": ai_service.cache.stats() if ai_service.cache else None,
+        "analytics_cache": analytics_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "read_replicas": replica_router.stats() if replica_router else None,
+        "idempotency_cache": idempotency_cache.stats(),
+        "submission_cache": submission_cache.stats(),
+        "rate_limits": rate_limit_stats(),
+        "chat_streams": chat_service.stats()
+    }
+
+
+@router.get("/db/pool")
+async def get_pool_stats(
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Get connection pool and statement metrics per engine
+
+    Returns:
+    - Pool size, checked-out and overflow connections, limits and timeouts
+    - Checkout wait, hold time and connection age distributions
+    - Statement timing by operation and the slow statement count
+    - The last autotune decision (DB_POOL_AUTOTUNE)
+    """
+    return pool_stats()
+
+
+@router.post("/rescore", status_code=202)
+async def start_rescore(
+    request: RescoreRequest,
+    current_user: User = Depends(get_current_active_superuser)
+):
+    """
+    Start or resume a bulk re-scoring run in the background
+
+    - **name**: Run name; reusing it resumes from the last checkpoint
+    - **backend**: batch (Message Batches API), direct or fake
+    - **restart**: Ignore the checkpoint and start from the first contact
+    """
+    try:
+        started = rescore_service.start_rescore(
+            request.name, request.backend, request.chunk_size, restart=request.restart
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not started:
+        raise HTTPException(status_code=409, detail="Rescore run already in progress")
+
+    logger.info(f"Rescore {request.name} started by {current_user.email}")
+
+    return {"name": request.name, "status": "started"}
+
+
+@router.get("/rescore/{name}", response_model=RescoreStatus)
+async def get_rescore_status(
+    name: str,
+    current_user: User = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the progress of a re-scoring run"""
+    checkpoint = await rescore_service.get_checkpoint(db, name)
+
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail="Rescore run not found")
+
+    return checkpoint
+
+
+@router.post("/rollups/rebuild")
+async def rebuild_rollups(
+    current_user: User = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """Recompute the analytics rollup tables from the contacts table"""
+    analytics_service = AnalyticsService(db)
+    await analytics_service.rebuild()
+
+    return {"message": "Rollups rebuilt"}
+
+
+@router.put("/users/{user_id}/active", response_model=UserResponse)
+async def set_user_active(
+    user_id: int,
+    update: UserActiveUpdate,
+    current_user: User = Depends(get_current_active_superuser),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Activate or deactivate a user
+
+    Deactivation applies to the next request, except for tokens issued with
+    JWT_EMBED_USER_CLAIMS, which keep working on read endpoints until they expire.
+    """
+    user_service = UserService(db)
+    user = await user_service.set_active(user_id, update.is_active)
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    logger.info(f"User {user_id} {'activated' if update.is_active else 'deactivated'} by {current_user.email}")
+
+    return user
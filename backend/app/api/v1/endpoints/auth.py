@@ -9,7 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.core.security import create_access_token, get_current_user
+from app.core.security import create_access_token, get_current_user, user_claims
 from app.schemas.user import UserCreate, UserResponse, Token
 from app.services.user_service import UserService
 from app.models.user import User
@@ -83,7 +83,7 @@ async def login(
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)},
+        data=user_claims(user),
         expires_delta=access_token_expires
     )
 
@@ -118,7 +118,7 @@ async def refresh_token(
     """
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(current_user.id)},
+        data=user_claims(current_user),
         expires_delta=access_token_expires
     )
 
@@ -2,28 +2,274 @@
 Chat/AI Endpoint
 Handles AI chat interactions
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.background import BackgroundTask
+from contextlib import aclosing
+from typing import AsyncIterator
+from app.core.config import settings
+from app.core.rate_limit import (
+    RateLimitExceeded,
+    ServiceOverloadedError,
+    admission,
+    chat_global_limit,
+    chat_ip_limit,
+    client_ip,
+    hit_limits,
+    limit_requests,
+)
 from app.schemas.chat import ChatMessage, ChatResponse
+from app.services.chat_service import StreamSlot, chat_service
+import anyio
+import asyncio
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/message", response_model=ChatResponse)
+def _sse(event: str, data: dict) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class EventStreamResponse(StreamingResponse):
+    """
+    Server-Sent Events response
+
+    Bypasses gzip (GZipMiddleware would hold small frames back in its
+    compressor), drops clients that stop reading for CHAT_SEND_TIMEOUT
+    seconds, and always closes the body iterator, so the model stream
+    behind it is closed as soon as the client goes away.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, content: AsyncIterator[str], **kwargs):
+        headers = {
+            "Cache-Control": "no-cache",
+            "Content-Encoding": "identity",
+            "X-Accel-Buffering": "no",
+        }
+        super().__init__(content, headers=headers, **kwargs)
+
+    async def stream_response(self, send) -> None:
+        async def send_with_timeout(message) -> None:
+            with anyio.fail_after(settings.CHAT_SEND_TIMEOUT):
+                await send(message)
+
+        try:
+            await super().stream_response(send_with_timeout)
+        except TimeoutError:
+            logger.warning(f"Dropping event stream, client stopped reading for {settings.CHAT_SEND_TIMEOUT}s")
+        finally:
+            with anyio.CancelScope(shield=True):
+                await self.body_iterator.aclose()
+
+
+@router.post(
+    "/message",
+    response_model=ChatResponse,
+    dependencies=[Depends(limit_requests(chat_ip_limit, chat_global_limit))],
+)
 async def send_message(message: ChatMessage):
     """
-    Send message to AI chatbot
+    Send message to AI chatbot (rate limited per client IP and overall)
+
+    Returns the whole reply at once; use /chat/stream or the /chat/ws
+    WebSocket to show it as it is written.
     """
+    slot = chat_service.reserve()
     try:
-        # Placeholder for AI integration
-        # In production, integrate with OpenAI/Anthropic
-        response_text = f"Gracias por tu mensaje: '{message.content}'. Un agente te contactará pronto."
-
-        return ChatResponse(
-            message=response_text,
-            type="bot"
-        )
+        async with aclosing(chat_service.stream_reply(message, slot)) as reply:
+            chunks = [text async for text in reply]
     except Exception as e:
         logger.error(f"Error processing chat message: {str(e)}")
         raise HTTPException(status_code=500, detail="Error processing message")
+    finally:
+        slot.release()
+
+    return ChatResponse(
+        message="".join(chunks),
+        type="bot"
+    )
+
+
+@router.post(
+    "/stream",
+    response_class=EventStreamResponse,
+    dependencies=[Depends(limit_requests(chat_ip_limit, chat_global_limit))],
+)
+async def stream_message(message: ChatMessage):
+    """
+    Send message to AI chatbot and stream the reply as Server-Sent Events
+
+    Events: `start`, then one `delta` per piece of text (`{"text": ...}`),
+    then `done`, or `error` (`{"detail": ...}`) if the reply failed midway.
+    Closing the connection stops the reply. Answers 503 with Retry-After
+    when the server is already streaming as many replies as it allows.
+    """
+    slot = chat_service.reserve()
+
+    async def events() -> AsyncIterator[str]:
+        # Sent right away so clients and proxies see the stream open
+        yield _sse("start", {})
+        try:
+            async with aclosing(chat_service.stream_reply(message, slot)) as reply:
+                async for text in reply:
+                    yield _sse("delta", {"text": text})
+        except Exception:
+            yield _sse("error", {"detail": "Error processing message"})
+            return
+        yield _sse("done", {})
+
+    # The background task also frees the slot if the client left before the stream started
+    return EventStreamResponse(events(), background=BackgroundTask(slot.release))
+
+
+class _ChatConnection:
+    """
+    One chat WebSocket
+
+    Each message starts a reply task, up to CHAT_MAX_STREAMS_PER_CONNECTION
+    at once. Frames from all replies go through one send lock, and a client
+    that stops reading for CHAT_SEND_TIMEOUT seconds is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.ip = client_ip(websocket)
+        self.replies: dict[int, asyncio.Task] = {}
+        self._next_id = 0
+        self._send_lock = asyncio.Lock()
+
+    async def send(self, frame: dict) -> None:
+        async with self._send_lock:
+            await asyncio.wait_for(self.websocket.send_json(frame), settings.CHAT_SEND_TIMEOUT)
+
+    async def run(self) -> None:
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is None:
+                    await self.send({"event": "error", "id": None, "detail": "Frames must be JSON text"})
+                    continue
+                await self.receive(message["text"])
+        except WebSocketDisconnect:
+            pass
+        except asyncio.TimeoutError:
+            await self.stalled()
+        except Exception as e:
+            logger.error(f"Closing chat socket after error: {str(e)}")
+            await self.close(1011)
+        finally:
+            tasks = list(self.replies.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def receive(self, text: str) -> None:
+        try:
+            frame = json.loads(text)
+        except ValueError:
+            await self.send({"event": "error", "id": None, "detail": "Frames must be JSON"})
+            return
+
+        if isinstance(frame, dict) and "cancel" in frame:
+            reply_id = frame["cancel"]
+            if not isinstance(reply_id, int) or isinstance(reply_id, bool):
+                await self.send({"event": "error", "id": None, "detail": "cancel must be a reply id"})
+                return
+            task = self.replies.get(reply_id)
+            if task is not None:
+                task.cancel()
+            return
+
+        try:
+            message = ChatMessage.model_validate(frame)
+        except ValidationError as e:
+            await self.send({"event": "error", "id": None, "detail": e.errors(include_url=False, include_context=False)})
+            return
+
+        if len(self.replies) >= settings.CHAT_MAX_STREAMS_PER_CONNECTION:
+            await self.send({"event": "error", "id": None, "detail": "A reply is already in progress"})
+            return
+
+        try:
+            await admission.check()
+            await hit_limits(chat_ip_limit, chat_global_limit, self.ip)
+            slot = chat_service.reserve()
+        except (RateLimitExceeded, ServiceOverloadedError) as e:
+            await self.send({"event": "error", "id": None, "detail": str(e), "retry_after": e.retry_after})
+            return
+
+        self._next_id += 1
+        reply_id = self._next_id
+        task = asyncio.create_task(self.reply(reply_id, message, slot))
+        self.replies[reply_id] = task
+        # Also frees the slot if the task is cancelled before it starts
+        task.add_done_callback(lambda _: self._finished(reply_id, slot))
+
+    def _finished(self, reply_id: int, slot: StreamSlot) -> None:
+        self.replies.pop(reply_id, None)
+        slot.release()
+
+    async def reply(self, reply_id: int, message: ChatMessage, slot: StreamSlot) -> None:
+        try:
+            await self.send({"event": "start", "id": reply_id})
+            async with aclosing(chat_service.stream_reply(message, slot)) as reply:
+                async for text in reply:
+                    await self.send({"event": "delta", "id": reply_id, "text": text})
+            frame = {"event": "done", "id": reply_id}
+        except asyncio.CancelledError:
+            return
+        except asyncio.TimeoutError:
+            await self.stalled()
+            return
+        except Exception:
+            frame = {"event": "error", "id": reply_id, "detail": "Error processing message"}
+
+        # Free the reply's place first, so the client may send its next message right away
+        self._finished(reply_id, slot)
+        try:
+            await self.send(frame)
+        except asyncio.TimeoutError:
+            await self.stalled()
+        except Exception:
+            pass
+
+    async def stalled(self) -> None:
+        """Disconnect a client that stopped reading"""
+        logger.warning(f"Closing chat socket, client stopped reading for {settings.CHAT_SEND_TIMEOUT}s")
+        await self.close(1008)
+
+    async def close(self, code: int) -> None:
+        """Close the socket, unless it is already closed"""
+        try:
+            await asyncio.wait_for(self.websocket.close(code), settings.CHAT_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+
+@router.websocket("/ws")
+async def chat_socket(websocket: WebSocket):
+    """
+    Chat over a WebSocket, streaming replies as they are written
+
+    Send a chat message as JSON ({"content": ..., "history": [...]}); the
+    reply comes back as `start`, `delta` (`text`) and `done` frames with the
+    reply's `id`, or an `error` frame. Send {"cancel": id} to stop a reply.
+    Disconnecting stops every reply in progress.
+    """
+    await websocket.accept()
+    try:
+        await admission.check()
+    except ServiceOverloadedError:
+        await websocket.close(1013)  # try again later
+        return
+
+    await _ChatConnection(websocket).run()
@@ -2,41 +2,209 @@
 Contact Form Endpoint
 Handles contact form submissions
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
-from app.core.security import get_current_user
+from datetime import datetime, timezone
+from typing import Optional, Union
+from app.core.database import get_db, get_read_db
+from app.core.pagination import InvalidCursorError
+from app.core.rate_limit import contact_global_limit, contact_ip_limit, limit_email, limit_requests
+from app.core.security import Principal, get_current_principal, get_current_user
 from app.models.user import User
-from app.schemas.contact import ContactCreate, ContactResponse, ContactUpdate
-from app.services.contact_service import ContactService
+from app.schemas.contact import (
+    AI_PRIORITIES,
+    CONTACT_SORT_KEYS,
+    CONTACT_STATUSES,
+    CONTACT_SUMMARY_FIELDS,
+    ContactCreate,
+    ContactFilters,
+    ContactImportResult,
+    ContactResponse,
+    ContactSearchResult,
+    ContactSummary,
+    ContactUpdate,
+    SimilarContact,
+)
+from app.services.contact_service import ContactService, IdempotencyKeyReusedError, SearchUnavailableError
+from app.services.embedding_service import EmbeddingService
+from app.services.export_service import (
+    EXPORT_FORMATS,
+    EXPORT_MEDIA_TYPES,
+    ExportUnavailableError,
+    check_format,
+    export_contacts as stream_export,
+)
+from app.services.import_service import IMPORT_FORMATS, ContactImporter
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/", response_model=ContactResponse, status_code=201)
+def get_contact_filters(
+    status: Optional[str] = Query(None, pattern=f"^({'|'.join(CONTACT_STATUSES)})$"),
+    ai_priority: Optional[str] = Query(None, pattern=f"^({'|'.join(AI_PRIORITIES)})$"),
+    min_score: Optional[int] = Query(None, ge=0, le=100),
+    max_score: Optional[int] = Query(None, ge=0, le=100),
+    company: Optional[str] = Query(None, max_length=100),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+) -> ContactFilters:
+    """Contact list filters from the query string"""
+    return ContactFilters(
+        status=status,
+        ai_priority=ai_priority,
+        min_score=min_score,
+        max_score=max_score,
+        company=company,
+        created_after=created_after,
+        created_before=created_before,
+    )
+
+
+@router.post(
+    "/",
+    response_model=ContactResponse,
+    status_code=201,
+    dependencies=[Depends(limit_requests(contact_ip_limit, contact_global_limit))],
+)
 async def create_contact(
     contact: ContactCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Create a new contact submission
+
+    Send an **Idempotency-Key** header to make retries safe. Repeats of a
+    submission (same key, or without one the same email and message within
+    a few minutes) return the original contact with status 200 and an
+    Idempotent-Replayed header instead of creating another one.
+
+    Submissions are rate limited per client IP, per email and overall
+    (429), and shed under load (503), both with a Retry-After header.
     """
+    await limit_email(contact.email)
+
     try:
         contact_service = ContactService(db)
-        result = await contact_service.create_contact(contact)
-        return result
+        result, created = await contact_service.create_contact(contact, idempotency_key)
+    except IdempotencyKeyReusedError:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different submission")
     except Exception as e:
         logger.error(f"Error creating contact: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+    if not created:
+        response.status_code = 200
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@router.post("/import", response_model=ContactImportResult)
+async def import_contacts(
+    request: Request,
+    format: Optional[str] = Query(None, pattern=f"^({'|'.join(IMPORT_FORMATS)})$"),
+    score: bool = True,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk import contacts from the raw request body (Protected - requires authentication)
+
+    The body is a CSV file with a header row (name, email, phone, company,
+    message) or newline-delimited JSON objects with the same fields. It is
+    streamed and loaded in chunks, so files of any size can be sent, e.g.
+    `curl --data-binary @leads.csv -H "Content-Type: text/csv"`.
+
+    - **format**: csv or ndjson; taken from the Content-Type when omitted
+    - **score**: Queue the imported contacts for AI scoring
+
+    Invalid rows are skipped and reported by line number; the rest are imported.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        if "csv" in content_type:
+            format = "csv"
+        elif "ndjson" in content_type or "jsonl" in content_type:
+            format = "ndjson"
+        else:
+            raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or set format")
+
+    importer = ContactImporter(db, score=score)
+    return await importer.run(request.stream(), format)
+
+
+@router.get("/export")
+async def export_contacts(
+    format: str = Query("csv", pattern=f"^({'|'.join(EXPORT_FORMATS)})$"),
+    filters: ContactFilters = Depends(get_contact_filters),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Download every contact matching the filters (Protected - requires authentication)
+
+    - **format**: csv, ndjson or parquet (needs pyarrow on the server)
+    - Filters are the same as for the contact list
+
+    Rows are streamed from a server-side cursor in id order, so exports of
+    any size start immediately and use constant memory.
+    """
+    try:
+        check_format(format)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"contacts-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{format}"
+    return StreamingResponse(
+        stream_export(format, filters),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/search", response_model=list[ContactSearchResult])
+async def search_contacts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search contacts by name, email, company or message (Protected - requires authentication)
+
+    - **q**: Words to find; each matches the start of a word ("acm" finds
+      Acme), and the whole query also matches similar company names
+      despite typos
+    - **cursor**: Pass the X-Next-Cursor header of the previous page of the
+      same query; the header is absent on the last page
+
+    Results are ordered by relevance and carry a message snippet as HTML:
+    the message is escaped and the matches are wrapped in <mark></mark>.
+    """
+    contact_service = ContactService(db)
+    try:
+        rows, next_cursor = await contact_service.search_contacts(q, limit=limit, cursor=cursor)
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except SearchUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    return [ContactSearchResult.model_validate(row) for row in rows]
+
 
 @router.get("/{contact_id}", response_model=ContactResponse)
 async def get_contact(
     contact_id: int,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get contact by ID (Protected - requires authentication)
@@ -49,16 +217,77 @@ async def get_contact(
 
     return contact
 
-@router.get("/", response_model=list[ContactResponse])
+
+@router.get("/{contact_id}/similar", response_model=list[SimilarContact])
+async def similar_contacts(
+    contact_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    min_similarity: float = Query(0.5, ge=0, le=1),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Contacts most alike in name, company and message (Protected - requires authentication)
+
+    - **min_similarity**: Cosine similarity cut-off, 1.0 being identical text
+    """
+    contact_service = ContactService(db)
+    contact = await contact_service.get_contact(contact_id)
+
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+
+    neighbours = await EmbeddingService(db).similar_contacts(contact, limit, min_similarity)
+    summaries = await contact_service.get_summaries([neighbour_id for neighbour_id, _ in neighbours])
+    return [
+        SimilarContact(**ContactSummary.model_validate(summaries[neighbour_id]).model_dump(), similarity=similarity)
+        for neighbour_id, similarity in neighbours if neighbour_id in summaries
+    ]
+
+
+@router.get("/", response_model=list[Union[ContactResponse, ContactSummary]])
 async def list_contacts(
-    skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = None,
+    sort: str = Query("-created_at", pattern=f"^-?({'|'.join(CONTACT_SORT_KEYS)})$"),
+    filters: ContactFilters = Depends(get_contact_filters),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """List all contacts (Protected - requires authentication)"""
+    """
+    List contacts, newest first by default (Protected - requires authentication)
+
+    - **status**, **ai_priority**, **company**: Exact match (company ignores case)
+    - **min_score** / **max_score**: AI score range, inclusive
+    - **created_after** / **created_before**: Creation time range (after is
+      inclusive, before is exclusive)
+    - **sort**: created_at or ai_score, prefixed with "-" for descending;
+      unscored contacts count as lower than any score
+    - **skip** / **limit**: Offset pagination
+    - **cursor**: Keyset pagination; pass the X-Next-Cursor header of the
+      previous page with the same sort (skip is ignored). The header is
+      absent on the last page.
+    - **view**: "summary" returns ContactSummary items, leaving out the
+      message, insights and suggested response (they are not even loaded)
+    """
+    summary = view == "summary"
     contact_service = ContactService(db)
-    contacts = await contact_service.list_contacts(skip=skip, limit=limit)
+    try:
+        contacts, next_cursor = await contact_service.list_contacts(
+            skip=skip, limit=limit, cursor=cursor, filters=filters, sort=sort,
+            fields=CONTACT_SUMMARY_FIELDS if summary else None
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    if summary:
+        return [ContactSummary.model_validate(contact) for contact in contacts]
     return contacts
 
 
@@ -79,6 +308,22 @@ async def update_contact(
     return contact
 
 
+@router.post("/{contact_id}/rescore", response_model=ContactResponse, status_code=202)
+async def rescore_contact(
+    contact_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Force a fresh AI score, ignoring cached results (Protected - requires authentication)"""
+    contact_service = ContactService(db)
+    contact = await contact_service.rescore_contact(contact_id)
+
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+
+    return contact
+
+
 @router.delete("/{contact_id}")
 async def delete_contact(
     contact_id: int,
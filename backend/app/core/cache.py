@@ -0,0 +1,359 @@
+"""
+Caching Utilities
+In-process LRU caches with TTL, optionally backed by Redis
+"""
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import json
+import logging
+import time
+
+from app.core.redis import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# How long one process may hold the recompute lock for a response cache key
+RECOMPUTE_LOCK_MS = 5000
+
+
+class LRUCache:
+    """Bounded in-process cache with least-recently-used eviction and per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[Optional[float], Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value, refreshing its recency"""
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full"""
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Remove a value if present"""
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every value"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Hit/miss/eviction counters"""
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of a shared Redis tier
+
+    Values must be JSON serializable. Redis errors are logged and treated as
+    misses, so the cache keeps working on the local tier alone.
+
+    With local_first=False the local tier is only used while Redis is
+    unavailable, so a delete takes effect in every process at once. Use it
+    for entries that must not be served stale, at the cost of a Redis round
+    trip per read.
+    """
+
+    def __init__(self, namespace: str, max_entries: int, ttl: int, local_first: bool = True):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_first = local_first
+        self.local = LRUCache(max_entries, ttl)
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a value from the local tier, then from Redis"""
+        client = await get_redis()
+        if self.local_first or client is None:
+            value = self.local.get(key)
+            if value is not None:
+                return value
+        if client is None:
+            return None
+
+        try:
+            raw = await client.get(self._redis_key(key))
+        except Exception as e:
+            mark_redis_unavailable(e)
+            return None
+
+        if raw is None:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        value = json.loads(raw)
+        if self.local_first:
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a value in both tiers"""
+        client = await get_redis()
+        if self.local_first or client is None:
+            self.local.set(key, value)
+        if client is None:
+            return
+
+        try:
+            await client.set(self._redis_key(key), json.dumps(value), ex=self.ttl)
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    async def add(self, key: str, value: Any) -> bool:
+        """
+        Store a value only if the key is absent (SET NX in Redis)
+
+        Without Redis the check only covers this process.
+
+        Returns:
+            True if the value was stored, False if the key already had one
+        """
+        if self.local.get(key) is not None:
+            return False
+
+        client = await get_redis()
+        if client is not None:
+            try:
+                if not await client.set(self._redis_key(key), json.dumps(value), ex=self.ttl, nx=True):
+                    return False
+            except Exception as e:
+                mark_redis_unavailable(e)
+
+        self.local.set(key, value)
+        return True
+
+    async def delete(self, key: str) -> None:
+        """Remove a value from both tiers"""
+        self.local.delete(key)
+
+        client = await get_redis()
+        if client is None:
+            return
+
+        try:
+            await client.delete(self._redis_key(key))
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    def stats(self) -> dict:
+        """Counters for both tiers"""
+        return {
+            "local": self.local.stats(),
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+            },
+        }
+
+
+class ResponseCache:
+    """
+    Versioned response cache with stampede protection
+
+    - Keys embed a version number; invalidate() bumps it, so every entry
+      computed before a write stops matching immediately.
+    - Concurrent misses for the same key share one recompute (per process,
+      plus a short Redis lock across processes).
+    - Entries past their TTL are served stale for up to stale_ttl seconds
+      while a single background task recomputes them.
+
+    Without Redis the version and entries are per process, so other workers
+    only see a write once their entries expire.
+    """
+
+    def __init__(self, namespace: str, ttl: int, stale_ttl: int, max_entries: int = 1000):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local = LRUCache(max_entries, ttl + stale_ttl)
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._local_version = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def _version(self) -> str:
+        # Local and shared versions are prefixed differently so falling back
+        # to the local counter never matches entries from the shared one
+        client = await get_redis()
+        if client is None:
+            return f"l{self._local_version}"
+
+        try:
+            version = await client.get(f"{self.namespace}:version")
+        except Exception as e:
+            mark_redis_unavailable(e)
+            return f"l{self._local_version}"
+        return f"r{int(version or 0)}"
+
+    async def invalidate(self) -> None:
+        """Invalidate every entry computed so far"""
+        self._local_version += 1
+
+        client = await get_redis()
+        if client is None:
+            return
+
+        try:
+            await client.incr(f"{self.namespace}:version")
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    async def get_or_compute(self, parts: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get a cached value or compute it
+
+        Args:
+            parts: Endpoint name and parameters identifying the value
+            compute: Coroutine function producing a JSON serializable value;
+                it may run after the caller has returned, so it must not
+                depend on request-scoped resources such as the request session
+        """
+        version = await self._version()
+        key = f"{version}:" + ":".join(str(part) for part in parts)
+
+        entry = await self._load(key)
+        if entry is not None:
+            if entry["fresh_until"] > time.time():
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._start(key, compute)
+            return entry["value"]
+
+        self.misses += 1
+        return await asyncio.shield(self._start(key, compute))
+
+    def _start(self, key: str, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._recompute(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        return task
+
+    def _finished(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Recomputing {self.namespace} {key} failed: {str(task.exception())}")
+
+    async def _recompute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        client = await get_redis()
+        lock_key = f"{self.namespace}:lock:{key}"
+
+        if client is not None:
+            try:
+                acquired = await client.set(lock_key, 1, nx=True, px=RECOMPUTE_LOCK_MS)
+            except Exception as e:
+                mark_redis_unavailable(e)
+                acquired = True
+
+            if not acquired:
+                # Another process is computing it; wait for its result
+                deadline = time.monotonic() + RECOMPUTE_LOCK_MS / 1000
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    entry = await self._load(key)
+                    if entry is not None and entry["fresh_until"] > time.time():
+                        return entry["value"]
+
+        value = await compute()
+        await self._store(key, {"value": value, "fresh_until": time.time() + self.ttl})
+
+        if client is not None:
+            try:
+                await client.delete(lock_key)
+            except Exception as e:
+                mark_redis_unavailable(e)
+
+        return value
+
+    async def _load(self, key: str) -> Optional[dict]:
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+
+        client = await get_redis()
+        if client is None:
+            return None
+
+        try:
+            raw = await client.get(f"{self.namespace}:{key}")
+        except Exception as e:
+            mark_redis_unavailable(e)
+            return None
+
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        self.local.set(key, entry)
+        return entry
+
+    async def _store(self, key: str, entry: dict) -> None:
+        self.local.set(key, entry)
+
+        client = await get_redis()
+        if client is None:
+            return
+
+        try:
+            await client.set(f"{self.namespace}:{key}", json.dumps(entry), ex=self.ttl + self.stale_ttl)
+        except Exception as e:
+            mark_redis_unavailable(e)
+
+    def stats(self) -> dict:
+        """Hit/miss counters"""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "local": self.local.stats(),
+        }
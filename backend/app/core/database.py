@@ -2,23 +2,38 @@
 Database Configuration
 Async SQLAlchemy setup with connection pooling
 """
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from contextvars import ContextVar
+from http.cookies import CookieError, SimpleCookie
+from typing import Optional
+import asyncio
+import itertools
+import logging
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session, declarative_base
 from app.core.config import settings
+from app.core.db_metrics import instrument_engine, pool_options
+
+logger = logging.getLogger(__name__)
+
+
+def _async_url(url: str) -> str:
+    # Convert postgresql:// to postgresql+asyncpg://
+    return url.replace("postgresql://", "postgresql+asyncpg://")
 
-# Convert postgresql:// to postgresql+asyncpg://
-database_url = settings.DATABASE_URL.replace(
-    "postgresql://", "postgresql+asyncpg://"
-)
+
+database_url = _async_url(settings.DATABASE_URL)
 
 # Create async engine
 engine = create_async_engine(
     database_url,
-    pool_size=settings.DATABASE_POOL_SIZE,
-    max_overflow=settings.DATABASE_MAX_OVERFLOW,
+    **pool_options(database_url),
     echo=False,  # Set to True for SQL logging in development
     future=True
 )
+instrument_engine(engine, "primary")
 
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
@@ -29,20 +44,241 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Sessions for read-only work; on Postgres their transactions are started
+# READ ONLY without an extra round trip
+ReadSessionLocal = async_sessionmaker(
+    engine.execution_options(postgresql_readonly=True),
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
 # Base class for models
 Base = declarative_base()
 
 
+@event.listens_for(Session, "do_orm_execute")
+def _track_writes(orm_execute_state):
+    # Statements other than SELECT (bulk UPDATE, INSERT, raw SQL) leave no
+    # trace in session.dirty, so remember them for get_db
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_writes(session):
+    session.info.pop("has_writes", None)
+
+
+def has_pending_writes(session: AsyncSession) -> bool:
+    """Whether the session has changes that a commit would persist"""
+    return bool(
+        session.new or session.dirty or session.deleted
+        or session.info.get("has_writes")
+    )
+
+
 async def get_db() -> AsyncSession:
     """
     Dependency for getting async database sessions
+
+    A connection is only checked out when the session first runs a query,
+    and the session is only committed at teardown if it still has uncommitted
+    changes; read-only requests release their connection without a COMMIT.
     """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            if has_pending_writes(session):
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+
+
+class ReplicaRouter:
+    """
+    Round-robin routing over read replicas
+
+    A background task checks every replica each DATABASE_READ_HEALTH_INTERVAL
+    seconds; replicas that fail the check, or lag further behind the primary
+    than DATABASE_READ_MAX_LAG seconds, are skipped until they recover.
+    """
+
+    def __init__(self, urls: list[str]):
+        self.urls = urls
+        self.engines = [
+            create_async_engine(
+                _async_url(url),
+                **pool_options(_async_url(url)),
+                pool_pre_ping=True,
+            )
+            for url in urls
+        ]
+        for index, replica in enumerate(self.engines):
+            instrument_engine(replica, f"replica{index}")
+        # Views handed to read sessions, READ ONLY like ReadSessionLocal on the primary
+        self.read_engines = [replica.execution_options(postgresql_readonly=True) for replica in self.engines]
+        self.healthy = [True] * len(urls)
+        self.lag: list[Optional[float]] = [None] * len(urls)
+        self.fallbacks = 0
+        self._next = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Read-only view of the next healthy replica, or None if every replica is down"""
+        for _ in range(len(self.engines)):
+            index = next(self._next) % len(self.engines)
+            if self.healthy[index]:
+                return self.read_engines[index]
+        self.fallbacks += 1
+        return None
+
+    async def check(self) -> None:
+        """Check every replica once"""
+        await asyncio.gather(*(self._check(index) for index in range(len(self.engines))))
+
+    async def _check(self, index: int) -> None:
+        engine = self.engines[index]
+        try:
+            async with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    lag = await asyncio.wait_for(conn.scalar(text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+                    )), timeout=5)
+                else:
+                    lag = await asyncio.wait_for(conn.scalar(text("SELECT 0")), timeout=5)
+            lag = float(lag or 0)
+            healthy = lag <= settings.DATABASE_READ_MAX_LAG
+            self.lag[index] = lag
+        except Exception as e:
+            logger.warning(f"Read replica {index} health check failed: {str(e)}")
+            healthy = False
+            self.lag[index] = None
+
+        if healthy != self.healthy[index]:
+            state = "back in rotation" if healthy else f"removed from rotation (lag {self.lag[index]})"
+            logger.warning(f"Read replica {index} {state}")
+        self.healthy[index] = healthy
+
+    async def start(self) -> None:
+        """Run the first check and start periodic health checks"""
+        await self.check()
+        self._task = asyncio.create_task(self._run(), name="replica-health")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.DATABASE_READ_HEALTH_INTERVAL)
+            await self.check()
+
+    async def stop(self) -> None:
+        """Stop health checks and close replica connections"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+    def stats(self) -> dict:
+        """Health and lag per replica"""
+        return {
+            "replicas": [
+                {"healthy": healthy, "lag_seconds": lag}
+                for healthy, lag in zip(self.healthy, self.lag)
+            ],
+            "primary_fallbacks": self.fallbacks,
+        }
+
+
+# DATABASE_READ_URL holds one or more comma-separated replica URLs
+replica_router = ReplicaRouter([
+    url.strip() for url in settings.DATABASE_READ_URL.split(",") if url.strip()
+]) if settings.DATABASE_READ_URL else None
+
+# Set for requests inside a client's read-your-writes window
+_reads_from_primary: ContextVar[bool] = ContextVar("reads_from_primary", default=False)
+
+
+def read_session() -> AsyncSession:
+    """
+    Session for read-only work
+
+    Bound to a healthy replica when DATABASE_READ_URL is set, otherwise (or
+    inside a read-your-writes window) to the primary.
+    """
+    if replica_router is not None and not _reads_from_primary.get():
+        replica = replica_router.choose()
+        if replica is not None:
+            return ReadSessionLocal(bind=replica)
+    return ReadSessionLocal()
+
+
+async def get_read_db() -> AsyncSession:
+    """
+    Dependency for read-only database sessions
+
+    Never commits; on Postgres any write fails inside the READ ONLY transaction.
+    Reads may come from a replica, so they can trail recent writes unless
+    READ_YOUR_WRITES_WINDOW is enabled.
+    """
+    async with read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+class ReadYourWritesMiddleware:
+    """
+    Pins a client's reads to the primary for a while after it writes
+
+    A successful non-GET request sets a cookie holding the end of the
+    window; requests carrying an unexpired cookie read from the primary.
+    """
+
+    COOKIE = "db_primary_until"
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.window <= 0 or replica_router is None:
+            await self.app(scope, receive, send)
+            return
+
+        is_write = scope["method"] not in ("GET", "HEAD", "OPTIONS")
+
+        async def send_with_cookie(message):
+            if is_write and message["type"] == "http.response.start" and message["status"] < 400:
+                until = time.time() + self.window
+                cookie = f"{self.COOKIE}={until:.3f}; Max-Age={int(self.window) + 1}; Path=/; HttpOnly; SameSite=Lax"
+                message.setdefault("headers", []).append((b"set-cookie", cookie.encode("latin-1")))
+            await send(message)
+
+        token = _reads_from_primary.set(self._in_window(scope))
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            _reads_from_primary.reset(token)
+
+    def _in_window(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name != b"cookie":
+                continue
+            try:
+                morsel = SimpleCookie(value.decode("latin-1")).get(self.COOKIE)
+                if morsel is not None and float(morsel.value) > time.time():
+                    return True
+            except (CookieError, ValueError):
+                pass
+        return False
@@ -0,0 +1,382 @@
+"""
+Database Metrics
+Connection pool and statement instrumentation, with optional pool autotuning
+"""
+from typing import Optional
+import asyncio
+import logging
+import time
+
+from sqlalchemy import event, exc, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram, quantile_from_buckets
+
+logger = logging.getLogger(__name__)
+
+# Connection ages span seconds to hours
+AGE_BUCKETS = (1, 10, 30, 60, 300, 900, 1800, 3600, 7200, 14400, 43200)
+
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to obtain a pooled connection", ("engine",)
+)
+pool_hold_time = Histogram(
+    "db_pool_hold_seconds", "Time a connection stays checked out", ("engine",)
+)
+pool_connection_age = Histogram(
+    "db_pool_connection_age_seconds", "Age of connections when checked out", ("engine",), buckets=AGE_BUCKETS
+)
+pool_timeouts = Counter("db_pool_timeouts_total", "Checkouts that timed out", ("engine",))
+pool_connects = Counter("db_pool_connects_total", "New connections opened", ("engine",))
+pool_invalidations = Counter("db_pool_invalidations_total", "Connections invalidated (disconnects)", ("engine",))
+pool_checked_out = Gauge("db_pool_checked_out", "Connections currently checked out", ("engine",))
+pool_overflow = Gauge("db_pool_overflow", "Overflow connections in use", ("engine",))
+pool_size = Gauge("db_pool_size", "Connections kept open in the pool", ("engine",))
+pool_max_overflow = Gauge("db_pool_max_overflow", "Current overflow limit", ("engine",))
+statement_duration = Histogram(
+    "db_statement_duration_seconds", "Statement execution time", ("engine", "operation")
+)
+slow_statements = Counter("db_slow_statements_total", "Statements slower than DB_SLOW_QUERY_MS", ("engine",))
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times checkouts and can be resized at runtime
+
+    Only the overflow limit is adjustable: pool_size fixes how many idle
+    connections are kept, while pool_size + max_overflow caps the total.
+    """
+
+    engine_name = "unknown"
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            pool_timeouts.labels(self.engine_name).inc()
+            raise
+        finally:
+            pool_checkout_wait.labels(self.engine_name).observe(time.perf_counter() - started)
+
+    @property
+    def max_overflow(self) -> int:
+        return self._max_overflow
+
+    def set_max_overflow(self, value: int) -> None:
+        """Change the overflow limit; connections above a lowered limit drain on checkin"""
+        self._max_overflow = max(0, value)
+
+    @property
+    def pre_ping(self) -> bool:
+        return bool(self._pre_ping)
+
+    def set_pre_ping(self, value: bool) -> None:
+        self._pre_ping = value
+
+    @property
+    def recycle(self) -> int:
+        return self._recycle
+
+    def set_recycle(self, seconds: int) -> None:
+        self._recycle = seconds
+
+
+def pool_class_for(url: str):
+    """
+    Pool class for an engine URL
+
+    InstrumentedQueuePool wherever the dialect would use a queue pool
+    anyway; other dialects (e.g. SQLite's NullPool) keep their default.
+    """
+    url = make_url(url)
+    default = url.get_dialect().get_pool_class(url)
+    return InstrumentedQueuePool if issubclass(default, QueuePool) else default
+
+
+def pool_options(url: str) -> dict:
+    """
+    Pool arguments for create_async_engine
+
+    Pool sizing only applies to queue pools; SQLite (used in tests) keeps
+    its default pool, which takes no size.
+    """
+    poolclass = pool_class_for(url)
+    if not issubclass(poolclass, QueuePool):
+        return {"poolclass": poolclass}
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    }
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    verb = words[0].lower() if words else ""
+    return verb if verb in ("select", "insert", "update", "delete") else "other"
+
+
+class PoolStats:
+    """Per-engine state the autotuner works from"""
+
+    def __init__(self, name: str, pool: InstrumentedQueuePool):
+        self.name = name
+        self.pool = pool
+        self.peak_checked_out = 0
+        self.disconnect_ages: list[float] = []
+
+
+# Instrumented engines by name
+_engines: dict[str, PoolStats] = {}
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """
+    Attach pool and statement instrumentation to an engine
+
+    Engines created with InstrumentedQueuePool also report checkout waits
+    and timeouts, and can be autotuned.
+    """
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    stats = PoolStats(name, pool)
+
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.engine_name = name
+        _engines[name] = stats
+        pool_checked_out.labels(name).set_function(pool.checkedout)
+        pool_overflow.labels(name).set_function(lambda: max(0, pool.overflow()))
+        pool_size.labels(name).set_function(pool.size)
+        pool_max_overflow.labels(name).set_function(lambda: pool.max_overflow)
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        connection_record.info["created_at"] = time.monotonic()
+        pool_connects.labels(name).inc()
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        now = time.monotonic()
+        connection_record.info["checked_out_at"] = now
+        created_at = connection_record.info.get("created_at")
+        if created_at is not None:
+            pool_connection_age.labels(name).observe(now - created_at)
+        if isinstance(pool, InstrumentedQueuePool):
+            stats.peak_checked_out = max(stats.peak_checked_out, pool.checkedout())
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            pool_hold_time.labels(name).observe(time.monotonic() - checked_out_at)
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        pool_invalidations.labels(name).inc()
+        created_at = connection_record.info.get("created_at")
+        if exception is not None and created_at is not None:
+            stats.disconnect_ages.append(time.monotonic() - created_at)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+        statement_duration.labels(name, _operation(statement)).observe(elapsed)
+
+        if settings.DB_SLOW_QUERY_MS and elapsed * 1000 >= settings.DB_SLOW_QUERY_MS:
+            slow_statements.labels(name).inc()
+            # Parameters are left out; they carry contact data
+            logger.warning(f"Slow query on {name} ({elapsed * 1000:.0f} ms): {' '.join(statement.split())[:500]}")
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context):
+        started = context.connection.info.get("statement_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class PoolAutotuner:
+    """
+    Adjusts an instrumented pool from the waits observed in each interval
+
+    - Checkout p95 above DB_POOL_TARGET_WAIT_MS, or any timeout, raises the
+      overflow limit (up to DB_POOL_MAX_CONNECTIONS in total).
+    - A quiet interval lowers it one step back toward DATABASE_MAX_OVERFLOW.
+    - Disconnects turn on pre-ping and set pool_recycle below the age at
+      which connections were being dropped.
+
+    In "advise" mode the decisions are only logged.
+    """
+
+    def __init__(self, stats: PoolStats, apply: bool):
+        self.stats = stats
+        self.apply = apply
+        self.base_overflow = stats.pool.max_overflow
+        self.last_decision: Optional[dict] = None
+        self._last_counts: Optional[list[int]] = None
+        self._last_timeouts = 0.0
+
+    def tick(self) -> dict:
+        """Evaluate the last interval and tune the pool"""
+        pool = self.stats.pool
+        name = self.stats.name
+
+        histogram = pool_checkout_wait.labels(name)
+        counts = list(histogram.counts)
+        window = [c - p for c, p in zip(counts, self._last_counts or [0] * len(counts))]
+        self._last_counts = counts
+        wait_p95 = quantile_from_buckets(histogram.upper_bounds, window, 0.95)
+
+        timeouts = pool_timeouts.labels(name).value
+        new_timeouts = timeouts - self._last_timeouts
+        self._last_timeouts = timeouts
+
+        peak = self.stats.peak_checked_out
+        self.stats.peak_checked_out = pool.checkedout()
+        disconnect_ages, self.stats.disconnect_ages = self.stats.disconnect_ages, []
+
+        size = pool.size()
+        max_overflow = pool.max_overflow
+        ceiling = max(0, settings.DB_POOL_MAX_CONNECTIONS - size)
+        target_overflow = max_overflow
+
+        saturated = new_timeouts > 0 or (
+            wait_p95 is not None and wait_p95 * 1000 > settings.DB_POOL_TARGET_WAIT_MS
+        )
+        if saturated:
+            target_overflow = min(ceiling, max_overflow + max(1, size // 2))
+        elif max_overflow > self.base_overflow and peak < size + max_overflow - 1:
+            target_overflow = max_overflow - 1
+
+        pre_ping = pool.pre_ping or bool(disconnect_ages)
+        recycle = pool.recycle
+        if disconnect_ages:
+            suggested = max(60, int(min(disconnect_ages) * 0.8))
+            if recycle < 0 or suggested < recycle:
+                recycle = suggested
+
+        decision = {
+            "window_checkouts": sum(window),
+            "wait_p95_ms": round(wait_p95 * 1000, 2) if wait_p95 is not None else None,
+            "timeouts": int(new_timeouts),
+            "peak_checked_out": peak,
+            "disconnects": len(disconnect_ages),
+            "max_overflow": target_overflow,
+            "pre_ping": pre_ping,
+            "recycle": recycle,
+            # Idle connections worth keeping; pool_size itself needs a restart
+            "pool_size_hint": max(1, peak),
+            "applied": self.apply,
+        }
+        changed = (target_overflow, pre_ping, recycle) != (max_overflow, pool.pre_ping, pool.recycle)
+
+        if changed:
+            verb = "Tuning" if self.apply else "Suggest tuning"
+            logger.info(
+                f"{verb} {name} pool: max_overflow {max_overflow}->{target_overflow}, "
+                f"pre_ping {pool.pre_ping}->{pre_ping}, recycle {pool.recycle}->{recycle} "
+                f"(wait p95 {decision['wait_p95_ms']} ms, {decision['timeouts']} timeouts, peak {peak})"
+            )
+            if self.apply:
+                pool.set_max_overflow(target_overflow)
+                pool.set_pre_ping(pre_ping)
+                pool.set_recycle(recycle)
+
+        self.last_decision = decision
+        return decision
+
+
+_autotuners: dict[str, PoolAutotuner] = {}
+_autotune_task: Optional[asyncio.Task] = None
+
+
+async def _autotune_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.DB_POOL_AUTOTUNE_INTERVAL)
+        for tuner in _autotuners.values():
+            try:
+                tuner.tick()
+            except Exception as e:
+                logger.error(f"Pool autotune for {tuner.stats.name} failed: {str(e)}")
+
+
+def start_pool_autotune() -> None:
+    """Start autotuning every instrumented pool, if DB_POOL_AUTOTUNE is enabled"""
+    global _autotune_task
+
+    mode = settings.DB_POOL_AUTOTUNE
+    if mode == "off" or _autotune_task is not None:
+        return
+
+    for name, stats in _engines.items():
+        _autotuners[name] = PoolAutotuner(stats, apply=mode == "apply")
+    _autotune_task = asyncio.create_task(_autotune_loop(), name="pool-autotune")
+    logger.info(f"Pool autotune started in {mode} mode")
+
+
+async def stop_pool_autotune() -> None:
+    """Stop the autotune loop"""
+    global _autotune_task
+
+    if _autotune_task is not None:
+        _autotune_task.cancel()
+        try:
+            await _autotune_task
+        except asyncio.CancelledError:
+            pass
+        _autotune_task = None
+    _autotuners.clear()
+
+
+def pool_utilization(name: str = "primary") -> Optional[float]:
+    """
+    Share of an engine's connection limit (size plus overflow) checked out
+
+    Returns:
+        0.0 to 1.0 (1.0 means further checkouts wait), or None if the engine
+        has no instrumented queue pool
+    """
+    stats = _engines.get(name)
+    if stats is None:
+        return None
+    capacity = stats.pool.size() + stats.pool.max_overflow
+    return stats.pool.checkedout() / capacity if capacity > 0 else None
+
+
+def pool_stats() -> dict:
+    """Pool state, checkout/statement timings and autotune decisions per engine"""
+    engines = {}
+    for name, stats in _engines.items():
+        pool = stats.pool
+        tuner = _autotuners.get(name)
+        engines[name] = {
+            "pool": {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool.max_overflow,
+                "pre_ping": pool.pre_ping,
+                "recycle": pool.recycle,
+                "timeouts": int(pool_timeouts.labels(name).value),
+                "connects": int(pool_connects.labels(name).value),
+                "invalidations": int(pool_invalidations.labels(name).value),
+            },
+            "checkout_wait_seconds": pool_checkout_wait.labels(name).snapshot(),
+            "hold_seconds": pool_hold_time.labels(name).snapshot(),
+            "connection_age_seconds": pool_connection_age.labels(name).snapshot(),
+            "statements": {
+                labels[1]: child.snapshot()
+                for labels, child in statement_duration.children().items()
+                if labels[0] == name
+            },
+            "slow_statements": int(slow_statements.labels(name).value),
+            "autotune": tuner.last_decision if tuner else None,
+        }
+    return {"autotune": settings.DB_POOL_AUTOTUNE, "engines": engines}
@@ -1,31 +1,236 @@
 """
 Logging Configuration
-Structured logging for better observability
+Structured logging for better observability, written from a background thread
 """
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Optional
+import atexit
+import copy
+import json
 import logging
+import queue
+import random
 import sys
-from pathlib import Path
+import time
+import uuid
+
+from app.core.config import settings
+
+# Request context, attached to every record logged while serving a request
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+request_started_var: ContextVar[Optional[float]] = ContextVar("request_started", default=None)
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+access_logger = logging.getLogger("app.access")
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including request context and extra= fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of INFO and DEBUG records
+
+    Only loggers listed in LOG_SAMPLED_LOGGERS (and their children) are
+    sampled, or every logger when the list is empty. Warnings and errors are
+    always kept.
+    """
+
+    def __init__(self, rate: float, loggers: list[str]):
+        super().__init__()
+        self.rate = rate
+        self.loggers = loggers
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1 or record.levelno > logging.INFO:
+            return True
+        if self.loggers and not any(
+            record.name == name or record.name.startswith(name + ".") for name in self.loggers
+        ):
+            return True
+        return random.random() < self.rate
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without blocking the event loop
+
+    The request context is captured here, in the logging thread, since the
+    listener thread cannot see it. When the queue is full records are
+    dropped (and counted) rather than stalling the caller.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+            started = request_started_var.get()
+            if started is not None and not hasattr(record, "latency_ms"):
+                record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[ContextQueueHandler] = None
 
 
 def setup_logging():
-    """Configure application logging"""
+    """
+    Configure application logging
+
+    Records go through a bounded queue to a listener thread that writes to
+    stdout and a size-rotated file. Safe to call more than once; only the
+    first call installs handlers.
+    """
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter = JSONFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    # Console handler
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        # Create logs directory if it doesn't exist
+        log_file = Path(settings.LOG_FILE)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        # File handler, rotated by size
+        handlers.append(RotatingFileHandler(
+            log_file,
+            maxBytes=settings.LOG_MAX_BYTES,
+            backupCount=settings.LOG_BACKUP_COUNT,
+            encoding="utf-8",
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
 
-    # Create logs directory if it doesn't exist
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _queue_handler = ContextQueueHandler(log_queue)
+    _queue_handler.addFilter(SamplingFilter(
+        settings.LOG_INFO_SAMPLE_RATE,
+        [name.strip() for name in settings.LOG_SAMPLED_LOGGERS.split(",") if name.strip()],
+    ))
 
     # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            # Console handler
-            logging.StreamHandler(sys.stdout),
-            # File handler
-            logging.FileHandler(log_dir / "app.log"),
-        ],
-    )
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(_queue_handler)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
     # Set specific loggers
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener, _queue_handler
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    logging.getLogger().removeHandler(_queue_handler)
+    _listener = None
+    _queue_handler = None
+
+
+def dropped_records() -> int:
+    """Records dropped because the queue was full"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+class RequestContextMiddleware:
+    """
+    Assigns each request an id and writes an access log line with its latency
+
+    The id comes from the X-Request-ID header when present, is echoed back in
+    the response and is attached to every record logged during the request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message.setdefault("headers", []).append((b"x-request-id", request_id.encode("latin-1")))
+            await send(message)
+
+        id_token = request_id_var.set(request_id)
+        started_token = request_started_var.set(started)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            access_logger.info(
+                f"{scope['method']} {scope['path']} {status} {latency_ms}ms",
+                extra={"method": scope["method"], "path": scope["path"], "status": status, "latency_ms": latency_ms},
+            )
+            request_started_var.reset(started_token)
+            request_id_var.reset(id_token)
@@ -0,0 +1,439 @@
+"""
+Metrics
+Lightweight in-process counters, gauges and histograms with Prometheus text export
+"""
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Optional
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Every metric created in this process, in creation order
+REGISTRY: list["Metric"] = []
+
+
+class Metric:
+    """
+    Base class for labelled metrics
+
+    Metrics with label names are used through labels(*values); metrics
+    without labels can be used directly.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Child metric for one combination of label values"""
+        key = tuple(str(value) for value in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} requires labels {self.labelnames}")
+        return self.labels()
+
+    def children(self) -> dict[tuple[str, ...], object]:
+        """Children by label values"""
+        return dict(self._children)
+
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class _GaugeValue:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from a callable whenever it is collected"""
+        self.function = function
+
+    def get(self) -> float:
+        return float(self.function()) if self.function is not None else self.value
+
+
+class Gauge(Metric):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+
+    def __init__(self, upper_bounds: tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile by linear interpolation within its bucket"""
+        return quantile_from_buckets(self.upper_bounds, self.counts, q)
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+def quantile_from_buckets(upper_bounds: tuple[float, ...], counts: list[int], q: float) -> Optional[float]:
+    """
+    Estimate a quantile from per-bucket (non-cumulative) counts
+
+    Values in the +Inf bucket are reported as the largest finite bound.
+    """
+    total = sum(counts)
+    if total == 0:
+        return None
+
+    rank = q * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if seen + count >= rank and count:
+            if index == len(upper_bounds):
+                return upper_bounds[-1]
+            lower = upper_bounds[index - 1] if index else 0.0
+            upper = upper_bounds[index]
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+    return upper_bounds[-1]
+
+
+class Histogram(Metric):
+    """Distribution of observed values in fixed buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(bound for bound in buckets if not math.isinf(bound)))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+
+# Exposition
+
+def collect() -> list[dict]:
+    """JSON-serializable snapshot of every metric in this process"""
+    families = []
+    for metric in REGISTRY:
+        samples = []
+        for labels, child in metric.children().items():
+            if isinstance(child, _HistogramValue):
+                samples.append({"labels": list(labels), "counts": list(child.counts), "sum": child.sum})
+            elif isinstance(child, _GaugeValue):
+                try:
+                    samples.append({"labels": list(labels), "value": child.get()})
+                except Exception as e:
+                    logger.warning(f"Collecting {metric.name} failed: {str(e)}")
+            else:
+                samples.append({"labels": list(labels), "value": child.value})
+        family = {
+            "name": metric.name,
+            "help": metric.documentation,
+            "type": metric.kind,
+            "labelnames": list(metric.labelnames),
+            "samples": samples,
+        }
+        if isinstance(metric, Histogram):
+            family["buckets"] = list(metric.buckets)
+        families.append(family)
+    return families
+
+
+def merge(snapshots: list[list[dict]]) -> list[dict]:
+    """
+    Add up snapshots from several processes
+
+    Counters, histograms and gauges are all summed per label set, which
+    suits the gauges used here (in-flight requests, checked-out connections).
+    """
+    merged: dict[str, dict] = {}
+    for families in snapshots:
+        for family in families:
+            target = merged.get(family["name"])
+            if target is None:
+                target = merged[family["name"]] = {**family, "samples": {}}
+            for sample in family["samples"]:
+                key = tuple(sample["labels"])
+                existing = target["samples"].get(key)
+                if existing is None:
+                    existing = target["samples"][key] = dict(sample)
+                    if "counts" in sample:
+                        existing["counts"] = list(sample["counts"])
+                elif "counts" in sample:
+                    existing["counts"] = [a + b for a, b in zip(existing["counts"], sample["counts"])]
+                    existing["sum"] += sample["sum"]
+                else:
+                    existing["value"] += sample["value"]
+
+    return [{**family, "samples": list(family["samples"].values())} for family in merged.values()]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: list[str], values: list[str], extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render_prometheus(families: list[dict]) -> str:
+    """Render snapshots in the Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for family in families:
+        name = family["name"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        names = family["labelnames"]
+
+        for sample in family["samples"]:
+            values = sample["labels"]
+            if family["type"] == "histogram":
+                cumulative = 0
+                for bound, count in zip([*family["buckets"], math.inf], sample["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(names, values, ('le', _number(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(names, values)} {_number(sample['sum'])}")
+                lines.append(f"{name}_count{_labels(names, values)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(names, values)} {_number(sample['value'])}")
+
+    return "\n".join(lines) + "\n"
+
+
+# Multi-process aggregation. With METRICS_MULTIPROC_DIR set, every worker
+# periodically writes its snapshot to <dir>/<pid>.json and /metrics merges
+# all of them. Files of exited workers keep their counters and histograms
+# (so totals never go backwards) but their gauges are dropped. Clear the
+# directory when the deployment starts.
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot() -> None:
+    """Write this process's snapshot for the other workers to read"""
+    directory = Path(settings.METRICS_MULTIPROC_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{os.getpid()}.json"
+    temp = path.with_suffix(".tmp")
+    temp.write_text(json.dumps({"written_at": time.time(), "families": collect()}))
+    temp.replace(path)
+
+
+def collect_all() -> list[dict]:
+    """Snapshot of this process merged with every other worker's latest snapshot"""
+    if not settings.METRICS_MULTIPROC_DIR:
+        return collect()
+
+    snapshots = [collect()]
+    for path in Path(settings.METRICS_MULTIPROC_DIR).glob("*.json"):
+        pid = int(path.stem) if path.stem.isdigit() else None
+        if pid is None or pid == os.getpid():
+            continue
+        try:
+            families = json.loads(path.read_text())["families"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping metrics snapshot {path.name}: {str(e)}")
+            continue
+        if not _pid_alive(pid):
+            families = [family for family in families if family["type"] != "gauge"]
+        snapshots.append(families)
+    return merge(snapshots)
+
+
+_writer_task: Optional[asyncio.Task] = None
+
+
+async def _write_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_INTERVAL)
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning(f"Writing metrics snapshot failed: {str(e)}")
+
+
+def start_metrics_writer() -> None:
+    """Start writing snapshots if METRICS_MULTIPROC_DIR is set"""
+    global _writer_task
+    if settings.METRICS_MULTIPROC_DIR and _writer_task is None:
+        _writer_task = asyncio.create_task(_write_loop(), name="metrics-writer")
+
+
+async def stop_metrics_writer() -> None:
+    """Stop the writer and write a final snapshot"""
+    global _writer_task
+    if _writer_task is None:
+        return
+    _writer_task.cancel()
+    try:
+        await _writer_task
+    except asyncio.CancelledError:
+        pass
+    _writer_task = None
+    try:
+        write_snapshot()
+    except OSError as e:
+        logger.warning(f"Writing metrics snapshot failed: {str(e)}")
+
+
+# HTTP metrics
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route")
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests being served", ("method",)
+)
+
+
+class MetricsMiddleware:
+    """
+    Records request count, latency and in-flight requests per route
+
+    Routes are labelled with their path template (/contacts/{contact_id}),
+    and requests that match no route share one label, so label cardinality
+    stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            http_requests.labels(method, route_label, status).inc()
+            http_request_duration.labels(method, route_label).observe(time.perf_counter() - started)
@@ -0,0 +1,65 @@
+"""
+Pagination Utilities
+Opaque cursors for keyset pagination
+"""
+from datetime import datetime
+from typing import Any, Sequence
+import base64
+import json
+
+# Cursor ids and scores are compared with 32-bit integer columns
+_INT_RANGE = range(-2 ** 31, 2 ** 31)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded"""
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    payload = [
+        {"dt": value.isoformat()} if isinstance(value, datetime) else value
+        for value in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _has_type(value: Any, expected: type) -> bool:
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is int:
+        return isinstance(value, int) and value in _INT_RANGE
+    if expected is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> list[Any]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Cursors come back from clients, so every value is checked before it
+    reaches a query: a wrong type would otherwise fail as a server error.
+
+    Args:
+        cursor: Opaque cursor from a previous page
+        types: Type of each value the cursor must hold (int is a 32-bit
+            integer; float also accepts integers)
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        ]
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+
+    if len(values) != len(types) or not all(map(_has_type, values, types)):
+        raise InvalidCursorError("Invalid cursor")
+    return values
@@ -0,0 +1,403 @@
+"""
+Rate Limiting
+Sliding-window request limits and adaptive admission control for public endpoints
+"""
+from typing import Awaitable, Callable, Optional
+import asyncio
+import hashlib
+import logging
+import math
+import random
+import time
+
+from fastapi import Request
+from starlette.requests import HTTPConnection
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.db_metrics import pool_utilization
+from app.core.metrics import Counter, Gauge
+from app.core.redis import get_redis, mark_redis_unavailable
+
+logger = logging.getLogger(__name__)
+
+rate_limit_rejections = Counter("rate_limit_rejections_total", "Requests rejected by a rate limit", ("rule",))
+admission_rejections = Counter(
+    "admission_rejections_total", "Requests shed by admission control", ("signal",)
+)
+admission_pressure = Gauge("admission_pressure", "Load relative to the shedding threshold (1 = full)", ("signal",))
+
+RATE_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# Counts the request only if the weighted estimate stays under the limit.
+# KEYS: current window, previous window. ARGV: previous window weight, limit, ttl
+_SLIDING_WINDOW_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if previous * tonumber(ARGV[1]) + current >= tonumber(ARGV[2]) then
+    return {0, current, previous}
+end
+current = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, current, previous}
+"""
+
+# Uncounts one request from the current window, never going below zero.
+# KEYS: current window
+_REFUND_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current > 0 then
+    redis.call('DECR', KEYS[1])
+end
+return current
+"""
+
+
+def parse_rate(rate: str) -> Optional[tuple[int, int]]:
+    """
+    Parse a rate such as "10/minute"
+
+    Returns:
+        (requests, window seconds), or None for an empty rate (no limit)
+    """
+    if not rate:
+        return None
+    count, _, period = rate.partition("/")
+    if period not in RATE_PERIODS or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate {rate!r}, expected '<count>/<{'|'.join(RATE_PERIODS)}>'")
+    return int(count), RATE_PERIODS[period]
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a client is over a rate limit"""
+
+    def __init__(self, rule: str, retry_after: int):
+        super().__init__(f"Rate limit {rule} exceeded")
+        self.rule = rule
+        self.retry_after = retry_after
+
+
+class ServiceOverloadedError(Exception):
+    """Raised when admission control sheds a request"""
+
+    def __init__(self, signal: str, retry_after: int):
+        super().__init__(f"Shedding load ({signal})")
+        self.signal = signal
+        self.retry_after = retry_after
+
+
+class SlidingWindowLimiter:
+    """
+    Sliding-window counter limit, shared through Redis
+
+    The request rate is estimated from the current fixed window plus the
+    previous one, weighted by how much of it still overlaps the sliding
+    window. That keeps two counters per client instead of a log of
+    timestamps, and avoids the burst at window boundaries a plain fixed
+    window allows. Rejected requests are not counted.
+
+    Without Redis the counters are per process (bounded LRU), so each
+    worker enforces the limit on its own.
+    """
+
+    def __init__(self, rule: str, rate: str, max_local_keys: int = settings.RATE_LIMIT_MAX_LOCAL_KEYS):
+        self.rule = rule
+        parsed = parse_rate(rate)
+        self.limit, self.window = parsed if parsed else (0, 0)
+        self.local = LRUCache(max_local_keys)
+        self.allowed = 0
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    async def hit(self, identifier: str) -> None:
+        """
+        Count one request from a client
+
+        Args:
+            identifier: Client key (IP address, email, ...), hashed before storing
+
+        Raises:
+            RateLimitExceeded: If the client is over the limit
+        """
+        if not self.enabled:
+            return
+
+        now = time.time()
+        index, offset = divmod(now, self.window)
+        index = int(index)
+        weight = 1 - offset / self.window
+        key = self._key(identifier)
+
+        counts = await self._hit_redis(key, index, weight)
+        if counts is None:
+            counts = self._hit_local(key, index, weight)
+        allowed, current, previous = counts
+
+        if allowed:
+            self.allowed += 1
+            return
+
+        self.rejected += 1
+        rate_limit_rejections.labels(self.rule).inc()
+        raise RateLimitExceeded(self.rule, self._retry_after(current, previous, offset))
+
+    async def refund(self, identifier: str) -> None:
+        """
+        Uncount a request hit() allowed, when a later limit rejected it
+
+        Args:
+            identifier: Client key passed to hit()
+        """
+        if not self.enabled:
+            return
+
+        index = int(time.time() // self.window)
+        key = self._key(identifier)
+        if not await self._refund_redis(key, index):
+            self._refund_local(key, index)
+        self.allowed -= 1
+
+    def _key(self, identifier: str) -> str:
+        return hashlib.sha256(identifier.encode("utf-8")).hexdigest()[:32]
+
+    async def _hit_redis(self, key: str, index: int, weight: float) -> Optional[tuple[bool, int, int]]:
+        client = await get_redis()
+        if client is None:
+            return None
+
+        prefix = f"ratelimit:{self.rule}:{key}"
+        try:
+            allowed, current, previous = await client.eval(
+                _SLIDING_WINDOW_SCRIPT, 2, f"{prefix}:{index}", f"{prefix}:{index - 1}",
+                repr(weight), self.limit, self.window * 2,
+            )
+        except Exception as e:
+            mark_redis_unavailable(e)
+            return None
+        return bool(allowed), int(current), int(previous)
+
+    async def _refund_redis(self, key: str, index: int) -> bool:
+        client = await get_redis()
+        if client is None:
+            return False
+
+        try:
+            await client.eval(_REFUND_SCRIPT, 1, f"ratelimit:{self.rule}:{key}:{index}")
+        except Exception as e:
+            mark_redis_unavailable(e)
+            return False
+        return True
+
+    def _hit_local(self, key: str, index: int, weight: float) -> tuple[bool, int, int]:
+        window_index, current, previous = self.local.get(key, (index, 0, 0))
+        if window_index != index:
+            # Roll forward; a gap of more than one window leaves nothing behind
+            previous = current if window_index == index - 1 else 0
+            current = 0
+
+        if previous * weight + current >= self.limit:
+            self.local.set(key, (index, current, previous))
+            return False, current, previous
+
+        current += 1
+        self.local.set(key, (index, current, previous))
+        return True, current, previous
+
+    def _refund_local(self, key: str, index: int) -> None:
+        window_index, current, previous = self.local.get(key, (index, 0, 0))
+        if window_index == index and current > 0:
+            self.local.set(key, (index, current - 1, previous))
+
+    def _retry_after(self, current: int, previous: int, offset: float) -> int:
+        """Seconds until the weighted estimate drops below the limit"""
+        if current < self.limit and previous:
+            # The previous window's share decays enough before this one ends
+            overlap_needed = (self.limit - current) / previous
+            wait = (1 - overlap_needed) * self.window - offset
+        else:
+            # This window is full; wait for it to become the previous one
+            wait = self.window - offset + max(0.0, 1 - self.limit / max(current, 1)) * self.window
+        return max(1, math.ceil(wait))
+
+    def stats(self) -> dict:
+        """Limit and decision counters"""
+        return {
+            "limit": self.limit,
+            "window": self.window,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "local_keys": len(self.local),
+        }
+
+
+class AdmissionController:
+    """
+    Sheds requests before the resources behind them saturate
+
+    Each signal reports its load as a fraction of the level where it is
+    saturated (1.0). Signals are sampled in the background at most every
+    sample_interval seconds, so checks never wait on them. Above shed_start
+    the highest pressure sheds a growing share of requests at random,
+    reaching all of them at 1.0, with a Retry-After that grows with it.
+    """
+
+    def __init__(self, shed_start: float, sample_interval: float, retry_after: int):
+        self.shed_start = shed_start
+        self.sample_interval = sample_interval
+        self.retry_after = retry_after
+        self._signals: dict[str, Callable[[], Awaitable[Optional[float]]]] = {}
+        self._pressures: dict[str, float] = {}
+        self._sampled_at: Optional[float] = None
+        self._sampling: Optional[asyncio.Task] = None
+        self.admitted = 0
+        self.rejected = 0
+
+    def add_signal(self, name: str, sampler: Callable[[], Awaitable[Optional[float]]]) -> None:
+        """
+        Register a load signal
+
+        Args:
+            name: Signal name, reported in metrics and rejections
+            sampler: Coroutine function returning the pressure (None if unknown)
+        """
+        self._signals[name] = sampler
+
+    async def _sample(self) -> None:
+        for name, sampler in self._signals.items():
+            try:
+                pressure = await sampler()
+            except Exception as e:
+                logger.warning(f"Admission signal {name} failed: {str(e)}")
+                pressure = None
+            self._pressures[name] = pressure or 0.0
+            admission_pressure.labels(name).set(self._pressures[name])
+
+    def pressure(self) -> tuple[Optional[str], float]:
+        """Highest pressure among the signals, with its name"""
+        if not self._pressures:
+            return None, 0.0
+        name = max(self._pressures, key=self._pressures.get)
+        return name, self._pressures[name]
+
+    async def check(self) -> None:
+        """
+        Admit or shed one request
+
+        Raises:
+            ServiceOverloadedError: If the request is shed
+        """
+        if not self._signals:
+            return
+
+        now = time.monotonic()
+        if self._sampled_at is None or now - self._sampled_at >= self.sample_interval:
+            if self._sampling is None or self._sampling.done():
+                self._sampled_at = now
+                self._sampling = asyncio.create_task(self._sample())
+        if not self._pressures:
+            # First request of the process: nothing sampled yet to go on
+            await asyncio.shield(self._sampling)
+
+        signal, pressure = self.pressure()
+        if pressure >= self.shed_start:
+            shed = 1.0 if self.shed_start >= 1 else (pressure - self.shed_start) / (1 - self.shed_start)
+            if random.random() < shed:
+                self.rejected += 1
+                admission_rejections.labels(signal).inc()
+                retry_after = max(1, math.ceil(self.retry_after * min(pressure, 1.0)))
+                raise ServiceOverloadedError(signal, retry_after)
+        self.admitted += 1
+
+    def stats(self) -> dict:
+        """Latest pressures and decision counters"""
+        return {
+            "pressure": dict(self._pressures),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+def client_ip(request: HTTPConnection) -> str:
+    """Client address, from X-Forwarded-For only when RATE_LIMIT_TRUST_FORWARDED_FOR is set"""
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def _pool_pressure() -> Optional[float]:
+    utilization = pool_utilization("primary")
+    if utilization is None:
+        return None
+    return utilization / settings.ADMISSION_MAX_POOL_UTILIZATION
+
+
+# Process-wide controller; the scoring queue registers its own signal
+admission = AdmissionController(
+    settings.ADMISSION_SHED_START,
+    settings.ADMISSION_SAMPLE_INTERVAL,
+    settings.ADMISSION_RETRY_AFTER,
+)
+if settings.ADMISSION_MAX_POOL_UTILIZATION > 0:
+    admission.add_signal("db_pool", _pool_pressure)
+
+# Limits on the unauthenticated endpoints
+contact_ip_limit = SlidingWindowLimiter("contact_ip", settings.RATE_LIMIT_CONTACT_PER_IP)
+contact_email_limit = SlidingWindowLimiter("contact_email", settings.RATE_LIMIT_CONTACT_PER_EMAIL)
+contact_global_limit = SlidingWindowLimiter("contact_global", settings.RATE_LIMIT_CONTACT_GLOBAL)
+chat_ip_limit = SlidingWindowLimiter("chat_ip", settings.RATE_LIMIT_CHAT_PER_IP)
+chat_global_limit = SlidingWindowLimiter("chat_global", settings.RATE_LIMIT_CHAT_GLOBAL)
+
+RATE_LIMITERS = (contact_ip_limit, contact_email_limit, contact_global_limit, chat_ip_limit, chat_global_limit)
+
+
+async def hit_limits(per_ip: SlidingWindowLimiter, global_limit: SlidingWindowLimiter, ip: str) -> None:
+    """
+    Apply a per-IP and a global limit to one request
+
+    A request the global limit rejects is refunded to the per-IP limit, so
+    clients don't use up their own quota while the service is saturated.
+
+    Raises:
+        RateLimitExceeded: If either limit is exceeded
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    await per_ip.hit(ip)
+    try:
+        await global_limit.hit("global")
+    except RateLimitExceeded:
+        await per_ip.refund(ip)
+        raise
+
+
+def limit_requests(per_ip: SlidingWindowLimiter, global_limit: SlidingWindowLimiter) -> Callable:
+    """
+    Dependency guarding a public endpoint
+
+    Sheds the request under load first, so rejected requests never count
+    against the limits, then applies the per-IP and global limits.
+    """
+    async def dependency(request: Request) -> None:
+        await admission.check()
+        await hit_limits(per_ip, global_limit, client_ip(request))
+
+    return dependency
+
+
+async def limit_email(email: str) -> None:
+    """Apply the per-email contact limit (emails are case-insensitive)"""
+    if settings.RATE_LIMIT_ENABLED:
+        await contact_email_limit.hit(email.strip().lower())
+
+
+def rate_limit_stats() -> dict:
+    """Counters for every limit and admission control"""
+    return {
+        "limits": {limiter.rule: limiter.stats() for limiter in RATE_LIMITERS},
+        "admission": admission.stats(),
+    }
@@ -0,0 +1,90 @@
+"""
+Redis Connection
+Shared async Redis client; callers fall back to in-process state without it
+"""
+from typing import Optional
+import asyncio
+import logging
+import time
+
+import redis.asyncio as redis
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before trying to reconnect after a failure
+RECONNECT_DELAY = 30.0
+
+_client: Optional[redis.Redis] = None
+_retry_at = 0.0
+# Closes of dropped clients still running (holds the tasks until they finish)
+_closing: set[asyncio.Task] = set()
+
+
+async def get_redis() -> Optional[redis.Redis]:
+    """
+    Get the shared Redis client
+
+    Returns:
+        Connected client, or None if Redis is disabled or unreachable
+    """
+    global _client, _retry_at
+
+    if _client is not None:
+        return _client
+    if not settings.REDIS_URL or time.monotonic() < _retry_at:
+        return None
+
+    client = redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=1.0,
+        socket_connect_timeout=1.0,
+    )
+    try:
+        await client.ping()
+    except Exception as e:
+        logger.warning(f"Redis unavailable, using in-process fallback: {str(e)}")
+        _retry_at = time.monotonic() + RECONNECT_DELAY
+        await client.aclose()
+        return None
+
+    _client = client
+    return _client
+
+
+def mark_redis_unavailable(error: Exception) -> None:
+    """Drop the shared client after a failed command so callers fall back"""
+    global _client, _retry_at
+
+    if _client is not None:
+        logger.warning(f"Redis command failed, using in-process fallback: {str(error)}")
+        _close_later(_client)
+    _client = None
+    _retry_at = time.monotonic() + RECONNECT_DELAY
+
+
+def _close_later(client: redis.Redis) -> None:
+    """Close a dropped client in the background, releasing its connection pool"""
+    async def close() -> None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.debug(f"Error closing dropped Redis client: {str(e)}")
+
+    try:
+        task = asyncio.get_running_loop().create_task(close())
+    except RuntimeError:
+        # No event loop to close it on; its connections are dropped with it
+        return
+    _closing.add(task)
+    task.add_done_callback(_closing.discard)
+
+
+async def close_redis() -> None:
+    """Close the shared client"""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
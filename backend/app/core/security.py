@@ -2,40 +2,159 @@
 Security utilities
 JWT token creation, password hashing, authentication
 """
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.cache import LRUCache, TwoTierCache
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import ReadSessionLocal
 from app.models.user import User
+import asyncio
+import hashlib
+import logging
+import time
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# Password hashing context; verify_and_update flags hashes made with other rounds
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
 
+def _truncate(password: str) -> str:
+    # Truncate password to 72 bytes to avoid bcrypt limitation
+    if len(password.encode('utf-8')) > 72:
+        password = password[:72]
+    return password
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
-    # Truncate password to 72 bytes to avoid bcrypt limitation
-    if len(plain_password.encode('utf-8')) > 72:
-        plain_password = plain_password[:72]
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context.verify(_truncate(plain_password), hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """
+    Verify a password and rehash it if the stored hash is outdated
+
+    Returns:
+        Whether the password matches, and a new hash if it should be replaced
+    """
+    return pwd_context.verify_and_update(_truncate(plain_password), hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Hash a password using bcrypt"""
-    # Truncate password to 72 bytes to avoid bcrypt limitation
-    if len(password.encode('utf-8')) > 72:
-        password = password[:72]
-    return pwd_context.hash(password)
+    return pwd_context.hash(_truncate(password))
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when too many password operations are already waiting"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small thread pool instead of the event loop
+
+    bcrypt releases the GIL while hashing, so threads give real parallelism
+    without blocking other requests. Operations beyond the queue limit are
+    rejected so a burst of logins sheds load instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_pending = workers + max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def _run(self, func: Callable, *args):
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusyError("Password hashing queue is full")
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+
+        def timed():
+            started = time.perf_counter()
+            result = func(*args)
+            return started, time.perf_counter() - started, result
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            started, elapsed, result = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+
+        waited = started - submitted
+        self.completed += 1
+        self.hash_seconds += elapsed
+        self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+        self.wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password"""
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password"""
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+        """Verify a password, returning a replacement hash if the stored one is outdated"""
+        verified, new_hash = await self._run(verify_and_update_password, plain_password, hashed_password)
+        if new_hash is not None:
+            self.rehashed += 1
+        return verified, new_hash
+
+    def shutdown(self) -> None:
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        """Queue and latency counters"""
+        return {
+            "workers": self.workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "avg_hash_ms": round(self.hash_seconds / self.completed * 1000, 2) if self.completed else None,
+            "max_hash_ms": round(self.max_hash_seconds * 1000, 2),
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else None,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 2),
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -62,16 +181,135 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated caller, as far as authorization checks need to know"""
+    id: int
+    is_active: bool
+    is_superuser: bool
+
+
+def user_claims(user: User) -> dict:
+    """
+    Claims identifying a user in an access token
+
+    With JWT_EMBED_USER_CLAIMS the flags are carried in the token, so
+    get_current_principal needs no lookup; changes to them (deactivation)
+    then only take effect on those paths once the token expires.
+    """
+    claims = {"sub": str(user.id)}
+    if settings.JWT_EMBED_USER_CLAIMS:
+        claims["is_active"] = bool(user.is_active)
+        claims["is_superuser"] = bool(user.is_superuser)
+    return claims
+
+
+# Recently authenticated users by id. Entries are deleted on update and
+# deactivation. With Redis every process reads the shared entry, so that
+# applies everywhere at once; while Redis is unavailable, other processes may
+# serve a stale local entry for up to USER_CACHE_TTL seconds.
+user_cache = TwoTierCache(
+    "auth:user",
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl=settings.USER_CACHE_TTL,
+    local_first=False,
+)
+
+
+def _user_to_cache(user: User) -> dict:
+    return {
+        "id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "is_active": user.is_active,
+        "is_superuser": user.is_superuser,
+        "created_at": user.created_at.isoformat() if user.created_at else None,
+        "updated_at": user.updated_at.isoformat() if user.updated_at else None,
+    }
+
+
+def _user_from_cache(data: dict) -> User:
+    # Detached copy without the password hash; never add it to a session
+    return User(
+        id=data["id"],
+        email=data["email"],
+        full_name=data["full_name"],
+        is_active=data["is_active"],
+        is_superuser=data["is_superuser"],
+        created_at=datetime.fromisoformat(data["created_at"]) if data["created_at"] else None,
+        updated_at=datetime.fromisoformat(data["updated_at"]) if data["updated_at"] else None,
+    )
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Drop a user from the principal cache after it changed"""
+    await user_cache.delete(str(user_id))
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _inactive_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="Inactive user"
+    )
+
+
+# Claims of recently verified tokens, keyed by a hash of the token. Entries
+# expire with the token, so a cached token is never accepted past its exp.
+token_cache = LRUCache(settings.TOKEN_CACHE_MAX_ENTRIES)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a JWT and return its claims
+
+    Repeated tokens are served from token_cache instead of re-checking the
+    signature; only valid tokens with an exp claim are cached.
+
+    Raises:
+        HTTPException: If the token is invalid, expired or has no subject
+    """
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = token_cache.get(key) if settings.TOKEN_CACHE_MAX_ENTRIES else None
+    if payload is not None:
+        return payload
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise _credentials_exception()
+
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+
+    if settings.TOKEN_CACHE_MAX_ENTRIES and isinstance(payload.get("exp"), (int, float)):
+        remaining = payload["exp"] - time.time()
+        if remaining > 0:
+            token_cache.set(key, payload, ttl=remaining)
+
+    return payload
+
+
 async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
+    token: str = Depends(oauth2_scheme)
 ) -> User:
     """
     Dependency to get the current authenticated user from JWT token
 
+    The user is returned detached: recently seen users come from the
+    principal cache, others are loaded on a short-lived read-only session so
+    the connection is back in the pool before the endpoint runs. Load the
+    user through the request session before modifying it.
+
     Args:
         token: JWT token from Authorization header
-        db: Database session
 
     Returns:
         Current authenticated user
@@ -79,39 +317,58 @@ async def get_current_user(
     Raises:
         HTTPException: If token is invalid or user not found
     """
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    payload = decode_token(token)
+    user_id = int(payload["sub"])
 
-    try:
-        # Decode JWT token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
+    cached = await user_cache.get(str(user_id))
+    if cached is not None:
+        user = _user_from_cache(cached)
+    else:
+        # Get user from database
+        async with ReadSessionLocal() as db:
+            result = await db.execute(
+                select(User).where(User.id == user_id)
+            )
+            user = result.scalar_one_or_none()
 
-        if user_id is None:
-            raise credentials_exception
+        if user is None:
+            raise _credentials_exception()
 
-    except JWTError:
-        raise credentials_exception
+        await user_cache.set(str(user_id), _user_to_cache(user))
 
-    # Get user from database
-    result = await db.execute(
-        select(User).where(User.id == int(user_id))
-    )
-    user = result.scalar_one_or_none()
+    if not user.is_active:
+        raise _inactive_exception()
 
-    if user is None:
-        raise credentials_exception
+    return user
 
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Inactive user"
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme)
+) -> Principal:
+    """
+    Dependency for read endpoints that only need to know who is calling
+
+    Endpoints that change or bulk-move data use get_current_user instead,
+    so a deactivated user is locked out of them on the next request.
+    Tokens carrying is_active/is_superuser claims (JWT_EMBED_USER_CLAIMS)
+    are trusted without any lookup; others go through get_current_user.
+
+    Raises:
+        HTTPException: If token is invalid, user not found or inactive
+    """
+    payload = decode_token(token)
+
+    if "is_active" in payload and "is_superuser" in payload:
+        if not payload["is_active"]:
+            raise _inactive_exception()
+        return Principal(
+            id=int(payload["sub"]),
+            is_active=True,
+            is_superuser=bool(payload["is_superuser"]),
         )
 
-    return user
+    user = await get_current_user(token)
+    return Principal(id=user.id, is_active=bool(user.is_active), is_superuser=bool(user.is_superuser))
 
 
 async def get_current_active_superuser(
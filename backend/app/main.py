@@ -2,15 +2,30 @@
 FastAPI Main Application
 Clean architecture with dependency injection and modular design
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
 
 from app.core.config import settings
-from app.core.database import engine, Base
+from app.core.database import engine, Base, ReadYourWritesMiddleware, replica_router
+from app.core.db_metrics import start_pool_autotune, stop_pool_autotune
+from app.core.metrics import (
+    MetricsMiddleware,
+    collect_all,
+    render_prometheus,
+    start_metrics_writer,
+    stop_metrics_writer,
+)
 from app.api.v1 import api_router
-from app.core.logging import setup_logging
+from app.core.logging import RequestContextMiddleware, setup_logging, stop_logging
+from app.core.rate_limit import RateLimitExceeded, ServiceOverloadedError
+from app.core.redis import close_redis
+from app.core.security import PasswordHasherBusyError, password_hasher
+from app.services.ai_service import init_ai_service, close_ai_service
+from app.services.contact_service import ensure_search_schema
+from app.services.scoring_queue import worker_pool
 
 
 @asynccontextmanager
@@ -21,11 +36,30 @@ async def lifespan(app: FastAPI):
     # Create tables (in production, use Alembic migrations)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    await ensure_search_schema(engine)
+
+    if replica_router is not None:
+        await replica_router.start()
+    start_pool_autotune()
+    start_metrics_writer()
+
+    # Shared AI client, then the background lead scoring that uses it
+    await init_ai_service()
+    await worker_pool.start()
 
     yield
 
     # Shutdown
+    await stop_metrics_writer()
+    await stop_pool_autotune()
+    await worker_pool.stop()
+    await close_ai_service()
+    password_hasher.shutdown()
+    await close_redis()
+    if replica_router is not None:
+        await replica_router.stop()
     await engine.dispose()
+    stop_logging()
 
 
 # Initialize FastAPI application
@@ -46,11 +80,53 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID", "Idempotent-Replayed", "Retry-After"],
 )
 
 # Gzip compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# Read from the primary for a while after a client writes (replicas only)
+app.add_middleware(ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_WINDOW)
+
+# Request ids and access log
+app.add_middleware(RequestContextMiddleware)
+
+# Per-route request metrics (outermost, so latency covers every middleware)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    """Shed login/registration load when the bcrypt pool is saturated"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
+    """Tell clients over a rate limit when the next request will be accepted"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many requests, please retry later"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(ServiceOverloadedError)
+async def service_overloaded_handler(request: Request, exc: ServiceOverloadedError):
+    """Shed public requests while the scoring queue, database pool or chat streams are saturated"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -72,3 +148,13 @@ async def health_check():
         "status": "healthy",
         "version": settings.VERSION
     }
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics for this process, or for every worker with METRICS_MULTIPROC_DIR"""
+        return PlainTextResponse(
+            render_prometheus(collect_all()),
+            media_type="text/plain; version=0.0.4"
+        )
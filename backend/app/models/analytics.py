@@ -0,0 +1,34 @@
+"""
+Analytics Rollup Models
+Pre-aggregated contact counts kept up to date on every contact write
+"""
+from sqlalchemy import Column, Integer, String, Date, Index
+from app.core.database import Base
+
+
+class ContactDailyStat(Base):
+    """Number of contacts created on a day (UTC) that are currently in a status"""
+
+    __tablename__ = "contact_daily_stats"
+
+    day = Column(Date, primary_key=True)
+    status = Column(String(20), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ContactDailyStat(day={self.day}, status={self.status}, count={self.count})>"
+
+
+class CompanyStat(Base):
+    """Number of contacts per company"""
+
+    __tablename__ = "company_stats"
+    __table_args__ = (
+        Index("ix_company_stats_count", "count"),
+    )
+
+    company = Column(String(100), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<CompanyStat(company={self.company}, count={self.count})>"
@@ -2,7 +2,8 @@
 Contact Model
 Database model for contact form submissions
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, ForeignKey, Index, literal_column, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -11,6 +12,34 @@ class Contact(Base):
     """Contact form submission model"""
 
     __tablename__ = "contacts"
+    # Load created_at via RETURNING on insert; the analytics rollups need it
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Backs the default listing order and keyset pagination
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+        # Status filter with the default order
+        Index("ix_contacts_status_created_at", "status", "created_at", "id"),
+        # Priority filter with a score range; unscored contacts are left out
+        Index(
+            "ix_contacts_priority_score", "ai_priority", "ai_score",
+            postgresql_where=text("ai_priority IS NOT NULL"),
+        ),
+        # Idempotency-Key replays
+        Index(
+            "ix_contacts_idempotency_key", "idempotency_key", unique=True,
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+        ),
+        # Same submission within the dedupe window
+        Index(
+            "ix_contacts_submission_hash", "submission_hash", "created_at",
+            postgresql_where=text("submission_hash IS NOT NULL"),
+        ),
+        # Finds a contact's duplicates, and backs ON DELETE SET NULL
+        Index(
+            "ix_contacts_duplicate_of_id", "duplicate_of_id",
+            postgresql_where=text("duplicate_of_id IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
@@ -25,9 +54,49 @@ class Contact(Base):
     ai_priority = Column(String(20), nullable=True)  # low, medium, high, urgent
     ai_insights = Column(JSON, nullable=True)  # JSON with urgency, budget, industry, etc.
     ai_suggested_response = Column(Text, nullable=True)
+    ai_status = Column(String(20), default='pending', nullable=False)  # pending, scored, failed
+
+    # Repeated submission detection: client-supplied key, and hash of email + message
+    idempotency_key = Column(String(255), nullable=True)
+    submission_hash = Column(String(64), nullable=True)
+
+    # Earlier contact this one was found to duplicate (its score is reused)
+    duplicate_of_id = Column(Integer, ForeignKey("contacts.id", ondelete="SET NULL"), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     def __repr__(self):
         return f"<Contact(id={self.id}, email={self.email})>"
+
+
+# Expression indexes reference the mapped columns, so they are declared here
+# Score order (unscored last when descending) and keyset pagination
+Index("ix_contacts_score_id", func.coalesce(Contact.ai_score, -1), Contact.id)
+# Case-insensitive company filter
+Index(
+    "ix_contacts_company_lower", func.lower(Contact.company),
+    postgresql_where=Contact.company.isnot(None),
+)
+
+# Full-text search document over name, email, company and message, weighted
+# in that order of importance. SEARCH_DDL adds it on PostgreSQL as a
+# generated column with a GIN index (migration 0007, and again at startup so
+# a database made by create_all can search); it is deliberately not mapped,
+# so other databases and create_all never see it.
+SEARCH_CONFIG = "simple"
+contact_search_vector = literal_column("contacts.search_vector", TSVECTOR)
+
+# Idempotent; run outside a transaction (CREATE INDEX CONCURRENTLY)
+SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Rewrites the table once to fill the column
+    f"""ALTER TABLE contacts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+           setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '') || ' ' || email), 'A') ||
+           setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(company, '')), 'B') ||
+           setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(message, '')), 'C')
+       ) STORED""",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_search ON contacts USING gin (search_vector)",
+    # Typo-tolerant company matching (similarity / %)
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_company_trgm ON contacts USING gin (company gin_trgm_ops)",
+]
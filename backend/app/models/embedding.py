@@ -0,0 +1,24 @@
+"""
+Contact Embedding Model
+Vector representation of a contact, for similarity search and deduplication
+"""
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ContactEmbedding(Base):
+    """Embedding of a contact's name, company and message"""
+
+    __tablename__ = "contact_embeddings"
+
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), primary_key=True)
+    model = Column(String(100), nullable=False)  # embedder that produced the vector
+    vector = Column(LargeBinary, nullable=False)  # L2-normalized float32 array
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set on every write; the in-process index loads vectors newer than its last refresh
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ContactEmbedding(contact_id={self.contact_id}, model={self.model})>"
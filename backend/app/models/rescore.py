@@ -0,0 +1,32 @@
+"""
+Rescore Checkpoint Model
+Progress of bulk lead re-scoring runs, so they can resume after a crash
+"""
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class RescoreCheckpoint(Base):
+    """Keyset position and counters of a named re-scoring run"""
+
+    __tablename__ = "rescore_checkpoints"
+
+    name = Column(String(100), primary_key=True)
+    backend = Column(String(20), nullable=False)
+    status = Column(String(20), default='running', nullable=False)  # running, completed, failed
+    last_contact_id = Column(Integer, default=0, nullable=False)
+    processed = Column(Integer, default=0, nullable=False)
+    failed = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    # Message batch submitted for the chunk after last_contact_id, up to
+    # pending_until_id, whose results have not been written yet
+    pending_batch_id = Column(String(100), nullable=True)
+    pending_until_id = Column(Integer, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<RescoreCheckpoint(name={self.name}, last_contact_id={self.last_contact_id})>"
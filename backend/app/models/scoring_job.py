@@ -0,0 +1,32 @@
+"""
+Scoring Job Model
+Durable queue of pending AI lead scoring work
+"""
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class ScoringJob(Base):
+    """Lead scoring job consumed by the background worker pool"""
+
+    __tablename__ = "scoring_jobs"
+    __table_args__ = (
+        # Workers claim the oldest runnable jobs first
+        Index("ix_scoring_jobs_status_run_at", "status", "run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    contact_id = Column(Integer, ForeignKey("contacts.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(20), default='queued', nullable=False)  # queued, running, done, dead
+    attempts = Column(Integer, default=0, nullable=False)
+    force = Column(Boolean, default=False, nullable=False)  # skip the score cache
+    last_error = Column(Text, nullable=True)
+
+    run_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<ScoringJob(id={self.id}, contact_id={self.contact_id}, status={self.status})>"
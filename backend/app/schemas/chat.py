@@ -3,13 +3,20 @@ Chat Schemas
 Pydantic models for chat functionality
 """
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal
+
+
+class ChatTurn(BaseModel):
+    """Earlier message in the conversation, sent back by the client"""
+    role: Literal["user", "assistant"]
+    content: str = Field(..., min_length=1, max_length=8000)
 
 
 class ChatMessage(BaseModel):
     """Incoming chat message"""
     content: str = Field(..., min_length=1, max_length=2000)
     type: Literal["user", "bot"] = "user"
+    history: List[ChatTurn] = Field(default_factory=list, max_length=100)
 
 
 class ChatResponse(BaseModel):
@@ -7,6 +7,16 @@ from typing import Optional, Dict, Any
 from datetime import datetime
 
 
+# Pipeline stages a contact can be in
+CONTACT_STATUSES = ("new", "contacted", "qualified", "closed")
+
+# Priority levels assigned by AI lead scoring
+AI_PRIORITIES = ("low", "medium", "high", "urgent")
+
+# Columns the contact list can be sorted by; prefix with "-" for descending
+CONTACT_SORT_KEYS = ("created_at", "ai_score")
+
+
 class ContactBase(BaseModel):
     """Base contact schema"""
     name: str = Field(..., min_length=1, max_length=100)
@@ -23,7 +33,7 @@ class ContactCreate(ContactBase):
 
 class ContactUpdate(BaseModel):
     """Schema for updating a contact"""
-    status: str = Field(..., pattern="^(new|contacted|qualified|closed)$")
+    status: str = Field(..., pattern=f"^({'|'.join(CONTACT_STATUSES)})$")
 
 
 class ContactResponse(ContactBase):
@@ -34,8 +44,65 @@ class ContactResponse(ContactBase):
     ai_priority: Optional[str] = None
     ai_insights: Optional[Dict[str, Any]] = None
     ai_suggested_response: Optional[str] = None
+    ai_status: str = "pending"
+    duplicate_of_id: Optional[int] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+
+class ContactSummary(BaseModel):
+    """Compact contact for list views, without the long text fields"""
+    id: int
+    name: str
+    email: str
+    company: Optional[str] = None
+    status: str
+    ai_score: Optional[int] = None
+    ai_priority: Optional[str] = None
+    ai_status: str = "pending"
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+# Columns to load for a summary listing
+CONTACT_SUMMARY_FIELDS = tuple(ContactSummary.model_fields)
+
+
+class ContactSearchResult(ContactSummary):
+    """Search hit with its relevance and a highlighted message excerpt"""
+    rank: float
+    snippet: Optional[str] = None  # HTML: the message escaped, matches wrapped in <mark></mark>
+
+
+class SimilarContact(ContactSummary):
+    """Contact close to another one in embedding space"""
+    similarity: float  # cosine similarity, 1.0 for identical text
+
+
+class ContactFilters(BaseModel):
+    """Server-side filters for listing contacts"""
+    status: Optional[str] = None
+    ai_priority: Optional[str] = None
+    min_score: Optional[int] = None
+    max_score: Optional[int] = None
+    company: Optional[str] = None  # case-insensitive exact match
+    created_after: Optional[datetime] = None  # inclusive
+    created_before: Optional[datetime] = None  # exclusive
+
+
+class ContactImportError(BaseModel):
+    """A row that could not be imported"""
+    line: int  # line of the file the row starts on
+    error: str
+
+
+class ContactImportResult(BaseModel):
+    """Outcome of a bulk import"""
+    imported: int
+    failed: int
+    errors: list[ContactImportError]  # the first IMPORT_MAX_REPORTED_ERRORS failures
@@ -0,0 +1,31 @@
+"""
+Rescore Schemas
+Pydantic models for bulk lead re-scoring
+"""
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+from datetime import datetime
+
+
+class RescoreRequest(BaseModel):
+    """Start or resume a re-scoring run"""
+    name: str = Field(..., min_length=1, max_length=100, pattern="^[A-Za-z0-9_.-]+$")
+    backend: Literal["batch", "direct", "fake"] = "batch"
+    chunk_size: int = Field(500, ge=1, le=10000)
+    restart: bool = False
+
+
+class RescoreStatus(BaseModel):
+    """Progress of a re-scoring run"""
+    name: str
+    backend: str
+    status: str
+    last_contact_id: int
+    processed: int
+    failed: int
+    last_error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -26,6 +26,12 @@ class UserUpdate(UserBase):
     password: Optional[str] = Field(None, min_length=8, max_length=100)
 
 
+# Properties an admin can change
+class UserActiveUpdate(BaseModel):
+    """Schema for activating or deactivating a user"""
+    is_active: bool
+
+
 # Properties to return via API
 class UserResponse(UserBase):
     """Schema for user response (no password)"""
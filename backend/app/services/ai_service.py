@@ -2,56 +2,80 @@
 AI Service
 Claude AI integration for lead scoring and analysis
 """
-from typing import Optional
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
 import anthropic
+import asyncio
+import hashlib
+import httpx
 import json
 import logging
+import random
+import time
 
+from app.core.cache import TwoTierCache
 from app.core.config import settings
+from app.core.metrics import Counter, Histogram
 
 logger = logging.getLogger(__name__)
 
+# success: model result, cached: score cache hit, fallback: no API key
+# (default score), error: the call failed and the fallback score was returned
+ai_score_outcomes = Counter("ai_score_requests_total", "Lead scoring requests by outcome", ("outcome",))
+ai_score_duration = Histogram(
+    "ai_score_duration_seconds", "Lead scoring model call latency, including retries", ("outcome",),
+    buckets=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0),
+)
+ai_api_retries = Counter("ai_api_retries_total", "Retried Anthropic API calls", ("reason",))
 
-class AIService:
-    """Service for AI-powered features using Claude API"""
 
-    def __init__(self):
-        if not settings.ANTHROPIC_API_KEY:
-            logger.warning("ANTHROPIC_API_KEY not set. AI features will be disabled.")
-            self.client = None
-        else:
-            self.client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+class TokenBucket:
+    """
+    Token bucket limiting the rate of outbound API requests
 
-    async def score_lead(self, name: str, email: str, company: Optional[str], message: str) -> dict:
-        """
-        Analyze a contact submission and provide lead scoring
+    The provider can also pause the bucket (429 / retry-after), in which case
+    every caller waits until the pause is over.
+    """
 
-        Args:
-            name: Contact name
-            email: Contact email
-            company: Company name (optional)
-            message: Contact message
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
 
-        Returns:
-            Dict with score, priority, insights, and suggested_response
-        """
-        if not self.client:
-            # Return default scoring if API key not configured
-            return {
-                "score": 50,
-                "priority": "medium",
-                "insights": {
-                    "urgency": "unknown",
-                    "budget": "unknown",
-                    "industry": "unknown"
-                },
-                "suggested_response": "Thank you for your interest. We'll get back to you soon!",
-                "ai_enabled": False
-            }
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
 
-        try:
-            # Create prompt for Claude
-            prompt = f"""You are an expert sales assistant analyzing incoming business leads.
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop issuing tokens for the given number of seconds"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+def build_score_prompt(name: str, email: str, company: Optional[str], message: str) -> str:
+    """Build the lead scoring prompt for a contact"""
+    return f"""You are an expert sales assistant analyzing incoming business leads.
 Analyze this contact submission and provide a detailed lead score.
 
 Contact Information:
@@ -83,46 +107,287 @@ Return ONLY a JSON object with this exact structure:
   "suggested_response": "string"
 }}"""
 
-            # Call Claude API
-            message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+
+def parse_score_response(response_text: str) -> dict:
+    """Extract the scoring JSON from a model response"""
+    # Extract JSON from response (Claude might wrap it in markdown)
+    if "```json" in response_text:
+        json_str = response_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in response_text:
+        json_str = response_text.split("```")[1].split("```")[0].strip()
+    else:
+        json_str = response_text.strip()
+
+    result = json.loads(json_str)
+    result["ai_enabled"] = True
+    return result
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+def score_cache_key(model: str, name: str, email: str, company: Optional[str], message: str) -> str:
+    """
+    Content-addressed cache key for a scoring request
+
+    Inputs are normalized (case, whitespace) before building the prompt, so
+    resubmissions that only differ in formatting share an entry, and any
+    change to the prompt template or model yields a new key.
+    """
+    prompt = build_score_prompt(_normalize(name), _normalize(email), _normalize(company), _normalize(message))
+    return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def fallback_score(error: str) -> dict:
+    """Default scoring returned when the model call fails"""
+    return {
+        "score": 50,
+        "priority": "medium",
+        "insights": {
+            "urgency": "medium",
+            "budget": "unknown",
+            "industry": "unknown",
+            "pain_points": []
+        },
+        "suggested_response": "Thank you for reaching out! We appreciate your interest and will review your message carefully.",
+        "ai_enabled": False,
+        "error": error
+    }
+
+
+def _retry_after(response: Optional[httpx.Response]) -> Optional[float]:
+    """Seconds to wait according to the provider's retry-after headers"""
+    if response is None:
+        return None
+
+    retry_after_ms = response.headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = response.headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AIService:
+    """
+    Service for AI-powered features using Claude API
+
+    One instance is shared by the whole process (see init_ai_service) so every
+    call reuses the same pooled keep-alive connections.
+    """
+
+    def __init__(self, client: Optional[anthropic.AsyncAnthropic] = None):
+        if client is None and settings.ANTHROPIC_API_KEY:
+            client = anthropic.AsyncAnthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                # Retries are handled here so they go through the rate limiter
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=settings.AI_MAX_CONNECTIONS,
+                        max_keepalive_connections=settings.AI_MAX_CONNECTIONS,
+                        keepalive_expiry=60,
+                    ),
+                    timeout=httpx.Timeout(settings.AI_REQUEST_TIMEOUT, connect=5.0),
+                ),
             )
 
-            # Parse response
-            response_text = message.content[0].text
+        if client is None:
+            logger.warning("ANTHROPIC_API_KEY not set. AI features will be disabled.")
 
-            # Extract JSON from response (Claude might wrap it in markdown)
-            if "```json" in response_text:
-                json_str = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                json_str = response_text.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = response_text.strip()
+        self.client = client
+        self.model = settings.AI_MODEL
+        self.rate_limiter = TokenBucket(settings.AI_RATE_LIMIT_PER_MINUTE)
+        self.cache = TwoTierCache(
+            "ai:score",
+            max_entries=settings.SCORE_CACHE_MAX_ENTRIES,
+            ttl=settings.REDIS_CACHE_TTL,
+        ) if settings.SCORE_CACHE_ENABLED else None
+        self._semaphore = asyncio.Semaphore(settings.AI_MAX_CONCURRENCY)
 
-            result = json.loads(json_str)
-            result["ai_enabled"] = True
+    async def close(self) -> None:
+        """Close pooled connections"""
+        if self.client is not None:
+            await self.client.close()
 
-            logger.info(f"Lead scored: {name} - Score: {result['score']}, Priority: {result['priority']}")
+    async def create_message(self, **kwargs):
+        """
+        Call messages.create within the concurrency and rate limits
 
-            return result
+        Rate limit responses pause the shared token bucket for the time the
+        provider asks for; overloaded and connection errors are retried with
+        exponential backoff.
+        """
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            try:
+                async with self._semaphore:
+                    return await self.client.messages.create(
+                        timeout=settings.AI_REQUEST_TIMEOUT, **kwargs
+                    )
+            except (anthropic.RateLimitError, anthropic.APIConnectionError, anthropic.InternalServerError) as e:
+                if attempt == settings.AI_MAX_RETRIES:
+                    raise
+                await self._before_retry(e, attempt)
 
-        except Exception as e:
-            logger.error(f"Error scoring lead with AI: {str(e)}")
-            # Return default scoring on error
+    async def stream_message(self, **kwargs) -> AsyncIterator[str]:
+        """
+        Stream a reply's text deltas with messages.stream, within the rate limit
+
+        Streams stay open for the whole reply, so they do not take one of the
+        AI_MAX_CONCURRENCY slots scoring uses; callers cap them instead.
+        Failures before the first delta are retried like create_message,
+        later ones are raised. Closing the generator closes the response.
+        """
+        for attempt in range(settings.AI_MAX_RETRIES + 1):
+            await self.rate_limiter.acquire()
+            started = False
+            try:
+                async with self.client.messages.stream(
+                    timeout=settings.AI_REQUEST_TIMEOUT, **kwargs
+                ) as stream:
+                    async for text in stream.text_stream:
+                        started = True
+                        yield text
+                return
+            except (anthropic.RateLimitError, anthropic.APIConnectionError, anthropic.InternalServerError) as e:
+                if started or attempt == settings.AI_MAX_RETRIES:
+                    raise
+                await self._before_retry(e, attempt)
+
+    async def _before_retry(self, error: Exception, attempt: int) -> None:
+        """Pause the shared bucket on rate limits, back off on other errors"""
+        if isinstance(error, anthropic.RateLimitError):
+            delay = _retry_after(error.response) or self._backoff(attempt)
+            ai_api_retries.labels("rate_limit").inc()
+            logger.warning(f"Anthropic rate limit hit, pausing requests for {delay:.1f}s")
+            self.rate_limiter.pause(delay)
+        else:
+            delay = self._backoff(attempt)
+            ai_api_retries.labels("error").inc()
+            logger.warning(f"Anthropic request failed ({str(error)}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        return min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+
+    async def score_lead(
+        self,
+        name: str,
+        email: str,
+        company: Optional[str],
+        message: str,
+        bypass_cache: bool = False
+    ) -> dict:
+        """
+        Analyze a contact submission and provide lead scoring
+
+        Args:
+            name: Contact name
+            email: Contact email
+            company: Company name (optional)
+            message: Contact message
+            bypass_cache: Always call the model (the fresh result is still cached)
+
+        Returns:
+            Dict with score, priority, insights, and suggested_response
+        """
+        if not self.client:
+            # Return default scoring if API key not configured
+            ai_score_outcomes.labels("fallback").inc()
             return {
                 "score": 50,
                 "priority": "medium",
                 "insights": {
-                    "urgency": "medium",
+                    "urgency": "unknown",
                     "budget": "unknown",
-                    "industry": "unknown",
-                    "pain_points": []
+                    "industry": "unknown"
                 },
-                "suggested_response": "Thank you for reaching out! We appreciate your interest and will review your message carefully.",
-                "ai_enabled": False,
-                "error": str(e)
+                "suggested_response": "Thank you for your interest. We'll get back to you soon!",
+                "ai_enabled": False
             }
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = score_cache_key(self.model, name, email, company, message)
+            if not bypass_cache:
+                cached = await self.cache.get(cache_key)
+                if cached is not None:
+                    ai_score_outcomes.labels("cached").inc()
+                    return cached
+
+        started = time.perf_counter()
+        try:
+            # Call Claude API
+            response = await self.create_message(
+                model=self.model,
+                max_tokens=settings.AI_MAX_TOKENS,
+                messages=[
+                    {"role": "user", "content": build_score_prompt(name, email, company, message)}
+                ]
+            )
+
+            result = parse_score_response(response.content[0].text)
+
+            ai_score_outcomes.labels("success").inc()
+            ai_score_duration.labels("success").observe(time.perf_counter() - started)
+            logger.info(f"Lead scored: {name} - Score: {result['score']}, Priority: {result['priority']}")
+
+            if cache_key is not None:
+                await self.cache.set(cache_key, result)
+
+            return result
+
+        except Exception as e:
+            ai_score_outcomes.labels("error").inc()
+            ai_score_duration.labels("error").observe(time.perf_counter() - started)
+            logger.error(f"Error scoring lead with AI: {str(e)}")
+            # Return default scoring on error
+            return fallback_score(str(e))
+
+
+# Process-wide instance, created in the application lifespan
+_ai_service: Optional[AIService] = None
+
+
+async def init_ai_service() -> AIService:
+    """Create the shared AI service"""
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
+
+
+async def close_ai_service() -> None:
+    """Close the shared AI service and its connection pool"""
+    global _ai_service
+    if _ai_service is not None:
+        await _ai_service.close()
+        _ai_service = None
+
+
+def get_ai_service() -> AIService:
+    """
+    Get the shared AI service
+
+    Scripts that run outside the application lifespan get a lazily created
+    instance and should call close_ai_service() before exiting.
+    """
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = AIService()
+    return _ai_service
@@ -0,0 +1,236 @@
+"""
+Analytics Service
+Maintains the contact rollup tables and answers analytics queries from them
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Any
+import logging
+
+from sqlalchemy import select, delete, func, case, insert, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import ResponseCache
+from app.core.config import settings
+from app.core.database import read_session
+from app.models.analytics import ContactDailyStat, CompanyStat
+from app.models.contact import Contact
+from app.schemas.contact import CONTACT_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+def contact_day(created_at: datetime) -> date:
+    """UTC day a contact is bucketed into"""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _sum_where(value, condition, dialect: str):
+    """
+    Conditional sum for a single-pass aggregate
+
+    Postgres gets sum(...) FILTER (WHERE ...); other databases (SQLite in
+    tests) get the equivalent sum(CASE ...).
+    """
+    if dialect == "postgresql":
+        return func.coalesce(func.sum(value).filter(condition), 0)
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+class AnalyticsService:
+    """Service layer for analytics rollups"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @property
+    def dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+
+    # Rollup maintenance. These run in the caller's transaction, so the
+    # rollups commit (or roll back) together with the contact change.
+
+    async def record_created(self, contacts: list[Contact]) -> None:
+        """Count newly inserted contacts"""
+        daily = Counter((contact_day(c.created_at), c.status) for c in contacts)
+        companies = Counter(c.company for c in contacts if c.company)
+        await self.apply(daily, companies)
+
+    async def record_status_change(self, contact: Contact, old_status: str) -> None:
+        """Move a contact between status buckets"""
+        if contact.status == old_status:
+            return
+        day = contact_day(contact.created_at)
+        await self.apply(Counter({(day, old_status): -1, (day, contact.status): 1}), Counter())
+
+    async def record_deleted(self, contact: Contact) -> None:
+        """Uncount a deleted contact"""
+        daily = Counter({(contact_day(contact.created_at), contact.status): -1})
+        companies = Counter({contact.company: -1}) if contact.company else Counter()
+        await self.apply(daily, companies)
+
+    async def apply(self, daily: Counter, companies: Counter) -> None:
+        """
+        Add count deltas to the rollups with INSERT ... ON CONFLICT DO UPDATE
+
+        Args:
+            daily: Deltas keyed by (day, status)
+            companies: Deltas keyed by company name
+        """
+        daily_rows = [
+            {"day": day, "status": status, "count": delta}
+            for (day, status), delta in sorted(daily.items()) if delta
+        ]
+        company_rows = [
+            {"company": company, "count": delta}
+            for company, delta in sorted(companies.items()) if delta
+        ]
+
+        # Rows are sorted so concurrent writers lock them in the same order
+        if daily_rows:
+            stmt = self._insert(ContactDailyStat).values(daily_rows)
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[ContactDailyStat.day, ContactDailyStat.status],
+                set_={"count": ContactDailyStat.count + stmt.excluded.count},
+            ))
+
+        if company_rows:
+            stmt = self._insert(CompanyStat).values(company_rows)
+            await self.db.execute(stmt.on_conflict_do_update(
+                index_elements=[CompanyStat.company],
+                set_={"count": CompanyStat.count + stmt.excluded.count},
+            ))
+
+    def _insert(self, model):
+        if self.dialect == "postgresql":
+            return postgresql.insert(model)
+        return sqlite.insert(model)
+
+    def _day_expr(self):
+        if self.dialect == "postgresql":
+            return func.date(func.timezone('UTC', Contact.created_at))
+        return func.date(Contact.created_at)
+
+    async def rebuild(self) -> None:
+        """
+        Recompute the rollups from the contacts table
+
+        On Postgres the rollup tables are locked for the duration, so
+        concurrent contact writes wait and apply their deltas on top of the
+        rebuilt counts instead of being lost.
+        """
+        if self.dialect == "postgresql":
+            await self.db.execute(text(
+                "LOCK TABLE contact_daily_stats, company_stats IN EXCLUSIVE MODE"
+            ))
+
+        await self.db.execute(delete(ContactDailyStat))
+        await self.db.execute(delete(CompanyStat))
+
+        day = self._day_expr()
+        await self.db.execute(
+            insert(ContactDailyStat).from_select(
+                ["day", "status", "count"],
+                select(day, Contact.status, func.count(Contact.id))
+                .group_by(day, Contact.status)
+            )
+        )
+        await self.db.execute(
+            insert(CompanyStat).from_select(
+                ["company", "count"],
+                select(Contact.company, func.count(Contact.id))
+                .where(Contact.company.isnot(None))
+                .where(Contact.company != '')
+                .group_by(Contact.company)
+            )
+        )
+        await self.db.commit()
+        await analytics_cache.invalidate()
+
+        logger.info("Analytics rollups rebuilt")
+
+    # Queries
+
+    async def get_summary(self) -> dict:
+        """Totals by status and recent activity"""
+        today = datetime.now(timezone.utc).date()
+        week_start = today - timedelta(days=6)
+
+        count = ContactDailyStat.count
+        columns = [func.coalesce(func.sum(count), 0).label('total')]
+        columns += [
+            _sum_where(count, ContactDailyStat.status == status, self.dialect).label(status)
+            for status in CONTACT_STATUSES
+        ]
+        columns += [
+            _sum_where(count, ContactDailyStat.day == today, self.dialect).label('today'),
+            _sum_where(count, ContactDailyStat.day >= week_start, self.dialect).label('this_week'),
+        ]
+
+        result = await self.db.execute(select(*columns))
+        row = result.one()
+
+        total_contacts = row.total
+        by_status = {status: row._mapping[status] for status in CONTACT_STATUSES}
+
+        # Conversion rate (contacted + qualified + closed / total)
+        conversion_rate = 0
+        if total_contacts > 0:
+            converted = sum(n for status, n in by_status.items() if status != 'new')
+            conversion_rate = (converted / total_contacts) * 100
+
+        return {
+            "total_contacts": total_contacts,
+            "by_status": by_status,
+            "today": row.today,
+            "this_week": row.this_week,
+            "conversion_rate": round(conversion_rate, 2)
+        }
+
+    async def get_timeline(self, days: int) -> list[dict]:
+        """Contacts created per day over the last N days"""
+        start_day = datetime.now(timezone.utc).date() - timedelta(days=days)
+
+        result = await self.db.execute(
+            select(ContactDailyStat.day, func.sum(ContactDailyStat.count).label('count'))
+            .where(ContactDailyStat.day >= start_day)
+            .group_by(ContactDailyStat.day)
+            .having(func.sum(ContactDailyStat.count) > 0)
+            .order_by(ContactDailyStat.day)
+        )
+        return [{"date": str(row.day), "count": row.count} for row in result]
+
+    async def get_top_companies(self, limit: int) -> list[dict]:
+        """Companies with the most contacts"""
+        result = await self.db.execute(
+            select(CompanyStat.company, CompanyStat.count)
+            .where(CompanyStat.count > 0)
+            .order_by(CompanyStat.count.desc())
+            .limit(limit)
+        )
+        return [{"company": row.company, "count": row.count} for row in result]
+
+
+# Shared by every worker through Redis; ContactService invalidates it on writes
+analytics_cache = ResponseCache(
+    "analytics",
+    ttl=settings.ANALYTICS_CACHE_TTL,
+    stale_ttl=settings.ANALYTICS_CACHE_STALE_TTL,
+)
+
+
+async def get_cached(query: str, *params) -> Any:
+    """
+    Run an AnalyticsService query through the response cache
+
+    The query gets its own session, since a stale entry is refreshed in the
+    background after the request that noticed it has finished.
+    """
+    async def compute():
+        async with read_session() as db:
+            return await getattr(AnalyticsService(db), query)(*params)
+
+    return await analytics_cache.get_or_compute((query, *params), compute)
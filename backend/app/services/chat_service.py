@@ -0,0 +1,168 @@
+"""
+Chat Service
+Streams chatbot replies from the shared model client
+"""
+from typing import AsyncIterator, Optional, Sequence
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, Histogram
+from app.core.rate_limit import ServiceOverloadedError
+from app.schemas.chat import ChatMessage, ChatTurn
+from app.services.ai_service import get_ai_service
+
+logger = logging.getLogger(__name__)
+
+# completed, cancelled (client went away), error, busy (no stream slot)
+chat_replies = Counter("chat_replies_total", "Chat replies by outcome", ("outcome",))
+chat_first_token = Histogram(
+    "chat_time_to_first_token_seconds", "Time from a chat message to the first streamed text",
+    buckets=(0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0),
+)
+chat_streams_active = Gauge("chat_streams_active", "Chat replies being streamed")
+
+CHAT_SYSTEM_PROMPT = """You are the website assistant of Polímata.AI, a company that builds AI-powered business automation.
+Answer visitors' questions about the company and its services briefly and helpfully, in the language they write in.
+If you don't know something, or they want a quote or a meeting, suggest leaving their details in the contact form."""
+
+# Reply when the model is not configured
+FALLBACK_REPLY = "Gracias por tu mensaje: '{content}'. Un agente te contactará pronto."
+
+
+class ChatBusyError(ServiceOverloadedError):
+    """Raised when the process is already streaming CHAT_MAX_STREAMS replies"""
+
+    def __init__(self):
+        super().__init__("chat_streams", retry_after=1)
+
+
+class StreamSlot:
+    """One of the service's concurrent stream slots; release() is idempotent"""
+
+    def __init__(self, service: "ChatService"):
+        self._service = service
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self._service._release()
+
+
+def build_chat_messages(history: Sequence[ChatTurn], content: str) -> list[dict]:
+    """
+    Model messages for a new user message and the turns before it
+
+    Keeps the last CHAT_MAX_HISTORY turns, starting with a user turn, and
+    merges consecutive turns from the same role as the API requires
+    alternating roles.
+    """
+    turns = [(turn.role, turn.content) for turn in history[-settings.CHAT_MAX_HISTORY:]] if settings.CHAT_MAX_HISTORY else []
+    turns.append(("user", content))
+    while turns[0][0] != "user":
+        turns.pop(0)
+
+    messages: list[dict] = []
+    for role, text in turns:
+        if messages and messages[-1]["role"] == role:
+            messages[-1]["content"] += "\n\n" + text
+        else:
+            messages.append({"role": role, "content": text})
+    return messages
+
+
+class ChatService:
+    """
+    Streams chat replies
+
+    Each reply holds a slot from reserve() while it streams. Once
+    max_streams replies are in flight, new ones are turned away at once
+    (ChatBusyError, a 503) rather than queued: a chat reply that waits in a
+    queue is as bad as a slow one.
+
+    Replies are pulled from the model one delta at a time as the caller
+    iterates, so a client that reads slowly slows the upstream read instead
+    of growing a buffer, and closing the iterator closes the model stream.
+    """
+
+    def __init__(self, max_streams: int = settings.CHAT_MAX_STREAMS):
+        self.max_streams = max_streams
+        self.active = 0
+        chat_streams_active.set_function(lambda: self.active)
+
+    def reserve(self) -> StreamSlot:
+        """
+        Take a stream slot
+
+        Raises:
+            ChatBusyError: If every slot is taken
+        """
+        if self.active >= self.max_streams:
+            chat_replies.labels("busy").inc()
+            raise ChatBusyError()
+        self.active += 1
+        return StreamSlot(self)
+
+    def _release(self) -> None:
+        self.active -= 1
+
+    async def stream_reply(self, message: ChatMessage, slot: Optional[StreamSlot] = None) -> AsyncIterator[str]:
+        """
+        Stream the reply to a message
+
+        Args:
+            message: User message with the conversation so far
+            slot: Slot from reserve(), released when the reply ends
+
+        Yields:
+            Text deltas
+        """
+        started = time.perf_counter()
+        first = True
+        try:
+            ai_service = get_ai_service()
+            if ai_service.client is None:
+                chunks = _fallback(message.content)
+            else:
+                chunks = ai_service.stream_message(
+                    model=ai_service.model,
+                    max_tokens=settings.CHAT_MAX_TOKENS,
+                    system=CHAT_SYSTEM_PROMPT,
+                    messages=build_chat_messages(message.history, message.content),
+                )
+
+            try:
+                async for text in chunks:
+                    if first:
+                        first = False
+                        chat_first_token.observe(time.perf_counter() - started)
+                    yield text
+            finally:
+                await chunks.aclose()
+
+        except (asyncio.CancelledError, GeneratorExit):
+            chat_replies.labels("cancelled").inc()
+            raise
+        except Exception as e:
+            chat_replies.labels("error").inc()
+            logger.error(f"Error streaming chat reply: {str(e)}")
+            raise
+        else:
+            chat_replies.labels("completed").inc()
+        finally:
+            if slot is not None:
+                slot.release()
+
+    def stats(self) -> dict:
+        """Streams in flight"""
+        return {"active": self.active, "max_streams": self.max_streams}
+
+
+async def _fallback(content: str) -> AsyncIterator[str]:
+    yield FALLBACK_REPLY.format(content=content)
+
+
+# Process-wide instance, so the stream cap covers every connection
+chat_service = ChatService()
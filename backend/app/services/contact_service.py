@@ -2,66 +2,286 @@
 Contact Service
 Business logic for contact operations
 """
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.contact import Contact
-from app.schemas.contact import ContactCreate
-from app.services.ai_service import AIService
-from typing import Optional
+from sqlalchemy.exc import IntegrityError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy import Float, Row, and_, cast, literal, or_, select, func, text, tuple_
+from sqlalchemy.orm import load_only
+from app.core.cache import TwoTierCache
+from app.core.config import settings
+from app.core.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from app.models.contact import SEARCH_CONFIG, SEARCH_DDL, Contact, contact_search_vector
+from app.schemas.contact import CONTACT_SUMMARY_FIELDS, ContactCreate, ContactFilters
+from app.services.analytics_service import AnalyticsService, analytics_cache
+from app.services.embedding_service import embedding_index
+from app.services.scoring_queue import scoring_queue
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional, Sequence, Tuple
+import asyncio
+import hashlib
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Search terms beyond this are ignored
+MAX_SEARCH_TERMS = 8
+
+SNIPPET_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxWords=25, MinWords=10, MaxFragments=2"
+
+# Messages come from the public form; escaped before <mark> tags are added
+_HTML_ESCAPES = (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;"))
+
+# Advisory lock id held while creating the search schema at startup
+SEARCH_SCHEMA_LOCK = 7_000_001
+
+
+def _sort_expression(sort_key: str):
+    """SQL expression a sort key orders by (matching the contacts indexes)"""
+    if sort_key == "ai_score":
+        # Unscored contacts sort below every score
+        return func.coalesce(Contact.ai_score, -1)
+    return Contact.created_at
+
+
+# Type of each sort expression's value in a cursor
+_SORT_VALUE_TYPES = {"ai_score": int, "created_at": datetime}
+
+
+def _sort_value(contact: Contact, sort_key: str):
+    """Value of the sort expression for a loaded contact"""
+    if sort_key == "ai_score":
+        return contact.ai_score if contact.ai_score is not None else -1
+    return contact.created_at
+
+
+def _html_escape(expression):
+    """SQL expression HTML-escaping a text expression (& first, so entities are not escaped twice)"""
+    for char, entity in _HTML_ESCAPES:
+        expression = func.replace(expression, char, entity)
+    return expression
+
+
+def _filter_conditions(filters: ContactFilters) -> list:
+    """WHERE clauses for the list filters"""
+    conditions = []
+    if filters.status is not None:
+        conditions.append(Contact.status == filters.status)
+    if filters.ai_priority is not None:
+        conditions.append(Contact.ai_priority == filters.ai_priority)
+    if filters.min_score is not None:
+        conditions.append(Contact.ai_score >= filters.min_score)
+    if filters.max_score is not None:
+        conditions.append(Contact.ai_score <= filters.max_score)
+    if filters.company is not None:
+        conditions.append(func.lower(Contact.company) == filters.company.lower())
+    if filters.created_after is not None:
+        conditions.append(Contact.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conditions.append(Contact.created_at < filters.created_before)
+    return conditions
+
+
+# Contact ids of recent submissions, so repeats return the original without a
+# write or a scoring call. Keys are Idempotency-Key digests or submission hashes.
+idempotency_cache = TwoTierCache("contacts:idempotency", 10000, settings.IDEMPOTENCY_KEY_TTL)
+submission_cache = TwoTierCache("contacts:submission", 10000, max(settings.CONTACT_DEDUPE_WINDOW, 1))
+
+
+class SearchUnavailableError(RuntimeError):
+    """Raised when the full-text search column or pg_trgm is missing (run migrate.py)"""
+
+
+async def ensure_search_schema(engine: AsyncEngine) -> None:
+    """
+    Create the full-text search column and indexes on PostgreSQL if missing
+
+    create_all cannot make the generated search_vector column, so a fresh
+    database would fail every search until migrate.py ran. Nothing is locked
+    when both search indexes exist (ALTER TABLE would lock contacts even as a
+    no-op); otherwise an advisory lock keeps workers starting together from
+    racing. Failures (e.g. no permission to create pg_trgm) are logged and
+    leave search answering 503.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    try:
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            present = await conn.scalar(text(
+                "SELECT to_regclass('ix_contacts_search') IS NOT NULL "
+                "AND to_regclass('ix_contacts_company_trgm') IS NOT NULL"
+            ))
+            if present:
+                return
+            logger.info("Creating the contact search column and indexes")
+            await conn.execute(select(func.pg_advisory_lock(SEARCH_SCHEMA_LOCK)))
+            try:
+                for statement in SEARCH_DDL:
+                    await conn.exec_driver_sql(statement)
+            finally:
+                await conn.execute(select(func.pg_advisory_unlock(SEARCH_SCHEMA_LOCK)))
+    except Exception as e:
+        logger.warning(f"Could not create the contact search schema, run migrate.py: {str(e)}")
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Raised when an Idempotency-Key comes back with a different submission"""
+
+
+def submission_hash(contact_data: ContactCreate) -> str:
+    """Hash of what makes two submissions the same: email and message, normalized"""
+    message = " ".join(contact_data.message.split())
+    return hashlib.sha256(f"{contact_data.email.lower()}\n{message}".encode("utf-8")).hexdigest()
+
+
+def _search_terms(query: str) -> list[str]:
+    """Words of a search query, safe to splice into a tsquery"""
+    return re.findall(r"\w+", query.lower())[:MAX_SEARCH_TERMS]
+
 
 class ContactService:
     """Service layer for contact operations"""
 
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.ai_service = AIService()
+        self.analytics = AnalyticsService(db)
 
-    async def create_contact(self, contact_data: ContactCreate) -> Contact:
+    async def create_contact(
+        self,
+        contact_data: ContactCreate,
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[Contact, bool]:
         """
-        Create new contact entry with AI lead scoring
+        Create new contact entry and queue it for AI lead scoring
+
+        Repeated submissions return the original contact instead: the same
+        Idempotency-Key at any time, or without a key, the same email and
+        message within CONTACT_DEDUPE_WINDOW seconds. An identical submission
+        still being created is waited for (up to SUBMISSION_WAIT seconds).
 
         Args:
             contact_data: Validated contact data
+            idempotency_key: Client-chosen key identifying this submission
 
         Returns:
-            Created contact object with AI scoring
+            The contact, with ai_status 'pending' until a worker scores it,
+            and whether it was created by this call
+
+        Raises:
+            IdempotencyKeyReusedError: If the key was used for a different submission
         """
+        content_hash = submission_hash(contact_data)
+        if idempotency_key:
+            cache, cache_key = idempotency_cache, hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+        elif settings.CONTACT_DEDUPE_WINDOW > 0:
+            cache, cache_key = submission_cache, content_hash
+        else:
+            cache = cache_key = None
+
+        if cache is not None:
+            existing = await self._find_submission(cache, cache_key, idempotency_key, content_hash)
+            if existing is None and not await cache.add(f"claim:{cache_key}", 1):
+                # An identical request is creating it right now
+                existing = await self._wait_for_submission(cache, cache_key, idempotency_key, content_hash)
+            if existing is not None:
+                if idempotency_key and existing.submission_hash != content_hash:
+                    raise IdempotencyKeyReusedError(idempotency_key)
+                return existing, False
+
         # Create contact instance
-        contact = Contact(**contact_data.model_dump())
+        contact = Contact(
+            **contact_data.model_dump(),
+            idempotency_key=idempotency_key,
+            submission_hash=content_hash,
+        )
 
-        # Add to database first
-        self.db.add(contact)
-        await self.db.commit()
+        # Insert the contact and its scoring job in one transaction
+        try:
+            self.db.add(contact)
+            await self.db.flush()
+            await scoring_queue.enqueue(self.db, [contact.id])
+            await self.analytics.record_created([contact])
+            await self.db.commit()
+        except IntegrityError:
+            # Another process stored the same Idempotency-Key first
+            await self.db.rollback()
+            existing = await self._find_submission(None, None, idempotency_key, content_hash) if idempotency_key else None
+            if existing is None:
+                if cache is not None:
+                    await cache.delete(f"claim:{cache_key}")
+                raise
+            if existing.submission_hash != content_hash:
+                raise IdempotencyKeyReusedError(idempotency_key)
+            return existing, False
+        except Exception:
+            if cache is not None:
+                await cache.delete(f"claim:{cache_key}")
+            raise
         await self.db.refresh(contact)
 
-        # Score the lead with AI (async, non-blocking)
-        try:
-            ai_score = await self.ai_service.score_lead(
-                name=contact.name,
-                email=contact.email,
-                company=contact.company,
-                message=contact.message
-            )
+        if cache is not None:
+            await cache.set(cache_key, contact.id)
+        scoring_queue.publish(self.db)
+        await analytics_cache.invalidate()
 
-            # Update contact with AI insights
-            contact.ai_score = ai_score.get('score')
-            contact.ai_priority = ai_score.get('priority')
-            contact.ai_insights = ai_score.get('insights')
-            contact.ai_suggested_response = ai_score.get('suggested_response')
+        return contact, True
 
-            await self.db.commit()
-            await self.db.refresh(contact)
+    async def _find_submission(
+        self,
+        cache: Optional[TwoTierCache],
+        cache_key: Optional[str],
+        idempotency_key: Optional[str],
+        content_hash: str
+    ) -> Optional[Contact]:
+        """Earlier contact from the same submission, from the cache or the database"""
+        if cache is not None:
+            contact_id = await cache.get(cache_key)
+            if contact_id is not None:
+                contact = await self.get_contact(contact_id)
+                if contact is not None:
+                    return contact
 
-            logger.info(f"Contact {contact.id} scored: {ai_score.get('score')} ({ai_score.get('priority')})")
+        if idempotency_key:
+            condition = Contact.idempotency_key == idempotency_key
+        else:
+            since = datetime.now(timezone.utc) - timedelta(seconds=settings.CONTACT_DEDUPE_WINDOW)
+            condition = and_(Contact.submission_hash == content_hash, Contact.created_at >= since)
+        result = await self.db.execute(select(Contact).where(condition).order_by(Contact.id).limit(1))
+        return result.scalar_one_or_none()
+
+    async def _wait_for_submission(
+        self,
+        cache: TwoTierCache,
+        cache_key: str,
+        idempotency_key: Optional[str],
+        content_hash: str
+    ) -> Optional[Contact]:
+        """Poll for an in-flight identical submission; None if it does not show up in time"""
+        deadline = asyncio.get_running_loop().time() + settings.SUBMISSION_WAIT
+        while asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.05)
+            contact_id = await cache.get(cache_key)
+            if contact_id is not None:
+                return await self.get_contact(contact_id)
+        return await self._find_submission(None, None, idempotency_key, content_hash)
+
+    async def rescore_contact(self, contact_id: int) -> Optional[Contact]:
+        """
+        Queue a contact for scoring again, bypassing the score cache
 
-        except Exception as e:
-            logger.error(f"Error scoring lead {contact.id}: {str(e)}")
-            # Continue without AI scoring if it fails
+        Args:
+            contact_id: Contact ID
 
+        Returns:
+            Contact object with ai_status 'pending', or None if not found
+        """
+        contact = await self.get_contact(contact_id)
+        if contact:
+            contact.ai_status = 'pending'
+            await scoring_queue.enqueue(self.db, [contact.id], force=True)
+            await self.db.commit()
+            await self.db.refresh(contact)
+            scoring_queue.publish(self.db)
         return contact
 
     async def get_contact(self, contact_id: int) -> Optional[Contact]:
@@ -79,6 +299,24 @@ class ContactService:
         )
         return result.scalar_one_or_none()
 
+    async def get_summaries(self, contact_ids: Sequence[int]) -> dict[int, Row]:
+        """
+        Summary columns of several contacts
+
+        Args:
+            contact_ids: Contact IDs; missing ones are left out
+
+        Returns:
+            Rows keyed by contact ID
+        """
+        if not contact_ids:
+            return {}
+        result = await self.db.execute(
+            select(*(getattr(Contact, name) for name in CONTACT_SUMMARY_FIELDS))
+            .where(Contact.id.in_(contact_ids))
+        )
+        return {row.id: row for row in result}
+
     async def get_contacts_by_email(self, email: str) -> list[Contact]:
         """
         Get all contacts by email
@@ -94,27 +332,207 @@ class ContactService:
         )
         return result.scalars().all()
 
-    async def list_contacts(self, skip: int = 0, limit: int = 100) -> list[Contact]:
-        """List all contacts with pagination"""
-        result = await self.db.execute(
-            select(Contact).order_by(Contact.created_at.desc()).offset(skip).limit(limit)
+    async def list_contacts(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[ContactFilters] = None,
+        sort: str = "-created_at",
+        fields: Optional[Sequence[str]] = None
+    ) -> Tuple[list[Contact], Optional[str]]:
+        """
+        List contacts matching the filters, newest first by default
+
+        Pages are addressed either by offset (skip) or, much cheaper for deep
+        pages, by the cursor returned with the previous page.
+
+        Args:
+            skip: Number of contacts to skip (ignored when cursor is given)
+            limit: Page size
+            cursor: Opaque cursor from a previous page with the same sort
+            filters: Server-side filters
+            sort: One of CONTACT_SORT_KEYS, prefixed with "-" for descending
+            fields: Load only these columns (the rest are left unloaded and
+                must not be accessed); all columns when None
+
+        Returns:
+            Contacts and the cursor of the next page (None on the last page)
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or from another sort
+        """
+        descending = sort.startswith("-")
+        sort_key = sort.lstrip("-")
+        sort_expr = _sort_expression(sort_key)
+
+        query = select(Contact).where(*_filter_conditions(filters or ContactFilters()))
+        if fields is not None:
+            # The sort column is needed for the next cursor
+            columns = {*fields, sort_key}
+            query = query.options(load_only(*(getattr(Contact, name) for name in columns)))
+        if descending:
+            query = query.order_by(sort_expr.desc(), Contact.id.desc())
+        else:
+            query = query.order_by(sort_expr.asc(), Contact.id.asc())
+
+        if cursor:
+            cursor_sort, value, contact_id = decode_cursor(cursor, (str, _SORT_VALUE_TYPES[sort_key], int))
+            if cursor_sort != sort:
+                raise InvalidCursorError("Cursor was issued for a different sort")
+            key = tuple_(sort_expr, Contact.id)
+            query = query.where(key < (value, contact_id) if descending else key > (value, contact_id))
+        else:
+            query = query.offset(skip)
+
+        # Fetch one extra row to know whether there is a next page
+        result = await self.db.execute(query.limit(limit + 1))
+        contacts = result.scalars().all()
+
+        next_cursor = None
+        if len(contacts) > limit:
+            contacts = contacts[:limit]
+            last = contacts[-1]
+            next_cursor = encode_cursor([sort, _sort_value(last, sort_key), last.id])
+
+        return contacts, next_cursor
+
+    async def search_contacts(
+        self,
+        query: str,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> Tuple[list[Row], Optional[str]]:
+        """
+        Full-text search over name, email, company and message, best match first
+
+        Every word must match the start of a word in the contact (so partial
+        names work), or the whole query must resemble the company name
+        (trigram similarity, which tolerates typos). On PostgreSQL both are
+        answered from GIN indexes; other databases fall back to an unranked
+        substring match.
+
+        Args:
+            query: Words to look for
+            limit: Page size
+            cursor: Cursor returned with the previous page of the same query
+
+        Returns:
+            Rows with the summary columns plus rank and snippet, and the cursor
+            of the next page (None on the last page)
+
+        Raises:
+            InvalidCursorError: If the cursor is malformed or from another query
+            SearchUnavailableError: If the search schema was never created
+        """
+        terms = _search_terms(query)
+        if not terms:
+            return [], None
+
+        if self.db.get_bind().dialect.name == "postgresql":
+            tsquery = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+            match = or_(contact_search_vector.op("@@")(tsquery), Contact.company.op("%")(query))
+            rank = cast(
+                func.ts_rank_cd(contact_search_vector, tsquery)
+                + func.coalesce(func.similarity(Contact.company, query), 0),
+                Float,
+            )
+            snippet = func.ts_headline(SEARCH_CONFIG, _html_escape(Contact.message), tsquery, SNIPPET_OPTIONS)
+        else:
+            columns = (Contact.name, Contact.email, Contact.company, Contact.message)
+            match = and_(*(or_(*(column.ilike(f"%{term}%") for column in columns)) for term in terms))
+            rank = cast(literal(0), Float)
+            snippet = _html_escape(func.substr(Contact.message, 1, 200))
+
+        # Rank and page the matches first; snippets are only built for the page
+        ranked = select(Contact.id, rank.label("rank")).where(match)
+        if cursor:
+            cursor_query, cursor_rank, contact_id = decode_cursor(cursor, (str, float, int))
+            if cursor_query != query:
+                raise InvalidCursorError("Cursor was issued for a different query")
+            ranked = ranked.where(tuple_(rank, Contact.id) < (cursor_rank, contact_id))
+        ranked = (
+            ranked.order_by(rank.desc(), Contact.id.desc())
+            .limit(limit + 1)
+            .subquery()
         )
-        return result.scalars().all()
+
+        try:
+            result = await self.db.execute(
+                select(
+                    *(getattr(Contact, name) for name in CONTACT_SUMMARY_FIELDS),
+                    ranked.c.rank,
+                    snippet.label("snippet"),
+                )
+                .join(ranked, Contact.id == ranked.c.id)
+                .order_by(ranked.c.rank.desc(), Contact.id.desc())
+            )
+        except ProgrammingError as e:
+            # Undefined search_vector column or pg_trgm operator
+            logger.error(f"Contact search schema is missing: {str(e)}")
+            await self.db.rollback()
+            raise SearchUnavailableError("Contact search is not set up; run migrate.py") from e
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([query, last.rank, last.id])
+
+        return rows, next_cursor
+
+    async def stream_contacts(
+        self,
+        filters: Optional[ContactFilters] = None,
+        fields: Sequence[str] = (),
+        batch_size: int = settings.EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[Sequence[Row]]:
+        """
+        Stream contacts matching the filters, in id order
+
+        Rows come from a server-side cursor as plain column tuples, so memory
+        stays flat however many contacts match and nothing is kept in the
+        session's identity map.
+
+        Args:
+            filters: Server-side filters, as for list_contacts
+            fields: Columns to select
+            batch_size: Rows fetched per round trip
+
+        Yields:
+            Batches of up to batch_size rows
+        """
+        query = (
+            select(*(getattr(Contact, name) for name in fields))
+            .where(*_filter_conditions(filters or ContactFilters()))
+            .order_by(Contact.id)
+            .execution_options(yield_per=batch_size)
+        )
+        result = await self.db.stream(query)
+        async for rows in result.partitions():
+            yield rows
 
     async def update_contact_status(self, contact_id: int, status: str) -> Optional[Contact]:
         """Update contact status"""
         contact = await self.get_contact(contact_id)
         if contact:
+            old_status = contact.status
             contact.status = status
+            await self.analytics.record_status_change(contact, old_status)
             await self.db.commit()
             await self.db.refresh(contact)
+            await analytics_cache.invalidate()
         return contact
 
     async def delete_contact(self, contact_id: int) -> bool:
         """Delete contact"""
         contact = await self.get_contact(contact_id)
         if contact:
+            await self.analytics.record_deleted(contact)
             await self.db.delete(contact)
             await self.db.commit()
+            embedding_index.remove([contact_id])
+            await analytics_cache.invalidate()
             return True
         return False
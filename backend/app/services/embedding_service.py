@@ -0,0 +1,443 @@
+"""
+Embedding Service
+Contact embeddings for similarity search and duplicate detection
+"""
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+import asyncio
+import hashlib
+import logging
+import re
+import time
+
+import numpy as np
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.contact import Contact
+from app.models.embedding import ContactEmbedding
+
+logger = logging.getLogger(__name__)
+
+# Rows read per round trip when loading the in-process index
+_LOAD_BATCH_SIZE = 10000
+
+# Refreshes re-read this much of the previous window, for commits that land
+# after a refresh with an earlier timestamp
+_REFRESH_OVERLAP = timedelta(seconds=10)
+
+# Session.info key of vectors waiting for their transaction to commit
+_PENDING_KEY = "embedding_index_pending"
+
+
+def contact_text(name: str, company: Optional[str], message: str) -> str:
+    """Text a contact is embedded from"""
+    return f"{name}\n{company or ''}\n{message}"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length, so dot products are cosine similarities"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """
+    Deterministic signed feature hashing of words and character trigrams
+
+    Needs no model download and gives identical vectors in every process,
+    which makes it suitable for tests and as the default. Trigrams make it
+    robust to small spelling differences ("Acme Inc" vs "ACME, Inc.").
+    """
+
+    def __init__(self, dim: int = settings.EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    @staticmethod
+    def _features(text: str) -> list[str]:
+        words = re.findall(r"\w+", text.lower())
+        trigrams = [f"#{word[i:i + 3]}" for word in words for i in range(max(1, len(word) - 2))]
+        return words + trigrams
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 matrix of unit rows"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text_ in enumerate(texts):
+            features = self._features(text_)
+            if not features:
+                continue
+            digests = b"".join(hashlib.blake2b(f.encode(), digest_size=8).digest() for f in features)
+            hashes = np.frombuffer(digests, dtype=np.uint64)
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix[row], (hashes % np.uint64(self.dim)).astype(np.intp), signs)
+        return _normalize(matrix)
+
+
+class SentenceTransformerEmbedder:
+    """Local CPU embedding model (needs the optional sentence-transformers package)"""
+
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 matrix of unit rows"""
+        return self.model.encode(
+            list(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+
+_embedder = None
+
+
+def get_embedder():
+    """Process-wide embedder selected by EMBEDDING_BACKEND"""
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDING_BACKEND == "sentence-transformers":
+            _embedder = SentenceTransformerEmbedder()
+        else:
+            _embedder = HashingEmbedder()
+    return _embedder
+
+
+async def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    """Embed off the event loop when a model is doing the work"""
+    embedder = get_embedder()
+    if isinstance(embedder, HashingEmbedder):
+        return embedder.embed(texts)
+    return await asyncio.to_thread(embedder.embed, texts)
+
+
+class EmbeddingIndex:
+    """
+    In-process nearest-neighbour index over the stored vectors
+
+    Vectors live in one float32 matrix, so a query is a single matrix-vector
+    product. New vectors are buffered and merged on the next search; vectors
+    stored by other processes are picked up every EMBEDDING_INDEX_REFRESH
+    seconds. Deletions are not, so callers drop ids that no longer exist
+    (see EmbeddingService.nearest). Memory is rows x dim x 4 bytes; for
+    millions of contacts use EMBEDDING_STORE=pgvector instead.
+    """
+
+    def __init__(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._matrix: Optional[np.ndarray] = None
+        self._pending: list[tuple[np.ndarray, np.ndarray]] = []
+        self._loaded_until: Optional[datetime] = None
+        self._refreshed_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        self._merge()
+        return len(self._ids)
+
+    def add(self, contact_ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Add or replace vectors"""
+        if len(contact_ids):
+            self._pending.append((np.asarray(contact_ids, dtype=np.int64), vectors.astype(np.float32)))
+
+    def stage(self, session: AsyncSession, contact_ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Hold vectors stored in a session's transaction until publish()"""
+        session.info.setdefault(_PENDING_KEY, []).append((contact_ids, vectors))
+
+    def publish(self, session: AsyncSession) -> None:
+        """Add the vectors staged in a session, once its transaction is committed"""
+        for contact_ids, vectors in session.info.pop(_PENDING_KEY, []):
+            self.add(contact_ids, vectors)
+
+    def discard(self, session: AsyncSession) -> None:
+        """Forget the vectors staged in a session that was rolled back"""
+        session.info.pop(_PENDING_KEY, None)
+
+    def remove(self, contact_ids: Sequence[int]) -> None:
+        """Drop the vectors of deleted contacts"""
+        self._merge()
+        if len(self._ids):
+            keep = ~np.isin(self._ids, np.asarray(contact_ids, dtype=np.int64))
+            self._ids, self._matrix = self._ids[keep], self._matrix[keep]
+
+    def _fresh(self) -> bool:
+        return self._refreshed_at is not None and time.monotonic() - self._refreshed_at < settings.EMBEDDING_INDEX_REFRESH
+
+    async def refresh(self, db: AsyncSession, model: str) -> None:
+        """Load vectors written since the last refresh, by this or any other process"""
+        if self._fresh():
+            return
+
+        async with self._lock:
+            if self._fresh():
+                return
+            query = (
+                select(ContactEmbedding.contact_id, ContactEmbedding.vector, ContactEmbedding.updated_at)
+                .where(ContactEmbedding.model == model)
+                .order_by(ContactEmbedding.updated_at, ContactEmbedding.contact_id)
+                .limit(_LOAD_BATCH_SIZE)
+            )
+            if self._loaded_until is not None:
+                query = query.where(ContactEmbedding.updated_at >= self._loaded_until - _REFRESH_OVERLAP)
+
+            position = None
+            while True:
+                page = query
+                if position is not None:
+                    page = page.where(tuple_(ContactEmbedding.updated_at, ContactEmbedding.contact_id) > position)
+                rows = (await db.execute(page)).all()
+                if not rows:
+                    break
+                ids = np.fromiter((row.contact_id for row in rows), dtype=np.int64, count=len(rows))
+                vectors = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32)
+                self.add(ids, vectors.reshape(len(rows), -1))
+                position = (rows[-1].updated_at, rows[-1].contact_id)
+                self._loaded_until = rows[-1].updated_at
+            self._refreshed_at = time.monotonic()
+
+    def _merge(self) -> None:
+        if not self._pending:
+            return
+        ids = np.concatenate([self._ids, *(ids for ids, _ in self._pending)])
+        parts = [vectors for _, vectors in self._pending]
+        if self._matrix is not None:
+            parts.insert(0, self._matrix)
+        matrix = np.concatenate(parts)
+        self._pending = []
+
+        # Keep the newest vector of ids that were added more than once
+        _, last = np.unique(ids[::-1], return_index=True)
+        keep = np.sort(len(ids) - 1 - last)
+        self._ids, self._matrix = ids[keep], matrix[keep]
+
+    def search(
+        self,
+        vector: np.ndarray,
+        limit: int,
+        exclude: Optional[int] = None,
+        before: Optional[int] = None
+    ) -> list[tuple[int, float]]:
+        """
+        Closest contacts by cosine similarity
+
+        Args:
+            vector: Unit query vector
+            limit: Maximum number of results
+            exclude: Contact id to leave out (usually the query contact)
+            before: Only consider contacts with a lower id
+
+        Returns:
+            (contact id, similarity) pairs, most similar first
+        """
+        self._merge()
+        if self._matrix is None or not len(self._ids):
+            return []
+
+        scores = self._matrix @ vector.astype(np.float32)
+        if exclude is not None:
+            scores[self._ids == exclude] = -np.inf
+        if before is not None:
+            scores[self._ids >= before] = -np.inf
+
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (int(self._ids[i]), float(scores[i]))
+            for i in top if np.isfinite(scores[i])
+        ]
+
+
+# Process-wide index, loaded lazily on first search
+embedding_index = EmbeddingIndex()
+
+
+def _vector_literal(vector: np.ndarray) -> str:
+    """pgvector text input"""
+    return "[" + ",".join(f"{value:.6g}" for value in vector.tolist()) + "]"
+
+
+class EmbeddingService:
+    """Service layer for contact embeddings"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @property
+    def _pgvector(self) -> bool:
+        return settings.EMBEDDING_STORE == "pgvector" and self.db.get_bind().dialect.name == "postgresql"
+
+    def _insert(self):
+        if self.db.get_bind().dialect.name == "postgresql":
+            return postgresql.insert(ContactEmbedding)
+        return sqlite.insert(ContactEmbedding)
+
+    async def embed_contacts(self, contacts: Sequence[Contact]) -> np.ndarray:
+        """
+        Compute and store the embeddings of contacts, in the caller's transaction
+
+        The in-process index gets them from embedding_index.publish(db) once
+        the caller commits (or from its next refresh).
+
+        Returns:
+            (len(contacts), dim) matrix of unit vectors
+        """
+        if not contacts:
+            return np.empty((0, get_embedder().dim), dtype=np.float32)
+
+        vectors = await embed_texts([contact_text(c.name, c.company, c.message) for c in contacts])
+        await self.store_vectors(contacts, vectors)
+        return vectors
+
+    async def store_vectors(self, contacts: Sequence[Contact], vectors: np.ndarray) -> None:
+        """Store already computed embeddings of contacts, in the caller's transaction"""
+        model = get_embedder().name
+        stmt = self._insert().values([
+            {"contact_id": contact.id, "model": model, "vector": vector.tobytes()}
+            for contact, vector in zip(contacts, vectors)
+        ])
+        await self.db.execute(stmt.on_conflict_do_update(
+            index_elements=[ContactEmbedding.contact_id],
+            set_={"model": stmt.excluded.model, "vector": stmt.excluded.vector, "updated_at": func.now()},
+        ))
+        if self._pgvector:
+            await self.db.execute(
+                text("UPDATE contact_embeddings SET embedding = CAST(:vector AS vector) WHERE contact_id = :contact_id"),
+                [
+                    {"contact_id": contact.id, "vector": _vector_literal(vector)}
+                    for contact, vector in zip(contacts, vectors)
+                ],
+            )
+        else:
+            embedding_index.stage(self.db, [contact.id for contact in contacts], vectors)
+
+    async def get_vector(self, contact: Contact) -> np.ndarray:
+        """Stored embedding of a contact, computed (but not stored) if missing"""
+        result = await self.db.execute(
+            select(ContactEmbedding.vector).where(
+                ContactEmbedding.contact_id == contact.id,
+                ContactEmbedding.model == get_embedder().name,
+            )
+        )
+        stored = result.scalar_one_or_none()
+        if stored is not None:
+            return np.frombuffer(stored, dtype=np.float32)
+        return (await embed_texts([contact_text(contact.name, contact.company, contact.message)]))[0]
+
+    async def nearest(
+        self,
+        vector: np.ndarray,
+        limit: int,
+        exclude: Optional[int] = None,
+        before: Optional[int] = None
+    ) -> list[tuple[int, float]]:
+        """
+        Closest stored contacts by cosine similarity, most similar first
+
+        Uses the pgvector HNSW index with EMBEDDING_STORE=pgvector, the
+        in-process index otherwise (see EmbeddingIndex.search).
+        """
+        if not self._pgvector:
+            await embedding_index.refresh(self.db, get_embedder().name)
+            while True:
+                neighbours = embedding_index.search(vector, limit, exclude=exclude, before=before)
+                if not neighbours:
+                    return neighbours
+                ids = [contact_id for contact_id, _ in neighbours]
+                result = await self.db.execute(select(Contact.id).where(Contact.id.in_(ids)))
+                missing = set(ids) - set(result.scalars())
+                if not missing:
+                    return neighbours
+                # Deleted, here or by another process, since the index loaded them
+                embedding_index.remove(list(missing))
+
+        conditions = ["embedding IS NOT NULL"]
+        params = {"vector": _vector_literal(vector), "limit": limit}
+        if exclude is not None:
+            conditions.append("contact_id <> :exclude")
+            params["exclude"] = exclude
+        if before is not None:
+            conditions.append("contact_id < :before")
+            params["before"] = before
+        result = await self.db.execute(
+            text(
+                "SELECT contact_id, 1 - (embedding <=> CAST(:vector AS vector)) AS similarity "
+                f"FROM contact_embeddings WHERE {' AND '.join(conditions)} "
+                "ORDER BY embedding <=> CAST(:vector AS vector) LIMIT :limit"
+            ),
+            params,
+        )
+        return [(row.contact_id, float(row.similarity)) for row in result]
+
+    async def similar_contacts(self, contact: Contact, limit: int, min_similarity: float) -> list[tuple[int, float]]:
+        """Contacts most similar to the given one, at least min_similarity alike"""
+        vector = await self.get_vector(contact)
+        neighbours = await self.nearest(vector, limit, exclude=contact.id)
+        return [(contact_id, similarity) for contact_id, similarity in neighbours if similarity >= min_similarity]
+
+    async def find_duplicate(self, contact: Contact, vector: Optional[np.ndarray] = None) -> Optional[Contact]:
+        """
+        Embed a new contact and look for an earlier contact it duplicates
+
+        The embedding is stored in the caller's transaction either way.
+        Duplicates of duplicates resolve to the first contact of the chain.
+
+        Args:
+            contact: New contact
+            vector: Its embedding, if computed beforehand (e.g. outside a transaction)
+
+        Returns:
+            The earlier contact at least EMBEDDING_DUPLICATE_THRESHOLD similar,
+            or None
+        """
+        if vector is None:
+            vector = (await self.embed_contacts([contact]))[0]
+        else:
+            await self.store_vectors([contact], vector[np.newaxis])
+        if settings.EMBEDDING_DUPLICATE_THRESHOLD <= 0:
+            return None
+
+        neighbours = await self.nearest(vector, 1, before=contact.id)
+        if not neighbours or neighbours[0][1] < settings.EMBEDDING_DUPLICATE_THRESHOLD:
+            return None
+
+        original = await self.db.get(Contact, neighbours[0][0])
+        if original is not None and original.duplicate_of_id is not None:
+            original = await self.db.get(Contact, original.duplicate_of_id) or original
+        return original
+
+    async def backfill(self, batch_size: int = 500, reembed: bool = False) -> int:
+        """
+        Embed contacts that have no embedding from the current model
+
+        Args:
+            batch_size: Contacts embedded per transaction
+            reembed: Recompute every embedding, e.g. after enabling pgvector
+
+        Returns:
+            Number of contacts embedded
+        """
+        model = get_embedder().name
+        embedded = 0
+        after_id = 0
+        while True:
+            query = select(Contact).where(Contact.id > after_id).order_by(Contact.id).limit(batch_size)
+            if not reembed:
+                current = select(ContactEmbedding.contact_id).where(ContactEmbedding.model == model)
+                query = query.where(Contact.id.not_in(current))
+            contacts = (await self.db.execute(query)).scalars().all()
+            if not contacts:
+                break
+            await self.embed_contacts(contacts)
+            await self.db.commit()
+            embedding_index.publish(self.db)
+            embedded += len(contacts)
+            after_id = contacts[-1].id
+            # Nothing read from these objects again; keep the session small
+            self.db.expunge_all()
+            logger.info(f"Embedded {embedded} contacts")
+        return embedded
@@ -0,0 +1,185 @@
+"""
+Export Service
+Streams contacts out as CSV, NDJSON or Parquet
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional, Sequence
+import csv
+import io
+import json
+
+from sqlalchemy import DateTime, Integer, Row
+
+from app.core.database import read_session
+from app.models.contact import Contact
+from app.schemas.contact import ContactFilters, ContactResponse
+from app.services.contact_service import ContactService
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Every column a contact response has, id first
+EXPORT_FIELDS = ("id", *(name for name in ContactResponse.model_fields if name != "id"))
+
+
+class ExportUnavailableError(RuntimeError):
+    """Raised when a format's optional dependency is not installed"""
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _cell(value: Any) -> Any:
+    """Flatten a value for CSV and Parquet (insights become JSON text)"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return _cell(value)
+
+
+def _csv_batch(rows: Sequence[Row], header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_FIELDS)
+    writer.writerows([_csv_cell(value) for value in row] for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _ndjson_batch(rows: Sequence[Row]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default) + "\n" for row in rows
+    ).encode("utf-8")
+
+
+class _ChunkSink:
+    """
+    Write-only file object that hands written bytes back in pieces
+
+    ParquetWriter needs a file with a position; the bytes are drained after
+    every row group so only one batch is ever held in memory.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_type(pa, column_type):
+    """Arrow type for a contacts column; everything but numbers and times is text (insights as JSON)"""
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us", tz="UTC")
+    return pa.string()
+
+
+def _parquet_schema(pa):
+    # Typed from the model, so new exported columns get a matching Arrow type
+    columns = Contact.__table__.columns
+    return pa.schema([(name, _parquet_type(pa, columns[name].type)) for name in EXPORT_FIELDS])
+
+
+def check_format(file_format: str) -> None:
+    """
+    Fail early, before any response is sent, if a format cannot be produced
+
+    Raises:
+        ValueError: If the format is unknown
+        ExportUnavailableError: If the format needs pyarrow and it is missing
+    """
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {file_format}")
+    if file_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportUnavailableError("Parquet export requires pyarrow")
+
+
+async def export_contacts(file_format: str, filters: Optional[ContactFilters] = None) -> AsyncIterator[bytes]:
+    """
+    Stream every contact matching the filters in the given format
+
+    Opens its own read session, which lives exactly as long as the stream,
+    and encodes one cursor batch at a time.
+
+    Args:
+        file_format: One of EXPORT_FORMATS (call check_format first)
+        filters: Same filters as the contact list
+
+    Yields:
+        Encoded file contents
+    """
+    async with read_session() as db:
+        batches = ContactService(db).stream_contacts(filters, EXPORT_FIELDS)
+
+        if file_format == "csv":
+            header = True
+            async for rows in batches:
+                yield _csv_batch(rows, header)
+                header = False
+            if header:
+                yield _csv_batch([], header)
+
+        elif file_format == "ndjson":
+            async for rows in batches:
+                yield _ndjson_batch(rows)
+
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            schema = _parquet_schema(pa)
+            sink = _ChunkSink()
+            writer = pq.ParquetWriter(sink, schema, compression="snappy")
+            try:
+                async for rows in batches:
+                    columns = list(zip(*rows)) or [[] for _ in EXPORT_FIELDS]
+                    batch = pa.record_batch(
+                        [
+                            pa.array([_cell(value) for value in column], type=field.type)
+                            for column, field in zip(columns, schema)
+                        ],
+                        schema=schema,
+                    )
+                    # One row group per cursor batch
+                    writer.write_batch(batch)
+                    yield sink.drain()
+            finally:
+                writer.close()
+            yield sink.drain()
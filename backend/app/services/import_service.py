@@ -0,0 +1,239 @@
+"""
+Import Service
+Bulk contact ingestion from CSV and NDJSON files
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Union
+import codecs
+import csv
+import json
+import logging
+
+from pydantic import ValidationError
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.contact import Contact
+from app.schemas.contact import ContactCreate, ContactImportError, ContactImportResult
+from app.services.analytics_service import AnalyticsService, analytics_cache, contact_day
+from app.services.scoring_queue import scoring_queue
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+# Columns written for every imported contact; the rest keep their defaults
+_COPY_COLUMNS = ("id", "name", "email", "phone", "company", "message", "status", "ai_status", "created_at")
+
+
+def _validation_message(error: ValidationError) -> str:
+    """One-line summary of a row's validation errors"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a byte stream into lines, keeping the line ending"""
+    # utf-8-sig drops the byte order mark spreadsheet exports often start with
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[dict, str]]]:
+    """
+    Parse CSV into (line, row or error) pairs
+
+    The first record is the header. Records are assembled from lines until
+    their quotes balance, so quoted fields may span several lines.
+    """
+    header: Optional[list[str]] = None
+    record = ""
+    start = line_number = 0
+
+    async for line in _lines(chunks):
+        line_number += 1
+        if not record:
+            start = line_number
+        record += line
+        if record.count('"') % 2:
+            # Inside a quoted field
+            continue
+
+        current, record = record, ""
+        if not current.strip():
+            continue
+        try:
+            values = next(csv.reader([current]))
+        except csv.Error as e:
+            yield start, f"Malformed CSV: {e}"
+            continue
+
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # Empty cells are missing values, not empty strings
+        yield start, {name: value.strip() or None for name, value in zip(header, values)}
+
+    if record.strip():
+        yield start, "Unterminated quoted field"
+
+
+async def _ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[dict, str]]]:
+    """Parse newline-delimited JSON into (line, row or error) pairs"""
+    line_number = 0
+    async for line in _lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, row
+
+
+class ContactImporter:
+    """
+    Loads contacts from a CSV or NDJSON stream in chunks
+
+    Each chunk of IMPORT_CHUNK_SIZE rows is validated with ContactCreate and
+    written in its own transaction: on PostgreSQL with COPY (ids are taken
+    from the sequence up front so the scoring jobs and rollups can be written
+    in the same transaction), elsewhere with a multi-row INSERT. Rows that
+    fail validation are reported and skipped without aborting the import.
+    Imported contacts are queued for scoring by the background workers
+    rather than scored inline.
+    """
+
+    def __init__(self, db: AsyncSession, chunk_size: int = settings.IMPORT_CHUNK_SIZE, score: bool = True):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.score = score
+        self.analytics = AnalyticsService(db)
+        self.imported = 0
+        self.failed = 0
+        self.errors: list[ContactImportError] = []
+
+    async def run(self, chunks: AsyncIterator[bytes], file_format: str) -> ContactImportResult:
+        """
+        Import every row of the stream
+
+        Args:
+            chunks: Raw file contents, in arbitrary pieces
+            file_format: One of IMPORT_FORMATS
+
+        Returns:
+            Imported and failed counts with the first failures
+        """
+        if file_format not in IMPORT_FORMATS:
+            raise ValueError(f"Unknown import format: {file_format}")
+        rows = _csv_rows(chunks) if file_format == "csv" else _ndjson_rows(chunks)
+
+        batch: list[tuple[int, ContactCreate]] = []
+        async for line, row in rows:
+            if isinstance(row, str):
+                self._fail(line, row)
+                continue
+            try:
+                batch.append((line, ContactCreate.model_validate(row)))
+            except ValidationError as e:
+                self._fail(line, _validation_message(e))
+                continue
+
+            if len(batch) >= self.chunk_size:
+                await self._load(batch)
+                batch = []
+
+        if batch:
+            await self._load(batch)
+
+        if self.imported:
+            await analytics_cache.invalidate()
+        logger.info(f"Imported {self.imported} contacts ({self.failed} rows failed)")
+
+        return ContactImportResult(imported=self.imported, failed=self.failed, errors=self.errors)
+
+    def _fail(self, line: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append(ContactImportError(line=line, error=error))
+
+    async def _load(self, batch: list[tuple[int, ContactCreate]]) -> None:
+        """Write one chunk with its scoring jobs and rollup counts"""
+        created_at = datetime.now(timezone.utc)
+        contacts = [contact for _, contact in batch]
+
+        try:
+            if self.db.get_bind().dialect.name == "postgresql":
+                contact_ids = await self._copy(contacts, created_at)
+            else:
+                contact_ids = await self._insert(contacts, created_at)
+
+            if self.score:
+                await scoring_queue.enqueue(self.db, contact_ids)
+            day = contact_day(created_at)
+            await self.analytics.apply(
+                Counter({(day, "new"): len(contacts)}),
+                Counter(contact.company for contact in contacts if contact.company),
+            )
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Import chunk of {len(batch)} rows failed: {str(e)}")
+            for line, _ in batch:
+                self._fail(line, f"Chunk failed to load: {e.__class__.__name__}")
+            return
+
+        if self.score:
+            scoring_queue.publish(self.db)
+        self.imported += len(contact_ids)
+
+    async def _copy(self, contacts: list[ContactCreate], created_at: datetime) -> list[int]:
+        """COPY a chunk through the asyncpg connection, returning the new ids"""
+        # Runs in the session's transaction, which this first statement opens
+        result = await self.db.execute(
+            text("SELECT nextval(pg_get_serial_sequence('contacts', 'id')) FROM generate_series(1, :count)"),
+            {"count": len(contacts)},
+        )
+        contact_ids = list(result.scalars())
+
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Contact.__tablename__,
+            columns=_COPY_COLUMNS,
+            records=[
+                (
+                    contact_id, contact.name, contact.email, contact.phone, contact.company,
+                    contact.message, "new", "pending", created_at,
+                )
+                for contact_id, contact in zip(contact_ids, contacts)
+            ],
+        )
+        return contact_ids
+
+    async def _insert(self, contacts: list[ContactCreate], created_at: datetime) -> list[int]:
+        """Multi-row INSERT for databases without COPY (SQLite in tests)"""
+        result = await self.db.execute(
+            insert(Contact).returning(Contact.id),
+            [{**contact.model_dump(), "created_at": created_at} for contact in contacts],
+        )
+        return list(result.scalars())
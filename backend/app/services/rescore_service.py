@@ -0,0 +1,387 @@
+"""
+Rescore Service
+Bulk lead re-scoring with keyset pagination, batched scoring and resumable checkpoints
+"""
+from dataclasses import dataclass
+from typing import Optional, Protocol
+import asyncio
+import hashlib
+import logging
+
+from sqlalchemy import select, update, values, column, bindparam, Integer, String, Text, JSON
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.contact import Contact
+from app.models.rescore import RescoreCheckpoint
+from app.services.ai_service import AIService, build_score_prompt, parse_score_response, get_ai_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ContactInput:
+    """Fields the scoring prompt needs"""
+    id: int
+    name: str
+    email: str
+    company: Optional[str]
+    message: str
+
+
+class ScoringBackend(Protocol):
+    """Scores a chunk of contacts, returning results keyed by contact id"""
+
+    name: str
+
+    async def score_batch(self, contacts: list[ContactInput]) -> dict[int, dict]:
+        ...
+
+
+class SubmittingBackend(ScoringBackend, Protocol):
+    """
+    Backend whose chunks are submitted for asynchronous scoring
+
+    The job checkpoints the returned id, so a restarted run collects the
+    results of a submitted chunk instead of paying for it again.
+    """
+
+    async def submit(self, contacts: list[ContactInput]) -> str:
+        ...
+
+    async def collect(self, submission_id: str) -> dict[int, dict]:
+        ...
+
+
+class MessageBatchBackend:
+    """
+    Scores chunks through the Anthropic Message Batches API
+
+    Batches are billed at a discount and do not count against the
+    interactive rate limit, at the cost of asynchronous completion.
+    """
+
+    name = "batch"
+
+    def __init__(self, ai_service: AIService, poll_interval: float = settings.RESCORE_BATCH_POLL_INTERVAL):
+        if ai_service.client is None:
+            raise ValueError("ANTHROPIC_API_KEY is required for the batch backend")
+        self.ai_service = ai_service
+        self.poll_interval = poll_interval
+
+    async def score_batch(self, contacts: list[ContactInput]) -> dict[int, dict]:
+        return await self.collect(await self.submit(contacts))
+
+    async def submit(self, contacts: list[ContactInput]) -> str:
+        """Create a message batch for a chunk, returning its id"""
+        batch = await self.ai_service.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": str(contact.id),
+                    "params": {
+                        "model": self.ai_service.model,
+                        "max_tokens": settings.AI_MAX_TOKENS,
+                        "messages": [{
+                            "role": "user",
+                            "content": build_score_prompt(contact.name, contact.email, contact.company, contact.message),
+                        }],
+                    },
+                }
+                for contact in contacts
+            ]
+        )
+        logger.info(f"Submitted message batch {batch.id} with {len(contacts)} contacts")
+        return batch.id
+
+    async def collect(self, submission_id: str) -> dict[int, dict]:
+        """Wait for a message batch to end and parse its results"""
+        client = self.ai_service.client
+        batch = await client.messages.batches.retrieve(submission_id)
+        while batch.processing_status != "ended":
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.messages.batches.retrieve(batch.id)
+
+        results = {}
+        async for entry in await client.messages.batches.results(batch.id):
+            if entry.result.type != "succeeded":
+                logger.warning(f"Batch {batch.id}: contact {entry.custom_id} {entry.result.type}")
+                continue
+            try:
+                results[int(entry.custom_id)] = parse_score_response(entry.result.message.content[0].text)
+            except (ValueError, IndexError) as e:
+                logger.warning(f"Batch {batch.id}: unparseable result for contact {entry.custom_id}: {str(e)}")
+        return results
+
+
+class DirectBackend:
+    """Scores chunks with concurrent interactive calls (bounded by AIService limits)"""
+
+    name = "direct"
+
+    def __init__(self, ai_service: AIService):
+        self.ai_service = ai_service
+
+    async def score_batch(self, contacts: list[ContactInput]) -> dict[int, dict]:
+        scores = await asyncio.gather(*[
+            self.ai_service.score_lead(
+                name=contact.name,
+                email=contact.email,
+                company=contact.company,
+                message=contact.message,
+                bypass_cache=True
+            )
+            for contact in contacts
+        ])
+        return {
+            contact.id: score
+            for contact, score in zip(contacts, scores)
+            if not score.get('error')
+        }
+
+
+class FakeScoringBackend:
+    """Deterministic local scorer for tests and dry runs; never calls the API"""
+
+    name = "fake"
+
+    async def score_batch(self, contacts: list[ContactInput]) -> dict[int, dict]:
+        results = {}
+        for contact in contacts:
+            digest = hashlib.sha256(f"{contact.email}\0{contact.message}".encode("utf-8")).digest()
+            score = digest[0] * 100 // 255
+            if score >= 85:
+                priority = "urgent"
+            elif score >= 60:
+                priority = "high"
+            elif score >= 30:
+                priority = "medium"
+            else:
+                priority = "low"
+            results[contact.id] = {
+                "score": score,
+                "priority": priority,
+                "insights": {"urgency": "unknown", "budget": "unknown", "industry": "unknown", "pain_points": []},
+                "suggested_response": "Thank you for your interest. We'll get back to you soon!",
+                "ai_enabled": False,
+            }
+        return results
+
+
+def build_backend(name: str) -> ScoringBackend:
+    """Create a scoring backend by name"""
+    if name == "batch":
+        return MessageBatchBackend(get_ai_service())
+    if name == "direct":
+        return DirectBackend(get_ai_service())
+    if name == "fake":
+        return FakeScoringBackend()
+    raise ValueError(f"Unknown rescore backend: {name}")
+
+
+async def bulk_update_scores(db: AsyncSession, results: dict[int, dict]) -> int:
+    """
+    Write scoring results back with a single UPDATE ... FROM (VALUES ...)
+
+    Databases without UPDATE ... FROM (VALUES) column aliases (SQLite, used
+    in tests) get one executemany UPDATE instead.
+
+    Returns:
+        Number of rows in the VALUES list
+    """
+    if not results:
+        return 0
+
+    if db.get_bind().dialect.name != "postgresql":
+        await db.execute(
+            update(Contact.__table__)
+            .where(Contact.__table__.c.id == bindparam("contact_id"))
+            .values(
+                ai_score=bindparam("score"),
+                ai_priority=bindparam("priority"),
+                ai_insights=bindparam("insights", type_=JSON),
+                ai_suggested_response=bindparam("suggested_response"),
+                ai_status='scored',
+            ),
+            [
+                {
+                    "contact_id": contact_id,
+                    "score": result.get('score'),
+                    "priority": result.get('priority'),
+                    "insights": result.get('insights'),
+                    "suggested_response": result.get('suggested_response'),
+                }
+                for contact_id, result in results.items()
+            ],
+        )
+        return len(results)
+
+    scores = values(
+        column("id", Integer),
+        column("ai_score", Integer),
+        column("ai_priority", String),
+        column("ai_insights", JSON),
+        column("ai_suggested_response", Text),
+        name="scores",
+    ).data([
+        (
+            contact_id,
+            result.get('score'),
+            result.get('priority'),
+            result.get('insights'),
+            result.get('suggested_response'),
+        )
+        for contact_id, result in results.items()
+    ])
+
+    await db.execute(
+        update(Contact)
+        .where(Contact.id == scores.c.id)
+        .values(
+            ai_score=scores.c.ai_score,
+            ai_priority=scores.c.ai_priority,
+            ai_insights=scores.c.ai_insights,
+            ai_suggested_response=scores.c.ai_suggested_response,
+            ai_status='scored',
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return len(results)
+
+
+class RescoreJob:
+    """
+    Re-scores every contact in id order
+
+    Each chunk's results and the advanced checkpoint are committed together,
+    so an interrupted run resumes after the last fully written chunk. No
+    transaction is held while a chunk is scored, which can take hours with
+    message batches; a submitted batch is checkpointed before waiting on it,
+    so a resumed run collects it rather than submitting the chunk again.
+    """
+
+    def __init__(self, name: str, backend: ScoringBackend, chunk_size: int = settings.RESCORE_CHUNK_SIZE):
+        self.name = name
+        self.backend = backend
+        self.chunk_size = chunk_size
+
+    async def run(self, restart: bool = False) -> RescoreCheckpoint:
+        """Run (or resume) until every contact has been processed"""
+        async with AsyncSessionLocal() as db:
+            checkpoint = await db.get(RescoreCheckpoint, self.name)
+            if checkpoint is None:
+                checkpoint = RescoreCheckpoint(name=self.name, last_contact_id=0, processed=0, failed=0)
+                db.add(checkpoint)
+            elif restart:
+                checkpoint.last_contact_id = 0
+                checkpoint.pending_batch_id = None
+                checkpoint.pending_until_id = None
+                checkpoint.processed = 0
+                checkpoint.failed = 0
+            checkpoint.backend = self.backend.name
+            checkpoint.status = 'running'
+            checkpoint.last_error = None
+            await db.commit()
+
+            try:
+                while True:
+                    if checkpoint.pending_batch_id is not None:
+                        contacts = await self._chunk_until(db, checkpoint.last_contact_id, checkpoint.pending_until_id)
+                    else:
+                        contacts = await self._next_chunk(db, checkpoint.last_contact_id)
+                    # End the read transaction before scoring
+                    await db.commit()
+                    if not contacts:
+                        if checkpoint.pending_batch_id is None:
+                            break
+                        # Every contact of the submitted chunk was deleted since
+                        checkpoint.last_contact_id = checkpoint.pending_until_id
+                        checkpoint.pending_batch_id = None
+                        checkpoint.pending_until_id = None
+                        await db.commit()
+                        continue
+
+                    results = await self._score(db, checkpoint, contacts)
+                    await bulk_update_scores(db, results)
+
+                    checkpoint.last_contact_id = checkpoint.pending_until_id or contacts[-1].id
+                    checkpoint.pending_batch_id = None
+                    checkpoint.pending_until_id = None
+                    checkpoint.processed += len(results)
+                    checkpoint.failed += len(contacts) - len(results)
+                    await db.commit()
+
+                    logger.info(f"Rescore {self.name}: up to contact {checkpoint.last_contact_id}, {checkpoint.processed} scored, {checkpoint.failed} failed")
+
+                checkpoint.status = 'completed'
+                await db.commit()
+
+            except Exception as e:
+                logger.error(f"Rescore {self.name} stopped after contact {checkpoint.last_contact_id}: {str(e)}")
+                await db.rollback()
+                checkpoint.status = 'failed'
+                checkpoint.last_error = str(e)
+                await db.commit()
+                raise
+
+            await db.refresh(checkpoint)
+            return checkpoint
+
+    async def _score(self, db: AsyncSession, checkpoint: RescoreCheckpoint, contacts: list[ContactInput]) -> dict[int, dict]:
+        """Score a chunk, checkpointing the submission first for SubmittingBackend backends"""
+        submit = getattr(self.backend, "submit", None)
+        if submit is None:
+            return await self.backend.score_batch(contacts)
+
+        if checkpoint.pending_batch_id is None:
+            checkpoint.pending_batch_id = await submit(contacts)
+            checkpoint.pending_until_id = contacts[-1].id
+            await db.commit()
+        else:
+            logger.info(f"Rescore {self.name}: collecting submitted batch {checkpoint.pending_batch_id}")
+        return await self.backend.collect(checkpoint.pending_batch_id)
+
+    async def _chunk_until(self, db: AsyncSession, after_id: int, until_id: int) -> list[ContactInput]:
+        """The chunk a pending submission was made for"""
+        result = await db.execute(
+            select(Contact.id, Contact.name, Contact.email, Contact.company, Contact.message)
+            .where(Contact.id > after_id, Contact.id <= until_id)
+            .order_by(Contact.id)
+        )
+        return [ContactInput(**row._mapping) for row in result]
+
+    async def _next_chunk(self, db: AsyncSession, after_id: int) -> list[ContactInput]:
+        result = await db.execute(
+            select(Contact.id, Contact.name, Contact.email, Contact.company, Contact.message)
+            .where(Contact.id > after_id)
+            .order_by(Contact.id)
+            .limit(self.chunk_size)
+        )
+        return [ContactInput(**row._mapping) for row in result]
+
+
+# Runs started from the admin API, by name
+_running: dict[str, asyncio.Task] = {}
+
+
+def start_rescore(name: str, backend: str, chunk_size: int, restart: bool = False) -> bool:
+    """
+    Start a re-scoring run in the background
+
+    Returns:
+        False if a run with this name is already in progress
+    """
+    task = _running.get(name)
+    if task is not None and not task.done():
+        return False
+
+    job = RescoreJob(name, build_backend(backend), chunk_size)
+    task = asyncio.create_task(job.run(restart=restart), name=f"rescore-{name}")
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    _running[name] = task
+    return True
+
+
+async def get_checkpoint(db: AsyncSession, name: str) -> Optional[RescoreCheckpoint]:
+    """Get the progress of a re-scoring run"""
+    return await db.get(RescoreCheckpoint, name)
@@ -0,0 +1,405 @@
+"""
+Scoring Queue
+Durable lead scoring jobs and the async worker pool that consumes them
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+
+from sqlalchemy import select, insert, update, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import Counter
+from app.core.rate_limit import admission
+from app.models.contact import Contact
+from app.models.scoring_job import ScoringJob
+from app.services.ai_service import get_ai_service
+from app.services.embedding_service import EmbeddingService, contact_text, embed_texts, embedding_index
+
+logger = logging.getLogger(__name__)
+
+scoring_jobs = Counter("scoring_jobs_total", "Processed scoring jobs by result (scored, retried, dead)", ("result",))
+scoring_duplicates = Counter(
+    "scoring_duplicates_total", "New contacts found to duplicate an earlier one, by whether its score was reused", ("reused",)
+)
+
+# Key under which the in-memory queue stages contact ids until the session commits
+_PENDING_KEY = "scoring_queue_pending"
+
+
+@dataclass
+class ClaimedJob:
+    """A job handed to a worker"""
+    id: int
+    contact_id: int
+    attempts: int
+    force: bool = False
+
+
+class ScoringError(Exception):
+    """Raised when the AI service could not score a lead"""
+
+    def __init__(self, message: str, fallback: Optional[dict] = None):
+        super().__init__(message)
+        self.fallback = fallback
+
+
+class PostgresScoringQueue:
+    """
+    Queue backed by the scoring_jobs table
+
+    Jobs are inserted in the same transaction as the contact, so a committed
+    contact always has its job. Workers claim rows with FOR UPDATE SKIP LOCKED,
+    which lets several processes share the table safely.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+
+    async def enqueue(self, session: AsyncSession, contact_ids: list[int], force: bool = False) -> None:
+        """Stage jobs in the caller's transaction"""
+        if not contact_ids:
+            return
+        # One multi-row INSERT rather than an ORM object per job, for bulk imports
+        await session.execute(
+            insert(ScoringJob),
+            [{"contact_id": contact_id, "force": force} for contact_id in contact_ids],
+        )
+
+    def publish(self, session: AsyncSession) -> None:
+        """Wake local workers once the caller's transaction is committed"""
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Sleep until new work is published or the timeout expires"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def claim(self, limit: int = 1) -> list[ClaimedJob]:
+        """Claim runnable jobs, reclaiming running jobs whose worker died"""
+        now = datetime.now(timezone.utc)
+        stale_before = now - timedelta(seconds=settings.SCORING_VISIBILITY_TIMEOUT)
+
+        runnable = (
+            select(ScoringJob.id)
+            .where(
+                or_(
+                    and_(ScoringJob.status == 'queued', ScoringJob.run_at <= now),
+                    and_(ScoringJob.status == 'running', ScoringJob.locked_at < stale_before),
+                )
+            )
+            .order_by(ScoringJob.run_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(ScoringJob)
+                .where(ScoringJob.id.in_(runnable))
+                .values(status='running', attempts=ScoringJob.attempts + 1, locked_at=now)
+                .returning(ScoringJob.id, ScoringJob.contact_id, ScoringJob.attempts, ScoringJob.force)
+                .execution_options(synchronize_session=False)
+            )
+            jobs = [
+                ClaimedJob(id=row.id, contact_id=row.contact_id, attempts=row.attempts, force=row.force)
+                for row in result
+            ]
+            await session.commit()
+
+        return jobs
+
+    async def complete(self, job: ClaimedJob) -> None:
+        """Mark a job as done"""
+        await self._set(job, status='done', locked_at=None)
+
+    async def retry(self, job: ClaimedJob, error: str, delay: float) -> None:
+        """Put a job back in the queue after a backoff delay"""
+        await self._set(
+            job,
+            status='queued',
+            last_error=error,
+            locked_at=None,
+            run_at=datetime.now(timezone.utc) + timedelta(seconds=delay),
+        )
+
+    async def dead_letter(self, job: ClaimedJob, error: str) -> None:
+        """Park a job that exhausted its attempts"""
+        await self._set(job, status='dead', last_error=error, locked_at=None)
+
+    async def depth(self) -> int:
+        """Number of jobs waiting to run"""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(func.count(ScoringJob.id)).where(ScoringJob.status == 'queued')
+            )
+            return result.scalar()
+
+    async def _set(self, job: ClaimedJob, **values) -> None:
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                update(ScoringJob)
+                .where(ScoringJob.id == job.id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+
+
+class InMemoryScoringQueue:
+    """
+    Process-local queue for development and tests
+
+    Jobs are lost on restart; use the postgres backend in production.
+    """
+
+    def __init__(self):
+        self._wakeup = asyncio.Event()
+        self._heap: list[tuple[float, int, ClaimedJob]] = []
+        self._ids = itertools.count(1)
+        self.dead: list[tuple[ClaimedJob, str]] = []
+
+    async def enqueue(self, session: AsyncSession, contact_ids: list[int], force: bool = False) -> None:
+        """Stage jobs until the caller's transaction is committed"""
+        session.info.setdefault(_PENDING_KEY, []).extend((contact_id, force) for contact_id in contact_ids)
+
+    def publish(self, session: AsyncSession) -> None:
+        """Make staged jobs visible to workers"""
+        for contact_id, force in session.info.pop(_PENDING_KEY, []):
+            job = ClaimedJob(id=next(self._ids), contact_id=contact_id, attempts=0, force=force)
+            self._push(job, delay=0)
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> None:
+        """Sleep until new work is published or the timeout expires"""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def claim(self, limit: int = 1) -> list[ClaimedJob]:
+        """Pop runnable jobs"""
+        now = asyncio.get_running_loop().time()
+        jobs = []
+        while self._heap and len(jobs) < limit and self._heap[0][0] <= now:
+            _, _, job = heapq.heappop(self._heap)
+            job.attempts += 1
+            jobs.append(job)
+        return jobs
+
+    async def complete(self, job: ClaimedJob) -> None:
+        """Nothing to do, the job was already popped"""
+
+    async def retry(self, job: ClaimedJob, error: str, delay: float) -> None:
+        """Put a job back in the queue after a backoff delay"""
+        self._push(job, delay=delay)
+
+    async def dead_letter(self, job: ClaimedJob, error: str) -> None:
+        """Keep failed jobs around for inspection"""
+        self.dead.append((job, error))
+
+    async def depth(self) -> int:
+        """Number of jobs waiting to run"""
+        return len(self._heap)
+
+    def _push(self, job: ClaimedJob, delay: float) -> None:
+        run_at = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._heap, (run_at, job.id, job))
+
+
+class ScoringWorkerPool:
+    """Pool of async workers that score queued contacts"""
+
+    def __init__(self, queue, concurrency: int = settings.SCORING_WORKER_CONCURRENCY):
+        self.queue = queue
+        self.concurrency = concurrency
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Spawn the worker tasks"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._run(n), name=f"scoring-worker-{n}")
+            for n in range(self.concurrency)
+        ]
+        logger.info(f"Started {self.concurrency} lead scoring workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks and wait for them to exit"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, n: int) -> None:
+        while True:
+            try:
+                jobs = await self.queue.claim(1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scoring worker {n} could not claim jobs: {str(e)}")
+                await asyncio.sleep(settings.SCORING_POLL_INTERVAL)
+                continue
+
+            if not jobs:
+                await self.queue.wait(settings.SCORING_POLL_INTERVAL)
+                continue
+
+            for job in jobs:
+                await self.process(job)
+
+    async def process(self, job: ClaimedJob) -> None:
+        """Score one contact and record the outcome on the job"""
+        try:
+            await self._score(job)
+            await self.queue.complete(job)
+            scoring_jobs.labels("scored").inc()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e)
+            if job.attempts >= settings.SCORING_MAX_ATTEMPTS:
+                logger.error(f"Giving up scoring contact {job.contact_id} after {job.attempts} attempts: {error}")
+                await self._mark_failed(job, getattr(e, "fallback", None))
+                await self.queue.dead_letter(job, error)
+                scoring_jobs.labels("dead").inc()
+            else:
+                delay = self.backoff(job.attempts)
+                logger.warning(f"Scoring contact {job.contact_id} failed (attempt {job.attempts}), retrying in {delay:.1f}s: {error}")
+                await self.queue.retry(job, error, delay)
+                scoring_jobs.labels("retried").inc()
+
+    @staticmethod
+    def backoff(attempts: int) -> float:
+        """Exponential backoff with jitter"""
+        delay = settings.SCORING_RETRY_BASE_DELAY * (2 ** (attempts - 1))
+        return min(delay, settings.SCORING_RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+    async def _score(self, job: ClaimedJob) -> None:
+        async with AsyncSessionLocal() as session:
+            contact = await session.get(Contact, job.contact_id)
+            if contact is None:
+                # Deleted before we got to it
+                return
+            lead = {
+                'name': contact.name,
+                'email': contact.email,
+                'company': contact.company,
+                'message': contact.message,
+            }
+
+        # No connection is held while the lead is embedded or the model answers
+        if not job.force and await self._deduplicate(job.contact_id, lead):
+            return
+
+        ai_score = await get_ai_service().score_lead(**lead, bypass_cache=job.force)
+        if ai_score.get('error'):
+            raise ScoringError(ai_score['error'], fallback=ai_score)
+
+        async with AsyncSessionLocal() as session:
+            contact = await session.get(Contact, job.contact_id)
+            if contact is None:
+                # Deleted while it was being scored
+                return
+            apply_score(contact, ai_score)
+            contact.ai_status = 'scored'
+            await session.commit()
+
+        logger.info(f"Contact {job.contact_id} scored: {ai_score.get('score')} ({ai_score.get('priority')})")
+
+    async def _deduplicate(self, contact_id: int, lead: dict) -> bool:
+        """
+        Embed a new contact and flag it if it duplicates an earlier one
+
+        The embedding is computed first, then stored with the duplicate link
+        in one short transaction, so it is searchable while the contact is
+        being scored. A duplicate of an already scored contact reuses its
+        score. Failures only skip the check.
+
+        Returns:
+            True if nothing is left to score (score reused, or contact deleted)
+        """
+        try:
+            vector = (await embed_texts([contact_text(lead['name'], lead['company'], lead['message'])]))[0]
+            async with AsyncSessionLocal() as session:
+                contact = await session.get(Contact, contact_id)
+                if contact is None:
+                    return True
+                original = await EmbeddingService(session).find_duplicate(contact, vector)
+                reused = original is not None and original.ai_status == 'scored'
+                if original is not None:
+                    contact.duplicate_of_id = original.id
+                if reused:
+                    # Same lead as one already scored: reuse its score instead of calling the model
+                    apply_score(contact, {
+                        'score': original.ai_score,
+                        'priority': original.ai_priority,
+                        'insights': original.ai_insights,
+                        'suggested_response': original.ai_suggested_response,
+                    })
+                    contact.ai_status = 'scored'
+                await session.commit()
+                embedding_index.publish(session)
+        except Exception as e:
+            logger.warning(f"Could not check contact {contact_id} for duplicates: {str(e)}")
+            return False
+
+        if original is not None:
+            scoring_duplicates.labels("true" if reused else "false").inc()
+        if reused:
+            logger.info(f"Contact {contact_id} duplicates contact {original.id}, reusing its score")
+        return reused
+
+    async def _mark_failed(self, job: ClaimedJob, fallback: Optional[dict]) -> None:
+        try:
+            async with AsyncSessionLocal() as session:
+                contact = await session.get(Contact, job.contact_id)
+                if contact is None:
+                    return
+                if fallback:
+                    apply_score(contact, fallback)
+                contact.ai_status = 'failed'
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Error marking contact {job.contact_id} as failed: {str(e)}")
+
+
+def apply_score(contact: Contact, ai_score: dict) -> None:
+    """Copy an AI scoring result onto a contact"""
+    contact.ai_score = ai_score.get('score')
+    contact.ai_priority = ai_score.get('priority')
+    contact.ai_insights = ai_score.get('insights')
+    contact.ai_suggested_response = ai_score.get('suggested_response')
+
+
+def _build_queue():
+    if settings.SCORING_QUEUE_BACKEND == "memory":
+        return InMemoryScoringQueue()
+    return PostgresScoringQueue()
+
+
+# Process-wide queue and worker pool, started from the application lifespan
+scoring_queue = _build_queue()
+worker_pool = ScoringWorkerPool(scoring_queue)
+
+
+async def _queue_pressure() -> float:
+    return await scoring_queue.depth() / settings.ADMISSION_MAX_SCORING_QUEUE
+
+
+# Shed new submissions before the backlog outgrows what the workers can drain
+if settings.ADMISSION_MAX_SCORING_QUEUE > 0:
+    admission.add_signal("scoring_queue", _queue_pressure)
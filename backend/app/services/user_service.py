@@ -8,7 +8,10 @@ from sqlalchemy import select
 
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from app.core.security import invalidate_user, password_hasher
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class UserService:
@@ -58,7 +61,7 @@ class UserService:
             Created user
         """
         # Hash the password
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await password_hasher.hash(user.password)
 
         # Create user instance
         db_user = User(
@@ -79,6 +82,8 @@ class UserService:
         """
         Authenticate a user with email and password
 
+        Hashes made with a different BCRYPT_ROUNDS are replaced on success.
+
         Args:
             email: User email
             password: Plain password
@@ -91,9 +96,16 @@ class UserService:
         if not user:
             return None
 
-        if not verify_password(password, user.hashed_password):
+        verified, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not verified:
             return None
 
+        if new_hash is not None:
+            user.hashed_password = new_hash
+            await self.db.commit()
+            await self.db.refresh(user)
+            logger.info(f"Rehashed password for user {user.id}")
+
         return user
 
     async def update_user(self, user_id: int, user_update: UserUpdate) -> Optional[User]:
@@ -120,10 +132,34 @@ class UserService:
             db_user.full_name = user_update.full_name
 
         if user_update.password is not None:
-            db_user.hashed_password = get_password_hash(user_update.password)
+            db_user.hashed_password = await password_hasher.hash(user_update.password)
+
+        await self.db.commit()
+        await self.db.refresh(db_user)
+        await invalidate_user(user_id)
+
+        return db_user
+
+    async def set_active(self, user_id: int, is_active: bool) -> Optional[User]:
+        """
+        Activate or deactivate a user
+
+        Args:
+            user_id: User ID
+            is_active: New active flag
+
+        Returns:
+            Updated user if found, None otherwise
+        """
+        db_user = await self.get_user_by_id(user_id)
+
+        if not db_user:
+            return None
 
+        db_user.is_active = is_active
         await self.db.commit()
         await self.db.refresh(db_user)
+        await invalidate_user(user_id)
 
         return db_user
 
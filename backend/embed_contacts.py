@@ -0,0 +1,33 @@
+"""
+Embed Contacts
+Computes embeddings for contacts that have none from the configured model
+Run after the first deploy, after changing EMBEDDING_BACKEND/EMBEDDING_MODEL,
+and with --all after switching EMBEDDING_STORE to pgvector
+
+Usage:
+    python embed_contacts.py
+    python embed_contacts.py --all
+"""
+import argparse
+import asyncio
+
+from app.core.database import AsyncSessionLocal, engine
+from app.services.embedding_service import EmbeddingService, get_embedder
+
+
+async def main(args):
+    try:
+        async with AsyncSessionLocal() as session:
+            embedded = await EmbeddingService(session).backfill(args.batch_size, reembed=args.all)
+        print(f"✅ Embedded {embedded} contacts with {get_embedder().name}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill contact embeddings")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--all", action="store_true", help="Re-embed every contact")
+
+    print("🚀 Embedding contacts...")
+    asyncio.run(main(parser.parse_args()))
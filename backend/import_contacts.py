@@ -0,0 +1,54 @@
+"""
+Import Contacts
+Bulk loads contacts from a CSV or NDJSON file, e.g. an export from another CRM
+Invalid rows are reported and skipped; the rest are queued for AI scoring
+
+Usage:
+    python import_contacts.py leads.csv
+    python import_contacts.py leads.ndjson --no-score
+"""
+import argparse
+import asyncio
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.services.import_service import IMPORT_FORMATS, ContactImporter
+
+READ_SIZE = 1024 * 1024
+
+
+async def read_file(path: Path):
+    """Yield the file in fixed-size pieces"""
+    with path.open("rb") as f:
+        while chunk := f.read(READ_SIZE):
+            yield chunk
+
+
+async def main(args):
+    path = Path(args.path)
+    file_format = args.format or ("csv" if path.suffix.lower() == ".csv" else "ndjson")
+
+    try:
+        async with AsyncSessionLocal() as session:
+            importer = ContactImporter(session, chunk_size=args.chunk_size, score=not args.no_score)
+            result = await importer.run(read_file(path), file_format)
+    finally:
+        await engine.dispose()
+
+    print(f"✅ Imported: {result.imported}")
+    print(f"   Failed: {result.failed}")
+    for error in result.errors[:args.show_errors]:
+        print(f"   line {error.line}: {error.error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import contacts")
+    parser.add_argument("path", help="CSV (with a header row) or NDJSON file")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to csv for .csv files, else ndjson")
+    parser.add_argument("--chunk-size", type=int, default=settings.IMPORT_CHUNK_SIZE)
+    parser.add_argument("--no-score", action="store_true", help="Do not queue the contacts for AI scoring")
+    parser.add_argument("--show-errors", type=int, default=20, help="Failed rows to print")
+
+    print("🚀 Importing contacts...")
+    asyncio.run(main(parser.parse_args()))
@@ -11,6 +11,9 @@ from app.core.config import settings
 from app.core.database import Base
 from app.models.user import User
 from app.models.contact import Contact
+from app.models.scoring_job import ScoringJob
+from app.models.rescore import RescoreCheckpoint
+from app.models.analytics import ContactDailyStat, CompanyStat
 from app.core.security import get_password_hash
 
 
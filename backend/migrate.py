@@ -0,0 +1,126 @@
+"""
+Apply Schema Migrations
+Creates missing tables and applies incremental changes to existing ones
+Safe to run repeatedly: applied migrations are recorded in schema_migrations
+"""
+import asyncio
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine, Base
+from app.models.contact import SEARCH_DDL
+import app.models.user  # noqa: F401
+import app.models.scoring_job  # noqa: F401
+import app.models.rescore  # noqa: F401
+import app.models.analytics  # noqa: F401
+import app.models.embedding  # noqa: F401
+
+
+# Ordered (id, statements) pairs. Statements run outside a transaction so
+# CREATE INDEX CONCURRENTLY can be used on large tables.
+MIGRATIONS = [
+    ("0001_contact_ai_status", [
+        "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS ai_status VARCHAR(20) NOT NULL DEFAULT 'pending'",
+        "UPDATE contacts SET ai_status = 'scored' WHERE ai_score IS NOT NULL",
+        # Queue every contact that was never scored
+        """INSERT INTO scoring_jobs (contact_id, status, attempts, run_at)
+           SELECT c.id, 'queued', 0, NOW() FROM contacts c
+           WHERE c.ai_status = 'pending'
+             AND NOT EXISTS (SELECT 1 FROM scoring_jobs j WHERE j.contact_id = c.id)""",
+    ]),
+    ("0002_scoring_job_force", [
+        "ALTER TABLE scoring_jobs ADD COLUMN IF NOT EXISTS force BOOLEAN NOT NULL DEFAULT FALSE",
+    ]),
+    ("0003_contact_status_created_at_indexes", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_status ON contacts (status)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_created_at ON contacts (created_at)",
+    ]),
+    ("0004_analytics_rollups", [
+        # Initial fill; rebuild_rollups.py recomputes them at any time
+        """INSERT INTO contact_daily_stats (day, status, count)
+           SELECT date(timezone('UTC', created_at)), status, count(*) FROM contacts GROUP BY 1, 2
+           ON CONFLICT (day, status) DO UPDATE SET count = EXCLUDED.count""",
+        """INSERT INTO company_stats (company, count)
+           SELECT company, count(*) FROM contacts WHERE company IS NOT NULL AND company <> '' GROUP BY 1
+           ON CONFLICT (company) DO UPDATE SET count = EXCLUDED.count""",
+    ]),
+    ("0005_contact_keyset_index", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_created_at_id ON contacts (created_at, id)",
+        # Covered by the composite index
+        "DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_created_at",
+    ]),
+    ("0006_contact_filter_indexes", [
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_status_created_at ON contacts (status, created_at, id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_priority_score ON contacts (ai_priority, ai_score) WHERE ai_priority IS NOT NULL",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_score_id ON contacts (coalesce(ai_score, -1), id)",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_company_lower ON contacts (lower(company)) WHERE company IS NOT NULL",
+        # Covered by ix_contacts_status_created_at
+        "DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_status",
+    ]),
+    ("0007_contact_search", SEARCH_DDL),
+    ("0008_contact_duplicate_of", [
+        "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS duplicate_of_id INTEGER REFERENCES contacts (id) ON DELETE SET NULL",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_duplicate_of_id ON contacts (duplicate_of_id) WHERE duplicate_of_id IS NOT NULL",
+    ]),
+    ("0010_contact_submission_dedupe", [
+        "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS idempotency_key VARCHAR(255)",
+        "ALTER TABLE contacts ADD COLUMN IF NOT EXISTS submission_hash VARCHAR(64)",
+        "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_idempotency_key ON contacts (idempotency_key) WHERE idempotency_key IS NOT NULL",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_submission_hash ON contacts (submission_hash, created_at) WHERE submission_hash IS NOT NULL",
+    ]),
+    ("0011_rescore_pending_batch", [
+        "ALTER TABLE rescore_checkpoints ADD COLUMN IF NOT EXISTS pending_batch_id VARCHAR(100)",
+        "ALTER TABLE rescore_checkpoints ADD COLUMN IF NOT EXISTS pending_until_id INTEGER",
+    ]),
+]
+
+
+def pgvector_migration(dim: int):
+    """Vector column and HNSW index for EMBEDDING_STORE=pgvector (needs the pgvector extension)"""
+    return ("0009_contact_embeddings_pgvector", [
+        "CREATE EXTENSION IF NOT EXISTS vector",
+        f"ALTER TABLE contact_embeddings ADD COLUMN IF NOT EXISTS embedding vector({dim})",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contact_embeddings_hnsw "
+        "ON contact_embeddings USING hnsw (embedding vector_cosine_ops)",
+    ])
+
+
+async def migrate():
+    """Create new tables, then apply pending migrations in order"""
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.exec_driver_sql(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "id VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT NOW())"
+        )
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        result = await conn.exec_driver_sql("SELECT id FROM schema_migrations")
+        applied = {row[0] for row in result}
+
+        migrations = list(MIGRATIONS)
+        if settings.EMBEDDING_STORE == "pgvector":
+            from app.services.embedding_service import get_embedder
+            migrations.append(pgvector_migration(get_embedder().dim))
+
+        for migration_id, statements in migrations:
+            if migration_id in applied:
+                continue
+
+            print(f"→ Applying {migration_id}")
+            for statement in statements:
+                await conn.exec_driver_sql(statement)
+            await conn.execute(
+                text("INSERT INTO schema_migrations (id) VALUES (:id)"), {"id": migration_id}
+            )
+
+    print("✅ Database schema is up to date")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(migrate())
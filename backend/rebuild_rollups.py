@@ -0,0 +1,23 @@
+"""
+Rebuild Analytics Rollups
+Recomputes contact_daily_stats and company_stats from the contacts table
+Run after manual data fixes, or periodically to reconcile drift
+"""
+import asyncio
+
+from app.core.database import engine, AsyncSessionLocal
+from app.services.analytics_service import AnalyticsService
+
+
+async def main():
+    async with AsyncSessionLocal() as session:
+        await AnalyticsService(session).rebuild()
+
+    print("✅ Analytics rollups rebuilt")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    print("🚀 Rebuilding analytics rollups...")
+    asyncio.run(main())
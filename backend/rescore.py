@@ -0,0 +1,40 @@
+"""
+Re-score Contacts
+Re-runs AI lead scoring over every contact, e.g. after a prompt change
+Interrupted runs resume from their last checkpoint when started again with the same name
+
+Usage:
+    python rescore.py prompt-v2 --backend batch
+    python rescore.py dry-run --backend fake --restart
+"""
+import argparse
+import asyncio
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.ai_service import close_ai_service
+from app.services.rescore_service import RescoreJob, build_backend
+
+
+async def main(args):
+    job = RescoreJob(args.name, build_backend(args.backend), args.chunk_size)
+
+    try:
+        checkpoint = await job.run(restart=args.restart)
+        print(f"✅ Rescore {checkpoint.name} {checkpoint.status}")
+        print(f"   Scored: {checkpoint.processed}")
+        print(f"   Failed: {checkpoint.failed}")
+    finally:
+        await close_ai_service()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-score all contacts")
+    parser.add_argument("name", help="Run name, used as the checkpoint key")
+    parser.add_argument("--backend", choices=["batch", "direct", "fake"], default="batch")
+    parser.add_argument("--chunk-size", type=int, default=settings.RESCORE_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+
+    print("🚀 Re-scoring contacts...")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,48 @@
+"""
+Test Configuration
+Runs the app against a throwaway SQLite database, without Redis or the Anthropic API
+"""
+import asyncio
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="polimata-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ["REDIS_URL"] = ""
+os.environ["ANTHROPIC_API_KEY"] = ""
+os.environ["SCORING_QUEUE_BACKEND"] = "memory"
+
+import pytest  # noqa: E402
+import pytest_asyncio  # noqa: E402
+
+from app.core.database import AsyncSessionLocal, Base, engine  # noqa: E402
+import app.models.analytics  # noqa: E402,F401
+import app.models.contact  # noqa: E402,F401
+import app.models.embedding  # noqa: E402,F401
+import app.models.rescore  # noqa: E402,F401
+import app.models.scoring_job  # noqa: E402,F401
+import app.models.user  # noqa: E402,F401
+
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One loop for the whole run; the app keeps process-wide asyncio state"""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest_asyncio.fixture
+async def database():
+    """Empty tables for every test that touches the database"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    yield
+
+
+@pytest_asyncio.fixture
+async def db(database):
+    """Session on the test database"""
+    async with AsyncSessionLocal() as session:
+        yield session
@@ -0,0 +1,164 @@
+"""
+Analytics Tests
+Summary figures, rollup maintenance and the analytics response cache
+"""
+from datetime import datetime, timedelta, timezone
+import asyncio
+
+import pytest
+from sqlalchemy import select
+
+from app.core.cache import ResponseCache
+from app.models.analytics import CompanyStat, ContactDailyStat
+from app.models.contact import Contact
+from app.schemas.contact import CONTACT_STATUSES, ContactCreate
+from app.services.analytics_service import AnalyticsService, analytics_cache, get_cached
+from app.services.contact_service import ContactService, submission_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_submission_cache():
+    submission_cache.local.clear()
+    yield
+    submission_cache.local.clear()
+
+
+async def add_contacts(db, rows: list[tuple[str, int]]) -> list[Contact]:
+    """Insert contacts as (status, days ago) and rebuild the rollups"""
+    now = datetime.now(timezone.utc)
+    contacts = [
+        Contact(
+            name=f"Lead {i}", email=f"lead{i}@example.com", company=f"Company {i % 2}",
+            message=f"Message {i}", status=status, created_at=now - timedelta(days=days_ago),
+        )
+        for i, (status, days_ago) in enumerate(rows)
+    ]
+    db.add_all(contacts)
+    await db.commit()
+    await AnalyticsService(db).rebuild()
+    return contacts
+
+
+async def test_summary_reports_every_status(db):
+    await add_contacts(db, [("new", 0), ("new", 3), ("contacted", 0), ("qualified", 10), ("closed", 30)])
+
+    summary = await AnalyticsService(db).get_summary()
+
+    assert summary == {
+        "total_contacts": 5,
+        "by_status": {"new": 2, "contacted": 1, "qualified": 1, "closed": 1},
+        "today": 2,
+        "this_week": 3,
+        "conversion_rate": 60.0,
+    }
+    assert tuple(summary["by_status"]) == CONTACT_STATUSES
+
+
+async def test_summary_of_no_contacts(db):
+    summary = await AnalyticsService(db).get_summary()
+
+    assert summary["total_contacts"] == 0
+    assert summary["by_status"] == dict.fromkeys(CONTACT_STATUSES, 0)
+    assert summary["conversion_rate"] == 0
+
+
+async def rollups(db) -> tuple[set, set]:
+    """Non-zero rollup rows (deltas leave zero rows behind, a rebuild doesn't)"""
+    daily = await db.execute(select(ContactDailyStat.day, ContactDailyStat.status, ContactDailyStat.count))
+    companies = await db.execute(select(CompanyStat.company, CompanyStat.count))
+    return (
+        {tuple(row) for row in daily if row.count},
+        {tuple(row) for row in companies if row.count},
+    )
+
+
+async def test_write_deltas_match_a_full_recount(db):
+    service = ContactService(db)
+    contacts = []
+    for i in range(4):
+        contact, _ = await service.create_contact(ContactCreate(
+            name=f"Lead {i}", email=f"lead{i}@example.com", company="Acme" if i % 2 else "Globex",
+            message=f"Message {i}",
+        ))
+        contacts.append(contact)
+    await service.update_contact_status(contacts[0].id, "contacted")
+    await service.update_contact_status(contacts[1].id, "qualified")
+    await service.update_contact_status(contacts[1].id, "closed")
+    await service.delete_contact(contacts[2].id)
+
+    maintained = await rollups(db)
+    await AnalyticsService(db).rebuild()
+
+    assert maintained == await rollups(db)
+    today = contacts[0].created_at.date()
+    assert maintained == (
+        {(today, "new", 1), (today, "contacted", 1), (today, "closed", 1)},
+        {("Acme", 2), ("Globex", 1)},
+    )
+
+
+async def test_rebuild_replaces_drifted_rollups(db):
+    contacts = await add_contacts(db, [("new", 0), ("closed", 2)])
+    db.add(CompanyStat(company="Gone", count=5))
+    await db.merge(ContactDailyStat(day=contacts[0].created_at.date(), status="new", count=99))
+    await db.commit()
+
+    await AnalyticsService(db).rebuild()
+
+    daily, companies = await rollups(db)
+    assert sum(count for _, _, count in daily) == 2
+    assert companies == {("Company 0", 1), ("Company 1", 1)}
+
+
+async def test_cached_summary_is_invalidated_by_writes(db):
+    await analytics_cache.invalidate()
+    assert (await get_cached("get_summary"))["total_contacts"] == 0
+
+    # Rollups changed behind the service's back are not noticed...
+    db.add(ContactDailyStat(day=datetime.now(timezone.utc).date(), status="new", count=1))
+    await db.commit()
+    hits = analytics_cache.hits
+    assert (await get_cached("get_summary"))["total_contacts"] == 0
+    assert analytics_cache.hits == hits + 1
+
+    # ...but every contact write invalidates the cached responses
+    service = ContactService(db)
+    contact, _ = await service.create_contact(ContactCreate(name="Ana", email="ana@example.com", message="Hi"))
+    assert (await get_cached("get_summary"))["total_contacts"] == 2
+
+    await service.update_contact_status(contact.id, "closed")
+    assert (await get_cached("get_summary"))["by_status"]["closed"] == 1
+
+    await service.delete_contact(contact.id)
+    assert (await get_cached("get_summary"))["total_contacts"] == 1
+
+
+async def test_concurrent_misses_compute_once():
+    cache = ResponseCache("test", ttl=60, stale_ttl=60)
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    values = await asyncio.gather(*(cache.get_or_compute(("summary",), compute) for _ in range(5)))
+
+    assert values == [1] * 5
+    assert calls == 1
+
+
+async def test_stale_entry_is_served_while_it_refreshes():
+    cache = ResponseCache("test", ttl=0, stale_ttl=60)
+    values = iter(["old", "new"])
+
+    async def compute():
+        return next(values)
+
+    assert await cache.get_or_compute(("summary",), compute) == "old"
+    assert await cache.get_or_compute(("summary",), compute) == "old"
+    await asyncio.gather(*cache._inflight.values())
+
+    assert cache.local.get("l0:summary")["value"] == "new"
+    assert cache.stale_hits == 1 and cache.misses == 1
@@ -0,0 +1,110 @@
+"""
+Authentication Tests
+Deactivated users losing access, with role claims in tokens and across workers
+"""
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core import cache as cache_module
+from app.core import security
+from app.core.cache import TwoTierCache
+from app.core.config import settings
+from app.core.security import create_access_token, user_cache, user_claims
+from app.main import app
+from app.models.contact import Contact
+from app.models.user import User
+from app.services.user_service import UserService
+
+
+@pytest_asyncio.fixture
+async def deactivated(db, monkeypatch):
+    """A contact, and the token of a user deactivated after it was issued"""
+    monkeypatch.setattr(settings, "JWT_EMBED_USER_CLAIMS", True)
+    user_cache.local.clear()
+    user = User(email="admin@example.com", hashed_password="x", is_active=True)
+    contact = Contact(name="Ana", email="ana@example.com", message="Hi")
+    db.add_all([user, contact])
+    await db.commit()
+    token = create_access_token(user_claims(user))
+    await UserService(db).set_active(user.id, False)
+    return contact.id, {"Authorization": f"Bearer {token}"}
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+async def test_claims_still_open_read_endpoints(client, deactivated):
+    contact_id, headers = deactivated
+
+    response = await client.get(f"/api/v1/contacts/{contact_id}", headers=headers)
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("method, path", [
+    ("PUT", "/api/v1/contacts/{id}"),
+    ("POST", "/api/v1/contacts/{id}/rescore"),
+    ("DELETE", "/api/v1/contacts/{id}"),
+    ("GET", "/api/v1/contacts/export"),
+    ("POST", "/api/v1/contacts/import"),
+])
+async def test_deactivated_user_cannot_change_or_export_data(client, deactivated, method, path):
+    contact_id, headers = deactivated
+
+    response = await client.request(method, path.format(id=contact_id), headers=headers, json={"status": "lost"})
+
+    assert response.status_code == 403
+
+
+class FakeRedis:
+    """The few Redis commands the caches use, in memory"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+async def test_deactivation_reaches_other_workers(client, db, monkeypatch):
+    redis = FakeRedis()
+
+    async def get_redis():
+        return redis
+
+    monkeypatch.setattr(cache_module, "get_redis", get_redis)
+    user_cache.local.clear()
+    user = User(email="admin@example.com", hashed_password="x", is_active=True)
+    contact = Contact(name="Ana", email="ana@example.com", message="Hi")
+    db.add_all([user, contact])
+    await db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token(user_claims(user))}"}
+
+    # Another worker, with its own local tier, authenticates the user first
+    other_worker = TwoTierCache(
+        "auth:user", settings.USER_CACHE_MAX_ENTRIES, settings.USER_CACHE_TTL, local_first=False
+    )
+    monkeypatch.setattr(security, "user_cache", other_worker)
+    response = await client.put(f"/api/v1/contacts/{contact.id}", headers=headers, json={"status": "contacted"})
+    assert response.status_code == 200
+
+    # Deactivated through this worker's cache
+    monkeypatch.setattr(security, "user_cache", user_cache)
+    await UserService(db).set_active(user.id, False)
+
+    monkeypatch.setattr(security, "user_cache", other_worker)
+    response = await client.delete(f"/api/v1/contacts/{contact.id}", headers=headers)
+    assert response.status_code == 403
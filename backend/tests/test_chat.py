@@ -0,0 +1,99 @@
+"""
+Chat WebSocket Tests
+Malformed frames and stalled clients on the chat socket
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints.chat import _ChatConnection
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.fixture
+def socket(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    with TestClient(app).websocket_connect("/api/v1/chat/ws") as websocket:
+        yield websocket
+
+
+def receive_reply(websocket) -> list[dict]:
+    frames = [websocket.receive_json()]
+    while frames[-1]["event"] not in ("done", "error"):
+        frames.append(websocket.receive_json())
+    return frames
+
+
+@pytest.mark.parametrize("frame", [
+    '{"cancel": [1]}',
+    '{"cancel": {"id": 1}}',
+    '{"cancel": "1"}',
+    '{"cancel": true}',
+    'not json',
+    '[1, 2]',
+    '{"content": ""}',
+])
+def test_bad_frames_get_an_error_and_keep_the_socket_open(socket, frame):
+    socket.send_text(frame)
+    error = socket.receive_json()
+    assert (error["event"], error["id"]) == ("error", None)
+
+    socket.send_json({"content": "Hola"})
+    frames = receive_reply(socket)
+    assert [frame["event"] for frame in frames][0] == "start"
+    assert frames[-1]["event"] == "done"
+
+
+def test_binary_frame_gets_an_error(socket):
+    socket.send_bytes(b"\x00\x01")
+    assert socket.receive_json() == {"event": "error", "id": None, "detail": "Frames must be JSON text"}
+
+    socket.send_json({"content": "Hola"})
+    assert receive_reply(socket)[-1]["event"] == "done"
+
+
+def test_cancel_of_unknown_reply_is_ignored(socket):
+    socket.send_json({"cancel": 99})
+    socket.send_json({"content": "Hola"})
+    assert receive_reply(socket)[-1]["event"] == "done"
+
+
+class StalledWebSocket:
+    """Client that sends frames but never reads what it is sent"""
+
+    client = None
+    headers = {}
+
+    def __init__(self, frames: list[dict]):
+        self.frames = frames
+        self.closed_with = None
+
+    async def receive(self) -> dict:
+        if self.frames:
+            return self.frames.pop(0)
+        await asyncio.Event().wait()
+
+    async def send_json(self, data) -> None:
+        await asyncio.Event().wait()
+
+    async def close(self, code: int) -> None:
+        self.closed_with = code
+
+
+async def test_stalled_client_on_error_frame_is_closed(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_SEND_TIMEOUT", 0.05)
+    websocket = StalledWebSocket([{"type": "websocket.receive", "text": "not json"}])
+
+    await asyncio.wait_for(_ChatConnection(websocket).run(), 1)
+
+    assert websocket.closed_with == 1008
+
+
+async def test_disconnect_ends_the_connection():
+    websocket = StalledWebSocket([{"type": "websocket.disconnect", "code": 1000}])
+
+    await asyncio.wait_for(_ChatConnection(websocket).run(), 1)
+
+    assert websocket.closed_with is None
@@ -0,0 +1,128 @@
+"""
+Contact List Tests
+Server-side filters and sorting of the contacts list, and its views
+"""
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import inspect
+
+from app.core.database import AsyncSessionLocal
+from app.core.security import Principal, get_current_principal
+from app.main import app
+from app.models.contact import Contact
+from app.schemas.contact import CONTACT_SUMMARY_FIELDS, ContactSummary
+from app.services.contact_service import ContactService
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    app.dependency_overrides[get_current_principal] = lambda: Principal(id=1, is_active=True, is_superuser=False)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest_asyncio.fixture
+async def contacts(db) -> list[Contact]:
+    rows = [
+        # status, priority, score, company
+        ("new", "high", 80, "Acme"),
+        ("new", "low", 20, "acme"),
+        ("contacted", "high", 95, "Globex"),
+        ("new", None, None, "Acme"),
+        ("closed", "medium", 50, None),
+    ]
+    contacts = [
+        Contact(
+            name=f"Lead {i}", email=f"lead{i}@example.com", message=f"Message {i}",
+            status=status, ai_priority=priority, ai_score=score, company=company,
+            ai_insights={"summary": "..."}, ai_suggested_response="Hello",
+            created_at=START + timedelta(days=i),
+        )
+        for i, (status, priority, score, company) in enumerate(rows)
+    ]
+    db.add_all(contacts)
+    await db.commit()
+    return contacts
+
+
+async def list_ids(client, **params) -> list[int]:
+    response = await client.get("/api/v1/contacts/", params=params)
+    assert response.status_code == 200, response.text
+    return [contact["id"] for contact in response.json()]
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({}, [4, 3, 2, 1, 0]),
+    ({"status": "new"}, [3, 1, 0]),
+    ({"ai_priority": "high"}, [2, 0]),
+    ({"company": "ACME"}, [3, 1, 0]),
+    ({"min_score": 50, "max_score": 90}, [4, 0]),
+    ({"created_after": "2024-01-02T00:00:00Z", "created_before": "2024-01-04T00:00:00Z"}, [2, 1]),
+    ({"status": "new", "company": "acme", "min_score": 10}, [1, 0]),
+    ({"sort": "created_at"}, [0, 1, 2, 3, 4]),
+    # Unscored contacts sort below every score
+    ({"sort": "-ai_score"}, [2, 0, 4, 1, 3]),
+    ({"sort": "ai_score"}, [3, 1, 4, 0, 2]),
+])
+async def test_filters_and_sort(client, contacts, params, expected):
+    assert await list_ids(client, **params) == [contacts[i].id for i in expected]
+
+
+async def test_cursor_pages_follow_filters_and_sort(client, contacts):
+    params = {"company": "acme", "sort": "-ai_score", "limit": 1}
+    pages = []
+    while True:
+        response = await client.get("/api/v1/contacts/", params=params)
+        pages.append([contact["id"] for contact in response.json()])
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    assert pages == [[contacts[0].id], [contacts[1].id], [contacts[3].id]]
+
+
+@pytest.mark.parametrize("params", [
+    {"sort": "name"},
+    {"status": "archived"},
+    {"min_score": 101},
+])
+async def test_invalid_filters_are_rejected(client, params):
+    response = await client.get("/api/v1/contacts/", params=params)
+    assert response.status_code == 422
+
+
+async def test_summary_view_leaves_out_long_fields(client, contacts):
+    response = await client.get("/api/v1/contacts/", params={"view": "summary", "limit": 2})
+
+    items = response.json()
+    assert [set(item) for item in items] == [set(ContactSummary.model_fields)] * 2
+    created_at = items[0].pop("created_at")
+    assert created_at.startswith("2024-01-05T00:00:00")
+    assert items[0] == {
+        "id": contacts[4].id, "name": "Lead 4", "email": "lead4@example.com", "company": None,
+        "status": "closed", "ai_score": 50, "ai_priority": "medium", "ai_status": "pending",
+    }
+    assert "x-next-cursor" in response.headers
+
+
+async def test_full_view_is_the_default(client, contacts):
+    response = await client.get("/api/v1/contacts/", params={"limit": 1})
+
+    item = response.json()[0]
+    assert item["message"] == "Message 4"
+    assert item["ai_suggested_response"] == "Hello"
+
+
+async def test_summary_view_does_not_load_long_columns(contacts):
+    async with AsyncSessionLocal() as session:
+        loaded, _ = await ContactService(session).list_contacts(fields=CONTACT_SUMMARY_FIELDS)
+
+    unloaded = inspect(loaded[0]).unloaded
+    assert {"message", "ai_insights", "ai_suggested_response"} <= unloaded
+    assert not unloaded & set(CONTACT_SUMMARY_FIELDS)
@@ -0,0 +1,170 @@
+"""
+Database Session Tests
+Read replica routing and when request sessions commit
+"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, func, select, update
+
+from app.core import database
+from app.core.config import settings
+from app.core.database import ReplicaRouter, engine, get_db
+from app.models.contact import Contact
+
+
+@pytest_asyncio.fixture
+async def router(tmp_path):
+    router = ReplicaRouter([f"sqlite+aiosqlite:///{tmp_path}/replica{i}.db" for i in range(2)])
+    yield router
+    await router.stop()
+
+
+async def test_replica_sessions_are_read_only(router, monkeypatch):
+    monkeypatch.setattr(database, "replica_router", router)
+
+    async with database.read_session() as session:
+        bind = session.get_bind()
+
+    assert bind.url.database in {replica.url.database for replica in router.engines}
+    assert bind.get_execution_options()["postgresql_readonly"] is True
+
+
+def bound_database(session) -> str:
+    return session.get_bind().url.database
+
+
+async def test_reads_rotate_over_healthy_replicas(router, monkeypatch):
+    monkeypatch.setattr(database, "replica_router", router)
+    await router.check()
+    assert router.healthy == [True, True]
+
+    databases = []
+    for _ in range(4):
+        async with database.read_session() as session:
+            databases.append(bound_database(session))
+
+    assert databases[:2] == databases[2:]
+    assert set(databases) == {replica.url.database for replica in router.engines}
+
+
+async def test_reads_fall_back_to_the_primary(router, monkeypatch):
+    monkeypatch.setattr(database, "replica_router", router)
+    router.healthy = [False, False]
+
+    async with database.read_session() as session:
+        assert bound_database(session) == engine.url.database
+    assert router.stats()["primary_fallbacks"] == 1
+
+
+async def test_failing_or_lagging_replicas_leave_the_rotation(tmp_path, monkeypatch):
+    router = ReplicaRouter([
+        f"sqlite+aiosqlite:///{tmp_path}/replica.db",
+        f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db",  # cannot be opened
+    ])
+    try:
+        await router.check()
+        assert router.healthy == [True, False]
+        assert router.lag == [0.0, None]
+        for _ in range(3):
+            assert router.choose() is router.read_engines[0]
+
+        # Lag beyond DATABASE_READ_MAX_LAG counts as unhealthy too
+        monkeypatch.setattr(settings, "DATABASE_READ_MAX_LAG", -1)
+        await router.check()
+        assert router.healthy == [False, False]
+        assert router.choose() is None
+    finally:
+        await router.stop()
+
+
+async def test_read_your_writes_window_reads_the_primary(router, monkeypatch):
+    monkeypatch.setattr(database, "replica_router", router)
+
+    token = database._reads_from_primary.set(True)
+    try:
+        async with database.read_session() as session:
+            assert bound_database(session) == engine.url.database
+    finally:
+        database._reads_from_primary.reset(token)
+
+
+@pytest.fixture
+def commits():
+    """COMMITs sent on the primary"""
+    sent = []
+
+    def on_commit(conn):
+        sent.append(conn)
+
+    event.listen(engine.sync_engine, "commit", on_commit)
+    yield sent
+    event.remove(engine.sync_engine, "commit", on_commit)
+
+
+async def run_request(work, error: Exception = None):
+    """Drive get_db like FastAPI does for one request"""
+    dependency = get_db()
+    session = await dependency.__anext__()
+    await work(session)
+    if error is not None:
+        with pytest.raises(type(error)):
+            await dependency.athrow(error)
+    else:
+        with pytest.raises(StopAsyncIteration):
+            await dependency.__anext__()
+
+
+async def contact_names(db) -> list[str]:
+    return list((await db.execute(select(Contact.name).order_by(Contact.id))).scalars())
+
+
+async def add_contact(session):
+    session.add(Contact(name="Ana", email="ana@example.com", message="Hi"))
+
+
+async def rename_all(session):
+    await session.execute(update(Contact).values(name="Renamed"))
+
+
+async def test_read_only_request_does_not_commit(db, commits):
+    async def read(session):
+        await session.execute(select(func.count(Contact.id)))
+
+    await run_request(read)
+
+    assert commits == []
+
+
+async def test_request_with_new_objects_commits(db, commits):
+    await run_request(add_contact)
+
+    assert len(commits) == 1
+    assert await contact_names(db) == ["Ana"]
+
+
+async def test_request_with_bulk_update_commits(db, commits):
+    # A bulk UPDATE leaves no trace in session.dirty
+    await run_request(add_contact)
+    await run_request(rename_all)
+
+    assert len(commits) == 2
+    assert await contact_names(db) == ["Renamed"]
+
+
+async def test_request_that_already_committed_is_not_committed_again(db, commits):
+    async def write_then_read(session):
+        await add_contact(session)
+        await session.commit()
+        await session.execute(select(Contact.id))
+
+    await run_request(write_then_read)
+
+    assert len(commits) == 1
+
+
+async def test_failed_request_is_rolled_back(db, commits):
+    await run_request(add_contact)
+    await run_request(rename_all, error=RuntimeError("endpoint failed"))
+
+    assert len(commits) == 1
+    assert await contact_names(db) == ["Ana"]
@@ -0,0 +1,101 @@
+"""
+Database Metrics Tests
+Pool options per dialect, pool and statement instrumentation, and autotuning
+"""
+import logging
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core import db_metrics
+from app.core.config import settings
+from app.core.db_metrics import (
+    InstrumentedQueuePool,
+    PoolAutotuner,
+    instrument_engine,
+    pool_options,
+    pool_stats,
+    pool_utilization,
+)
+
+
+def test_pool_options_only_size_queue_pools():
+    assert pool_options("postgresql+asyncpg://user@localhost/db") == {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+    }
+    assert pool_options("sqlite+aiosqlite:///app.db") == {"poolclass": NullPool}
+
+
+@pytest_asyncio.fixture
+async def pooled(tmp_path, request):
+    """Engine on a one-connection instrumented pool that times out quickly"""
+    name = request.node.name
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/pool.db",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    instrument_engine(engine, name)
+    yield name, engine
+    db_metrics._engines.pop(name, None)
+    await engine.dispose()
+
+
+async def test_pool_and_statements_are_reported(pooled, monkeypatch, caplog):
+    name, engine = pooled
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 0.000001)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.db_metrics"):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert pool_utilization(name) == 1.0
+
+    stats = pool_stats()["engines"][name]
+    assert stats["pool"]["checked_out"] == 0
+    assert stats["pool"]["connects"] == 1
+    assert stats["checkout_wait_seconds"]["count"] == 1
+    assert stats["hold_seconds"]["count"] == 1
+    assert stats["statements"]["select"]["count"] == 1
+    assert stats["slow_statements"] == 1
+    assert "Slow query on" in caplog.text and "SELECT 1" in caplog.text
+
+
+async def test_autotune_raises_overflow_after_timeouts_then_lowers_it(pooled, monkeypatch):
+    name, engine = pooled
+    monkeypatch.setattr(settings, "DB_POOL_MAX_CONNECTIONS", 3)
+    tuner = PoolAutotuner(db_metrics._engines[name], apply=True)
+    pool = engine.sync_engine.pool
+
+    async with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    decision = tuner.tick()
+    assert decision["timeouts"] == 1
+    assert pool.max_overflow == decision["max_overflow"] == 1
+
+    # A quiet interval steps back toward the configured overflow
+    tuner.tick()
+    assert pool.max_overflow == 0
+
+
+async def test_advise_mode_leaves_the_pool_alone(pooled):
+    name, engine = pooled
+    tuner = PoolAutotuner(db_metrics._engines[name], apply=False)
+
+    async with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    decision = tuner.tick()
+    assert decision["max_overflow"] == 1 and not decision["applied"]
+    assert engine.sync_engine.pool.max_overflow == 0
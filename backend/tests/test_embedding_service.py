@@ -0,0 +1,88 @@
+"""
+Embedding Service Tests
+Keeping the in-process similarity index in step with the database
+"""
+import pytest
+from sqlalchemy import delete
+
+from app.models.contact import Contact
+from app.services.contact_service import ContactService
+from app.services.embedding_service import EmbeddingService, contact_text, embed_texts, embedding_index
+
+
+@pytest.fixture(autouse=True)
+def empty_index():
+    embedding_index.__init__()
+    yield
+    embedding_index.__init__()
+
+
+async def add_contacts(db, messages: list[str]) -> list[Contact]:
+    contacts = [Contact(name="Ana", email=f"ana{i}@example.com", message=message) for i, message in enumerate(messages)]
+    db.add_all(contacts)
+    await db.commit()
+    return contacts
+
+
+async def query_vector(contact: Contact):
+    return (await embed_texts([contact_text(contact.name, contact.company, contact.message)]))[0]
+
+
+async def test_vectors_join_the_index_only_after_commit(db):
+    [contact] = await add_contacts(db, ["Need a chatbot"])
+    service = EmbeddingService(db)
+
+    await service.embed_contacts([contact])
+    assert len(embedding_index) == 0
+    await db.rollback()
+    embedding_index.discard(db)
+    embedding_index.publish(db)
+    assert len(embedding_index) == 0
+
+    await db.refresh(contact)
+    await service.embed_contacts([contact])
+    await db.commit()
+    embedding_index.publish(db)
+    assert len(embedding_index) == 1
+
+
+async def test_deleted_contact_leaves_the_index(db):
+    contacts = await add_contacts(db, ["Need a chatbot", "Need a chatbot please"])
+    service = EmbeddingService(db)
+    await service.embed_contacts(contacts)
+    await db.commit()
+    embedding_index.publish(db)
+
+    await ContactService(db).delete_contact(contacts[1].id)
+
+    assert len(embedding_index) == 1
+    assert [contact_id for contact_id, _ in await service.nearest(await query_vector(contacts[1]), 5)] == [contacts[0].id]
+
+
+async def test_nearest_skips_contacts_deleted_elsewhere(db):
+    contacts = await add_contacts(db, ["Need a chatbot", "Need a chatbot please", "Website redesign"])
+    service = EmbeddingService(db)
+    await service.embed_contacts(contacts)
+    await db.commit()
+    embedding_index.publish(db)
+
+    # As another process would, without touching this process's index
+    await db.execute(delete(Contact).where(Contact.id == contacts[1].id))
+    await db.commit()
+
+    neighbours = await service.nearest(await query_vector(contacts[0]), 2, exclude=contacts[0].id)
+
+    assert [contact_id for contact_id, _ in neighbours] == [contacts[2].id]
+    assert len(embedding_index) == 2
+
+
+async def test_duplicate_found_after_scoring_commit(db):
+    original, repeat = await add_contacts(db, ["Quote for a support chatbot", "Quote for a support chatbot"])
+
+    assert await EmbeddingService(db).find_duplicate(original) is None
+    await db.commit()
+    embedding_index.publish(db)
+
+    duplicate = await EmbeddingService(db).find_duplicate(repeat)
+
+    assert duplicate is not None and duplicate.id == original.id
@@ -0,0 +1,90 @@
+"""
+Export Service Tests
+CSV, NDJSON and Parquet encoding of contact exports
+"""
+import csv
+import io
+import json
+
+import pytest
+
+from app.models.contact import Contact
+from app.schemas.contact import ContactFilters
+from app.services.export_service import EXPORT_FIELDS, check_format, export_contacts
+
+INSIGHTS = {"urgency": "high", "budget": "unknown", "industry": "retail", "pain_points": ["support load"]}
+
+
+@pytest.fixture
+async def contacts(db):
+    original = Contact(
+        name="Ana", email="ana@example.com", company="Acme", message='Quote "chatbot", please',
+        ai_score=80, ai_priority="high", ai_insights=INSIGHTS, ai_status="scored",
+    )
+    db.add(original)
+    await db.flush()
+    db.add_all([
+        Contact(name="Ana López", email="ana@example.com", message="Same again", duplicate_of_id=original.id),
+        Contact(name="Bea", email="bea@example.com", message="Line one\nline two", status="contacted"),
+    ])
+    await db.commit()
+
+
+async def export(file_format: str, filters=None) -> bytes:
+    return b"".join([chunk async for chunk in export_contacts(file_format, filters)])
+
+
+async def test_csv_export(contacts):
+    rows = list(csv.DictReader(io.StringIO((await export("csv")).decode("utf-8"))))
+
+    assert list(rows[0]) == list(EXPORT_FIELDS)
+    assert [row["name"] for row in rows] == ["Ana", "Ana López", "Bea"]
+    assert rows[0]["message"] == 'Quote "chatbot", please'
+    assert json.loads(rows[0]["ai_insights"]) == INSIGHTS
+    assert rows[1]["duplicate_of_id"] == rows[0]["id"]
+    assert rows[2]["message"] == "Line one\nline two"
+
+
+async def test_csv_export_without_rows_has_header(contacts):
+    data = await export("csv", ContactFilters(status="lost"))
+    assert data.decode("utf-8").splitlines() == [",".join(EXPORT_FIELDS)]
+
+
+async def test_ndjson_export(contacts):
+    rows = [json.loads(line) for line in (await export("ndjson")).decode("utf-8").splitlines()]
+
+    assert [row["email"] for row in rows] == ["ana@example.com", "ana@example.com", "bea@example.com"]
+    assert rows[0]["ai_insights"] == INSIGHTS
+    assert rows[1]["duplicate_of_id"] == rows[0]["id"]
+    assert rows[2]["duplicate_of_id"] is None
+    assert isinstance(rows[0]["created_at"], str)
+
+
+async def test_parquet_export(contacts):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    table = pq.read_table(io.BytesIO(await export("parquet")))
+
+    assert table.column_names == list(EXPORT_FIELDS)
+    assert str(table.schema.field("id").type) == "int64"
+    assert str(table.schema.field("duplicate_of_id").type) == "int64"
+    assert str(table.schema.field("created_at").type) == "timestamp[us, tz=UTC]"
+    rows = table.to_pylist()
+    assert rows[1]["duplicate_of_id"] == rows[0]["id"]
+    assert rows[2]["duplicate_of_id"] is None
+    assert json.loads(rows[0]["ai_insights"]) == INSIGHTS
+
+
+async def test_parquet_export_without_rows(contacts):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    table = pq.read_table(io.BytesIO(await export("parquet", ContactFilters(status="lost"))))
+
+    assert table.num_rows == 0
+    assert table.column_names == list(EXPORT_FIELDS)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        check_format("xlsx")
+    check_format("csv")
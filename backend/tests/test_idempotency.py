@@ -0,0 +1,100 @@
+"""
+Idempotent Submission Tests
+Idempotency-Key replays and repeated contact form submissions
+"""
+import httpx
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.main import app
+from app.models.contact import Contact
+from app.schemas.contact import ContactCreate
+from app.services.contact_service import (
+    ContactService,
+    IdempotencyKeyReusedError,
+    idempotency_cache,
+    submission_cache,
+)
+
+SUBMISSION = {"name": "Ana", "email": "ana@example.com", "company": "Acme", "message": "We need a chatbot"}
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    idempotency_cache.local.clear()
+    submission_cache.local.clear()
+    yield
+    idempotency_cache.local.clear()
+    submission_cache.local.clear()
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+async def contact_count(db) -> int:
+    return (await db.execute(select(func.count(Contact.id)))).scalar_one()
+
+
+async def test_same_key_returns_original_contact(db):
+    service = ContactService(db)
+
+    first, created = await service.create_contact(ContactCreate(**SUBMISSION), "key-1")
+    again, created_again = await service.create_contact(ContactCreate(**SUBMISSION), "key-1")
+
+    assert (created, created_again) == (True, False)
+    assert again.id == first.id
+    assert await contact_count(db) == 1
+
+
+async def test_replay_is_found_without_the_cache(db):
+    service = ContactService(db)
+    first, _ = await service.create_contact(ContactCreate(**SUBMISSION), "key-1")
+    # As on another worker, or after the cache entry expired
+    idempotency_cache.local.clear()
+
+    again, created = await service.create_contact(ContactCreate(**SUBMISSION), "key-1")
+
+    assert not created
+    assert again.id == first.id
+
+
+async def test_reused_key_with_different_body_is_rejected(db):
+    service = ContactService(db)
+    await service.create_contact(ContactCreate(**SUBMISSION), "key-1")
+
+    with pytest.raises(IdempotencyKeyReusedError):
+        await service.create_contact(ContactCreate(**{**SUBMISSION, "message": "Something else"}), "key-1")
+    assert await contact_count(db) == 1
+
+
+async def test_repeat_without_key_is_deduplicated(db, monkeypatch):
+    monkeypatch.setattr(settings, "CONTACT_DEDUPE_WINDOW", 300)
+    service = ContactService(db)
+
+    first, _ = await service.create_contact(ContactCreate(**SUBMISSION))
+    again, created = await service.create_contact(ContactCreate(**SUBMISSION))
+    other, other_created = await service.create_contact(ContactCreate(**{**SUBMISSION, "message": "Another question"}))
+
+    assert not created and again.id == first.id
+    assert other_created and other.id != first.id
+
+
+async def test_replayed_request_answers_200_with_header(client):
+    headers = {"Idempotency-Key": "key-http"}
+
+    first = await client.post("/api/v1/contacts/", json=SUBMISSION, headers=headers)
+    replay = await client.post("/api/v1/contacts/", json=SUBMISSION, headers=headers)
+    reused = await client.post("/api/v1/contacts/", json={**SUBMISSION, "message": "Different question"}, headers=headers)
+
+    assert first.status_code == 201
+    assert "Idempotent-Replayed" not in first.headers
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == first.json()["id"]
+    assert reused.status_code == 422
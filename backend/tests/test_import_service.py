@@ -0,0 +1,109 @@
+"""
+Import Service Tests
+CSV and NDJSON parsing, per-row error reporting and chunked loading
+"""
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.analytics import CompanyStat
+from app.models.contact import Contact
+from app.services.import_service import ContactImporter
+
+CSV = (
+    "\ufeffName,Email,Phone,Company,Message\n"
+    "Ana,ana@example.com,,Acme,\"Needs a chatbot,\nand a CRM\"\n"
+    "Bo,not-an-email,,Acme,Hello\n"
+    "Cy,cy@example.com,Acme\n"
+    "\n"
+    "Dé,de@example.com,555-0100,,Olá\n"
+    "Ed,ed@example.com,,Globex,\"never closed\n"
+).encode("utf-8")
+
+
+async def pieces(data: bytes, size: int = 7):
+    """Stream data in small pieces, splitting lines and multi-byte characters"""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def imported(db) -> list[tuple]:
+    result = await db.execute(select(Contact.name, Contact.message, Contact.phone).order_by(Contact.id))
+    return [tuple(row) for row in result]
+
+
+async def test_csv_rows_are_imported_or_reported(db):
+    result = await ContactImporter(db, score=False).run(pieces(CSV), "csv")
+
+    assert (result.imported, result.failed) == (2, 3)
+    assert [(error.line, error.error.split(":")[0]) for error in result.errors] == [
+        (4, "email"),
+        (5, "Expected 5 columns, got 3"),
+        (8, "Unterminated quoted field"),
+    ]
+    assert await imported(db) == [
+        ("Ana", "Needs a chatbot,\nand a CRM", None),
+        ("Dé", "Olá", "555-0100"),
+    ]
+    companies = await db.execute(select(CompanyStat.company, CompanyStat.count))
+    assert {tuple(row) for row in companies} == {("Acme", 1)}
+
+
+async def test_ndjson_rows_are_imported_or_reported(db):
+    lines = [
+        json.dumps({"name": "Ana", "email": "ana@example.com", "message": "Hi"}),
+        "{not json",
+        json.dumps(["Bo", "bo@example.com"]),
+        "",
+        json.dumps({"name": "", "email": "cy@example.com", "message": "Hi"}),
+        json.dumps({"name": "Dee", "email": "dee@example.com", "message": "Hello"}),
+    ]
+
+    result = await ContactImporter(db, score=False).run(pieces("\n".join(lines).encode()), "ndjson")
+
+    assert (result.imported, result.failed) == (2, 3)
+    assert [error.line for error in result.errors] == [2, 3, 5]
+    assert result.errors[0].error.startswith("Invalid JSON")
+    assert result.errors[1].error == "Expected a JSON object"
+    assert result.errors[2].error.startswith("name:")
+    assert [name for name, _, _ in await imported(db)] == ["Ana", "Dee"]
+
+
+async def test_failed_chunk_is_reported_and_the_import_continues(db):
+    rows = "".join(f"Lead {i},lead{i}@example.com,Hi\n" for i in range(6))
+    importer = ContactImporter(db, chunk_size=2, score=False)
+    insert = importer._insert
+    calls = 0
+
+    async def fail_second_chunk(contacts, created_at):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("connection lost")
+        return await insert(contacts, created_at)
+
+    importer._insert = fail_second_chunk
+    result = await importer.run(pieces(f"name,email,message\n{rows}".encode()), "csv")
+
+    assert (result.imported, result.failed) == (4, 2)
+    assert [(error.line, error.error) for error in result.errors] == [
+        (4, "Chunk failed to load: RuntimeError"),
+        (5, "Chunk failed to load: RuntimeError"),
+    ]
+    assert [name for name, _, _ in await imported(db)] == ["Lead 0", "Lead 1", "Lead 4", "Lead 5"]
+
+
+async def test_reported_errors_are_capped(db, monkeypatch):
+    monkeypatch.setattr(settings, "IMPORT_MAX_REPORTED_ERRORS", 1)
+    data = b"name,email,message\n" + b"x,bad,Hi\n" * 3
+
+    result = await ContactImporter(db, score=False).run(pieces(data), "csv")
+
+    assert (result.imported, result.failed, len(result.errors)) == (0, 3, 1)
+
+
+async def test_unknown_format_is_rejected(db):
+    with pytest.raises(ValueError):
+        await ContactImporter(db).run(pieces(b""), "xml")
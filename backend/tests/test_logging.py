@@ -0,0 +1,91 @@
+"""
+Logging Tests
+Queue-based setup, JSON output, request context and sampling
+"""
+import json
+import logging
+import queue
+
+import pytest
+
+from app.core import logging as app_logging
+from app.core.config import settings
+from app.core.logging import ContextQueueHandler, SamplingFilter, request_id_var, setup_logging, stop_logging
+
+
+def record(name: str, level: int, message: str = "hello") -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, message, None, None)
+
+
+@pytest.fixture
+def json_log_file(tmp_path, monkeypatch):
+    """Log file setup_logging writes JSON lines to; logging is stopped afterwards"""
+    log_file = tmp_path / "logs" / "app.log"
+    monkeypatch.setattr(settings, "LOG_FILE", str(log_file))
+    monkeypatch.setattr(settings, "LOG_FORMAT", "json")
+    root = logging.getLogger()
+    level = root.level
+    yield log_file
+    stop_logging()
+    root.setLevel(level)
+
+
+def test_setup_is_idempotent_and_writes_json(json_log_file):
+    setup_logging()
+    setup_logging()
+
+    root = logging.getLogger()
+    assert sum(isinstance(handler, ContextQueueHandler) for handler in root.handlers) == 1
+
+    token = request_id_var.set("req-1")
+    try:
+        logging.getLogger("app.test").warning("Scored %s leads", 3, extra={"batch": 7})
+    finally:
+        request_id_var.reset(token)
+    stop_logging()
+
+    entry = json.loads(json_log_file.read_text().splitlines()[-1])
+    assert entry["message"] == "Scored 3 leads"
+    assert (entry["level"], entry["logger"]) == ("WARNING", "app.test")
+    assert (entry["batch"], entry["request_id"]) == (7, "req-1")
+    assert not any(isinstance(handler, ContextQueueHandler) for handler in root.handlers)
+
+
+def test_stopped_logging_can_be_set_up_again(json_log_file):
+    setup_logging()
+    stop_logging()
+    setup_logging()
+
+    assert app_logging._listener is not None
+    assert sum(isinstance(handler, ContextQueueHandler) for handler in logging.getLogger().handlers) == 1
+
+
+def test_sampling_only_drops_info_of_listed_loggers():
+    sampling = SamplingFilter(0.0, ["app.noisy"])
+
+    assert not sampling.filter(record("app.noisy", logging.INFO))
+    assert not sampling.filter(record("app.noisy.child", logging.DEBUG))
+    assert sampling.filter(record("app.noisy", logging.WARNING))
+    assert sampling.filter(record("app.noisy_neighbour", logging.INFO))
+    assert sampling.filter(record("app.other", logging.INFO))
+
+
+def test_sampling_keeps_roughly_its_rate(monkeypatch):
+    draws = iter([0.1, 0.3, 0.6, 0.9])
+    monkeypatch.setattr(app_logging.random, "random", lambda: next(draws))
+    sampling = SamplingFilter(0.5, [])
+
+    kept = [sampling.filter(record("app.any", logging.INFO)) for _ in range(4)]
+
+    assert kept == [True, True, False, False]
+    assert SamplingFilter(1.0, []).filter(record("app.any", logging.DEBUG))
+
+
+def test_full_queue_drops_records():
+    handler = ContextQueueHandler(queue.Queue(maxsize=1))
+
+    handler.emit(record("app.test", logging.INFO, "first"))
+    handler.emit(record("app.test", logging.INFO, "second"))
+
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "first"
@@ -0,0 +1,108 @@
+"""
+Metrics Tests
+Prometheus rendering, per-route HTTP metrics and multi-process aggregation
+"""
+import json
+import os
+
+import httpx
+import pytest_asyncio
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.metrics import http_request_duration, http_requests, merge, render_prometheus
+from app.main import app
+
+
+def histogram_family(samples: list[dict]) -> dict:
+    return {
+        "name": "job_seconds", "help": "Job time", "type": "histogram",
+        "labelnames": ["queue"], "buckets": [0.1, 1.0], "samples": samples,
+    }
+
+
+def test_histogram_is_rendered_cumulatively():
+    family = histogram_family([{"labels": ['fast "lane"'], "counts": [2, 1, 1], "sum": 7.25}])
+
+    assert render_prometheus([family]).splitlines() == [
+        "# HELP job_seconds Job time",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{queue="fast \\"lane\\"",le="0.1"} 2',
+        'job_seconds_bucket{queue="fast \\"lane\\"",le="1"} 3',
+        'job_seconds_bucket{queue="fast \\"lane\\"",le="+Inf"} 4',
+        'job_seconds_sum{queue="fast \\"lane\\""} 7.25',
+        'job_seconds_count{queue="fast \\"lane\\""} 4',
+    ]
+
+
+def test_snapshots_are_summed_per_label_set():
+    first = histogram_family([{"labels": ["a"], "counts": [1, 0, 0], "sum": 0.05}])
+    second = histogram_family([
+        {"labels": ["a"], "counts": [0, 2, 0], "sum": 1.0},
+        {"labels": ["b"], "counts": [0, 0, 1], "sum": 3.0},
+    ])
+
+    merged = merge([[first], [second]])
+
+    assert merged[0]["samples"] == [
+        {"labels": ["a"], "counts": [1, 2, 0], "sum": 1.05},
+        {"labels": ["b"], "counts": [0, 0, 1], "sum": 3.0},
+    ]
+    # The inputs are left untouched
+    assert first["samples"][0]["counts"] == [1, 0, 0]
+
+
+def test_exited_workers_keep_counters_but_not_gauges(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_pid_alive", lambda pid: False)
+    families = [
+        {"name": "worker_jobs_total", "help": "Jobs", "type": "counter", "labelnames": [],
+         "samples": [{"labels": [], "value": 3}]},
+        {"name": "worker_busy", "help": "Busy", "type": "gauge", "labelnames": [],
+         "samples": [{"labels": [], "value": 1}]},
+    ]
+    (tmp_path / f"{os.getpid() + 1}.json").write_text(json.dumps({"written_at": 0, "families": families}))
+    (tmp_path / "garbage.json").write_text("not json")
+
+    names = {family["name"] for family in metrics.collect_all()}
+
+    assert "worker_jobs_total" in names
+    assert "worker_busy" not in names
+    assert "http_requests_total" in names
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+async def test_requests_are_labelled_by_route_template(client):
+    contact_route = f"{settings.API_V1_STR}/contacts/{{contact_id}}"
+    before = {
+        key: http_requests.labels(*key).value
+        for key in [("GET", "/health", "200"), ("GET", contact_route, "401"), ("GET", "unmatched", "404")]
+    }
+
+    await client.get("/health")
+    await client.get(f"{settings.API_V1_STR}/contacts/1")
+    await client.get(f"{settings.API_V1_STR}/contacts/2")
+    await client.get("/no/such/page")
+
+    after = {key: http_requests.labels(*key).value for key in before}
+    assert [after[key] - before[key] for key in before] == [1, 2, 1]
+    assert http_request_duration.labels("GET", contact_route).count >= 2
+
+
+async def test_metrics_endpoint_renders_prometheus_text(client):
+    await client.get("/health")
+
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE http_request_duration_seconds histogram" in lines
+    assert any(line.startswith('http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}') for line in lines)
+    assert any(line.startswith('http_requests_total{method="GET",route="/health",status="200"}') for line in lines)
+    assert "# TYPE ai_score_requests_total counter" in lines
@@ -0,0 +1,134 @@
+"""
+Pagination Tests
+Opaque keyset cursors and paging through the contacts list with them
+"""
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from app.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.core.security import Principal, get_current_principal
+from app.main import app
+from app.models.contact import Contact
+from app.schemas.contact import ContactFilters
+from app.services.contact_service import ContactService
+
+
+def test_cursor_round_trip():
+    created = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    values = ["-created_at", created, 42]
+
+    cursor = encode_cursor(values)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, (str, datetime, int)) == values
+
+
+def test_cursor_keeps_numbers():
+    cursor = encode_cursor(["acme", 0.25, 7])
+    assert decode_cursor(cursor, (str, float, int)) == ["acme", 0.25, 7]
+    # A float field also takes a whole number
+    assert decode_cursor(encode_cursor(["acme", 1, 7]), (str, float, int)) == ["acme", 1, 7]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "bm90IGpzb24",  # base64 of "not json"
+    encode_cursor(["-created_at", 1]),  # wrong size
+    encode_cursor(["-created_at", {"dt": "yesterday"}, 1]),
+    encode_cursor(["-created_at", {"other": 1}, 1]),
+    "e30",  # base64 of "{}"
+    # Well-formed, but with values of the wrong type
+    encode_cursor(["-created_at", {"dt": "2024-01-01T00:00:00+00:00"}, "7"]),
+    encode_cursor(["-created_at", "2024-01-01", 7]),
+    encode_cursor(["-created_at", {"dt": "2024-01-01T00:00:00+00:00"}, True]),
+    encode_cursor(["-created_at", {"dt": "2024-01-01T00:00:00+00:00"}, 2 ** 40]),
+    encode_cursor([1, {"dt": "2024-01-01T00:00:00+00:00"}, 7]),
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, (str, datetime, int))
+
+
+async def add_contacts(db, scores: list) -> list[Contact]:
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    contacts = [
+        Contact(
+            name=f"Lead {i}", email=f"lead{i}@example.com", message="Hi",
+            ai_score=score, ai_priority="high" if score and score >= 60 else "low",
+            created_at=start + timedelta(hours=i),
+        )
+        for i, score in enumerate(scores)
+    ]
+    db.add_all(contacts)
+    await db.commit()
+    return contacts
+
+
+async def all_pages(service: ContactService, limit: int, **kwargs) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        contacts, cursor = await service.list_contacts(limit=limit, cursor=cursor, **kwargs)
+        pages.append([contact.id for contact in contacts])
+        if cursor is None:
+            return pages
+
+
+async def test_cursor_pages_cover_every_contact_once(db):
+    contacts = await add_contacts(db, [10, 20, 30, 40, 50])
+    ids = [contact.id for contact in contacts]
+
+    pages = await all_pages(ContactService(db), limit=2)
+
+    assert pages == [ids[4:2:-1], ids[2:0:-1], ids[:1]]
+
+
+async def test_cursor_breaks_ties_by_id(db):
+    contacts = await add_contacts(db, [50, 50, 50, 80, 50])
+    ids = [contact.id for contact in contacts]
+
+    pages = await all_pages(ContactService(db), limit=2, sort="ai_score")
+
+    assert sum(pages, []) == [ids[0], ids[1], ids[2], ids[4], ids[3]]
+
+
+async def test_cursor_pages_respect_filters(db):
+    contacts = await add_contacts(db, [70, 10, 90, 20, 65])
+    ids = [contact.id for contact in contacts]
+
+    pages = await all_pages(ContactService(db), limit=1, sort="-ai_score", filters=ContactFilters(min_score=60))
+
+    assert pages == [[ids[2]], [ids[0]], [ids[4]]]
+
+
+async def test_cursor_from_another_sort_is_rejected(db):
+    await add_contacts(db, [10, 20, 30])
+    service = ContactService(db)
+    _, cursor = await service.list_contacts(limit=1, sort="ai_score")
+
+    with pytest.raises(InvalidCursorError):
+        await service.list_contacts(limit=1, cursor=cursor, sort="-created_at")
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    app.dependency_overrides[get_current_principal] = lambda: Principal(id=1, is_active=True, is_superuser=False)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.parametrize("path, cursor", [
+    ("/api/v1/contacts/?sort=ai_score", encode_cursor(["ai_score", "high", 1])),
+    ("/api/v1/contacts/?sort=ai_score", encode_cursor(["ai_score", 50, "1"])),
+    ("/api/v1/contacts/", encode_cursor(["-created_at", 12, 1])),
+    ("/api/v1/contacts/search?q=acme", encode_cursor(["acme", "best", 1])),
+    ("/api/v1/contacts/search?q=acme", encode_cursor(["acme", 0.5, "1"])),
+])
+async def test_cursor_with_wrong_types_answers_400(client, path, cursor):
+    response = await client.get(path, params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,142 @@
+"""
+Rate Limit Tests
+Sliding-window limits, Retry-After estimates and admission control
+"""
+import pytest
+
+from app.core.config import settings
+from app.core.rate_limit import (
+    AdmissionController,
+    RateLimitExceeded,
+    ServiceOverloadedError,
+    SlidingWindowLimiter,
+    hit_limits,
+    parse_rate,
+)
+
+
+def test_parse_rate():
+    assert parse_rate("10/minute") == (10, 60)
+    assert parse_rate("") is None
+    with pytest.raises(ValueError):
+        parse_rate("10/fortnight")
+    with pytest.raises(ValueError):
+        parse_rate("ten/minute")
+
+
+def test_allows_up_to_the_limit_then_rejects():
+    limiter = SlidingWindowLimiter("test", "3/minute")
+
+    decisions = [limiter._hit_local("client", 100, 1.0)[0] for _ in range(4)]
+
+    assert decisions == [True, True, True, False]
+    # Rejected requests are not counted
+    assert limiter._hit_local("client", 100, 1.0) == (False, 3, 0)
+
+
+def test_clients_are_limited_separately():
+    limiter = SlidingWindowLimiter("test", "1/minute")
+
+    assert limiter._hit_local("a", 100, 1.0)[0]
+    assert limiter._hit_local("b", 100, 1.0)[0]
+    assert not limiter._hit_local("a", 100, 1.0)[0]
+
+
+def test_previous_window_is_weighted_by_its_overlap():
+    limiter = SlidingWindowLimiter("test", "4/minute")
+    for _ in range(4):
+        limiter._hit_local("client", 100, 1.0)
+
+    # Three quarters into the next window, a quarter of the previous count remains
+    assert limiter._hit_local("client", 101, 0.25) == (True, 1, 4)
+    assert limiter._hit_local("client", 101, 0.25) == (True, 2, 4)
+    assert limiter._hit_local("client", 101, 0.25) == (True, 3, 4)
+    assert limiter._hit_local("client", 101, 0.25) == (False, 3, 4)
+
+
+def test_gap_of_several_windows_forgets_old_counts():
+    limiter = SlidingWindowLimiter("test", "2/minute")
+    limiter._hit_local("client", 100, 1.0)
+    limiter._hit_local("client", 100, 1.0)
+
+    assert limiter._hit_local("client", 105, 1.0) == (True, 1, 0)
+
+
+@pytest.mark.parametrize("current, previous, offset, expected", [
+    (10, 0, 30, 30),  # full window: wait for it to end
+    (5, 10, 0, 30),  # the previous window must decay to half
+    (20, 0, 0, 90),  # twice over the limit: the next window also starts full
+])
+def test_retry_after(current, previous, offset, expected):
+    limiter = SlidingWindowLimiter("test", "10/minute")
+    assert limiter._retry_after(current, previous, offset) == expected
+
+
+async def test_hit_raises_with_retry_after():
+    limiter = SlidingWindowLimiter("test", "2/minute")
+    await limiter.hit("1.2.3.4")
+    await limiter.hit("1.2.3.4")
+
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await limiter.hit("1.2.3.4")
+
+    assert exc_info.value.rule == "test"
+    assert 1 <= exc_info.value.retry_after <= 120
+    assert limiter.stats()["allowed"] == 2
+    assert limiter.stats()["rejected"] == 1
+
+
+async def test_empty_rate_never_limits():
+    limiter = SlidingWindowLimiter("test", "")
+    for _ in range(100):
+        await limiter.hit("client")
+    assert not limiter.enabled
+
+
+async def test_global_rejection_does_not_use_up_per_ip_quota(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    per_ip = SlidingWindowLimiter("ip", "2/day")
+    global_limit = SlidingWindowLimiter("global", "1/day")
+    await hit_limits(per_ip, global_limit, "1.2.3.4")
+
+    with pytest.raises(RateLimitExceeded) as exc_info:
+        await hit_limits(per_ip, global_limit, "1.2.3.4")
+    assert exc_info.value.rule == "global"
+
+    # Only the admitted request counts against the client
+    assert per_ip.stats()["allowed"] == 1
+    await per_ip.hit("1.2.3.4")
+    with pytest.raises(RateLimitExceeded):
+        await per_ip.hit("1.2.3.4")
+
+
+async def test_admission_sheds_at_full_pressure():
+    controller = AdmissionController(shed_start=0.8, sample_interval=60, retry_after=10)
+
+    async def saturated():
+        return 1.5
+
+    controller.add_signal("queue", saturated)
+
+    with pytest.raises(ServiceOverloadedError) as exc_info:
+        await controller.check()
+    assert exc_info.value.signal == "queue"
+    assert exc_info.value.retry_after == 10
+
+
+async def test_admission_admits_below_shed_start():
+    controller = AdmissionController(shed_start=0.8, sample_interval=60, retry_after=10)
+
+    async def idle():
+        return 0.1
+
+    async def unknown():
+        return None
+
+    controller.add_signal("queue", idle)
+    controller.add_signal("db_pool", unknown)
+
+    for _ in range(20):
+        await controller.check()
+    assert controller.stats()["admitted"] == 20
+    assert controller.pressure() == ("queue", 0.1)
@@ -0,0 +1,41 @@
+"""
+Redis Connection Tests
+Dropping the shared client after a failure
+"""
+import asyncio
+
+from app.core import redis as redis_module
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+async def test_failed_client_is_closed(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(redis_module, "_client", client)
+    monkeypatch.setattr(redis_module, "_retry_at", 0.0)
+
+    redis_module.mark_redis_unavailable(ConnectionError("connection reset"))
+    await asyncio.gather(*redis_module._closing)
+
+    assert redis_module._client is None
+    assert client.closed
+
+
+async def test_close_errors_are_ignored(monkeypatch):
+    class BrokenClient(FakeClient):
+        async def aclose(self):
+            raise ConnectionError("already gone")
+
+    monkeypatch.setattr(redis_module, "_client", BrokenClient())
+    monkeypatch.setattr(redis_module, "_retry_at", 0.0)
+
+    redis_module.mark_redis_unavailable(ConnectionError("connection reset"))
+    await asyncio.gather(*redis_module._closing)
+
+    assert redis_module._client is None
@@ -0,0 +1,144 @@
+"""
+Rescore Job Tests
+Bulk re-scoring with the fake backend, and resuming interrupted runs
+"""
+import pytest
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.models.contact import Contact
+from app.services.rescore_service import ContactInput, FakeScoringBackend, RescoreJob, get_checkpoint
+
+
+async def add_contacts(db, count: int) -> list[int]:
+    contacts = [
+        Contact(name=f"Lead {i}", email=f"lead{i}@example.com", message=f"Message {i}")
+        for i in range(count)
+    ]
+    db.add_all(contacts)
+    await db.commit()
+    return [contact.id for contact in contacts]
+
+
+async def scored_contacts() -> dict[int, Contact]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Contact).order_by(Contact.id))
+        return {contact.id: contact for contact in result.scalars()}
+
+
+async def interrupted(job: RescoreJob, error: str):
+    """Run a job expected to fail, returning its saved checkpoint"""
+    with pytest.raises(RuntimeError, match=error):
+        await job.run()
+    async with AsyncSessionLocal() as db:
+        return await get_checkpoint(db, job.name)
+
+
+class FlakyBackend(FakeScoringBackend):
+    """Fake scorer that fails on one call"""
+
+    def __init__(self, fail_on_call: int):
+        self.fail_on_call = fail_on_call
+        self.calls = 0
+        self.scored: list[int] = []
+
+    async def score_batch(self, contacts: list[ContactInput]) -> dict[int, dict]:
+        self.calls += 1
+        if self.calls == self.fail_on_call:
+            raise RuntimeError("scoring backend down")
+        self.scored.extend(contact.id for contact in contacts)
+        return await super().score_batch(contacts)
+
+
+class FakeSubmittingBackend(FakeScoringBackend):
+    """Fake batch scorer whose first collect fails, like a crash while polling"""
+
+    def __init__(self):
+        self.submitted: dict[str, list[ContactInput]] = {}
+        self.collects = 0
+
+    async def submit(self, contacts: list[ContactInput]) -> str:
+        batch_id = f"batch_{len(self.submitted) + 1}"
+        self.submitted[batch_id] = contacts
+        return batch_id
+
+    async def collect(self, submission_id: str) -> dict[int, dict]:
+        self.collects += 1
+        if self.collects == 1:
+            raise RuntimeError("interrupted while polling")
+        return await self.score_batch(self.submitted[submission_id])
+
+
+async def test_run_writes_every_score(db):
+    ids = await add_contacts(db, 5)
+    expected = await FakeScoringBackend().score_batch(
+        [ContactInput(id=i, name=f"Lead {n}", email=f"lead{n}@example.com", company=None, message=f"Message {n}")
+         for n, i in enumerate(ids)]
+    )
+
+    checkpoint = await RescoreJob("full", FakeScoringBackend(), chunk_size=2).run()
+
+    assert checkpoint.status == "completed"
+    assert checkpoint.last_contact_id == ids[-1]
+    assert checkpoint.processed == 5
+    assert checkpoint.failed == 0
+    contacts = await scored_contacts()
+    for contact_id in ids:
+        assert contacts[contact_id].ai_status == "scored"
+        assert contacts[contact_id].ai_score == expected[contact_id]["score"]
+        assert contacts[contact_id].ai_priority == expected[contact_id]["priority"]
+
+
+async def test_interrupted_run_resumes_after_last_chunk(db):
+    ids = await add_contacts(db, 5)
+
+    checkpoint = await interrupted(RescoreJob("resume", FlakyBackend(fail_on_call=2), chunk_size=2), "backend down")
+
+    assert checkpoint.status == "failed"
+    assert "scoring backend down" in checkpoint.last_error
+    assert checkpoint.last_contact_id == ids[1]
+    assert checkpoint.processed == 2
+    contacts = await scored_contacts()
+    assert [contacts[i].ai_status for i in ids] == ["scored", "scored", "pending", "pending", "pending"]
+
+    backend = FlakyBackend(fail_on_call=0)
+    checkpoint = await RescoreJob("resume", backend, chunk_size=2).run()
+
+    assert checkpoint.status == "completed"
+    assert backend.scored == ids[2:]
+    assert checkpoint.processed == 5
+    contacts = await scored_contacts()
+    assert all(contacts[i].ai_status == "scored" for i in ids)
+
+
+async def test_restart_starts_over(db):
+    ids = await add_contacts(db, 3)
+    await RescoreJob("restart", FakeScoringBackend(), chunk_size=2).run()
+
+    backend = FlakyBackend(fail_on_call=0)
+    checkpoint = await RescoreJob("restart", backend, chunk_size=2).run(restart=True)
+
+    assert backend.scored == ids
+    assert checkpoint.processed == 3
+
+
+async def test_resumed_run_collects_submitted_batch(db):
+    ids = await add_contacts(db, 3)
+    backend = FakeSubmittingBackend()
+
+    checkpoint = await interrupted(RescoreJob("batch", backend, chunk_size=2), "polling")
+
+    assert checkpoint.status == "failed"
+    assert checkpoint.pending_batch_id == "batch_1"
+    assert checkpoint.pending_until_id == ids[1]
+    assert checkpoint.last_contact_id == 0
+
+    checkpoint = await RescoreJob("batch", backend, chunk_size=2).run()
+
+    assert checkpoint.status == "completed"
+    # The first chunk was collected again, not submitted a second time
+    assert list(backend.submitted) == ["batch_1", "batch_2"]
+    assert [contact.id for contact in backend.submitted["batch_1"]] == ids[:2]
+    assert checkpoint.pending_batch_id is None
+    assert checkpoint.last_contact_id == ids[-1]
+    assert checkpoint.processed == 3
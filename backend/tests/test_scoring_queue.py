@@ -0,0 +1,219 @@
+"""
+Scoring Queue Tests
+Claiming, retrying and dead-lettering lead scoring jobs
+"""
+import pytest
+from sqlalchemy import delete, event, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine
+from app.models.contact import Contact
+from app.services import scoring_queue as scoring_queue_module
+from app.services.embedding_service import embed_texts, embedding_index
+from app.services.scoring_queue import ClaimedJob, InMemoryScoringQueue, ScoringWorkerPool
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "SCORING_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "SCORING_RETRY_BASE_DELAY", 0.0)
+
+
+@pytest.fixture
+def checked_out():
+    """Connections currently checked out of the engine's pool"""
+    count = [0]
+
+    def on_checkout(*args):
+        count[0] += 1
+
+    def on_checkin(*args):
+        count[0] -= 1
+
+    pool = engine.sync_engine.pool
+    event.listen(pool, "checkout", on_checkout)
+    event.listen(pool, "checkin", on_checkin)
+    yield count
+    event.remove(pool, "checkout", on_checkout)
+    event.remove(pool, "checkin", on_checkin)
+
+
+class StubAIService:
+    """Scores every lead the same, or fails with the service's fallback"""
+
+    def __init__(self, error: str = "", during_call=None):
+        self.error = error
+        self.during_call = during_call
+        self.calls = 0
+
+    async def score_lead(self, **kwargs) -> dict:
+        self.calls += 1
+        if self.during_call is not None:
+            await self.during_call()
+        score = {
+            "score": 70,
+            "priority": "high",
+            "insights": {"urgency": "high"},
+            "suggested_response": "Thanks!",
+        }
+        if self.error:
+            score.update(score=50, priority="medium", error=self.error)
+        return score
+
+
+async def add_contact(db) -> int:
+    contact = Contact(name="Ana", email="ana@example.com", message="Need a chatbot")
+    db.add(contact)
+    await db.commit()
+    return contact.id
+
+
+async def get_contact(contact_id: int) -> Contact:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(Contact).where(Contact.id == contact_id))).scalar_one()
+
+
+async def test_jobs_are_staged_until_published(db):
+    queue = InMemoryScoringQueue()
+
+    await queue.enqueue(db, [1, 2])
+    assert await queue.depth() == 0
+    assert await queue.claim(10) == []
+
+    queue.publish(db)
+    assert await queue.depth() == 2
+
+    jobs = await queue.claim(1)
+    assert [(job.contact_id, job.attempts) for job in jobs] == [(1, 1)]
+    assert await queue.depth() == 1
+
+
+async def test_retried_job_waits_for_its_delay():
+    queue = InMemoryScoringQueue()
+    queue._push(ClaimedJob(id=1, contact_id=7, attempts=0), delay=0)
+    [job] = await queue.claim()
+
+    await queue.retry(job, "boom", delay=60)
+    assert await queue.depth() == 1
+    assert await queue.claim() == []
+
+    queue._heap.clear()
+    await queue.retry(job, "boom", delay=0)
+    assert [(j.contact_id, j.attempts) for j in await queue.claim(5)] == [(7, 2)]
+
+
+async def test_scored_job_updates_contact(db, monkeypatch):
+    contact_id = await add_contact(db)
+    ai_service = StubAIService()
+    monkeypatch.setattr(scoring_queue_module, "get_ai_service", lambda: ai_service)
+    queue = InMemoryScoringQueue()
+    pool = ScoringWorkerPool(queue)
+
+    await queue.enqueue(db, [contact_id], force=True)
+    queue.publish(db)
+    [job] = await queue.claim()
+    await pool.process(job)
+
+    contact = await get_contact(contact_id)
+    assert (contact.ai_status, contact.ai_score, contact.ai_priority) == ("scored", 70, "high")
+    assert await queue.depth() == 0
+    assert queue.dead == []
+
+
+@pytest.mark.parametrize("force", [False, True])
+async def test_no_connection_is_held_while_the_model_scores(db, monkeypatch, checked_out, force):
+    contact_id = await add_contact(db)
+    await db.close()
+    held = []
+
+    async def record():
+        held.append(checked_out[0])
+
+    async def embed(texts):
+        held.append(checked_out[0])
+        return await embed_texts(texts)
+
+    monkeypatch.setattr(scoring_queue_module, "get_ai_service", lambda: StubAIService(during_call=record))
+    monkeypatch.setattr(scoring_queue_module, "embed_texts", embed)
+
+    await ScoringWorkerPool(InMemoryScoringQueue()).process(ClaimedJob(id=1, contact_id=contact_id, attempts=1, force=force))
+
+    # Embedding (unless forced), then the model call
+    assert held == ([0] if force else [0, 0])
+    assert (await get_contact(contact_id)).ai_status == "scored"
+
+
+async def test_contact_deleted_while_scoring_is_skipped(db, monkeypatch):
+    contact_id = await add_contact(db)
+
+    async def delete_contact():
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(Contact).where(Contact.id == contact_id))
+            await session.commit()
+
+    monkeypatch.setattr(scoring_queue_module, "get_ai_service", lambda: StubAIService(during_call=delete_contact))
+    queue = InMemoryScoringQueue()
+
+    await ScoringWorkerPool(queue).process(ClaimedJob(id=1, contact_id=contact_id, attempts=1, force=True))
+
+    assert queue.dead == []
+    assert await queue.depth() == 0
+
+
+async def test_duplicate_of_scored_lead_reuses_its_score(db, monkeypatch):
+    embedding_index.__init__()
+    original_id = await add_contact(db)
+    repeat_id = await add_contact(db)
+    ai_service = StubAIService()
+    monkeypatch.setattr(scoring_queue_module, "get_ai_service", lambda: ai_service)
+    pool = ScoringWorkerPool(InMemoryScoringQueue())
+
+    await pool.process(ClaimedJob(id=1, contact_id=original_id, attempts=1))
+    await pool.process(ClaimedJob(id=2, contact_id=repeat_id, attempts=1))
+
+    assert ai_service.calls == 1
+    repeat = await get_contact(repeat_id)
+    assert (repeat.duplicate_of_id, repeat.ai_status, repeat.ai_score) == (original_id, "scored", 70)
+    embedding_index.__init__()
+
+
+async def test_failing_job_is_retried_then_dead_lettered(db, monkeypatch):
+    contact_id = await add_contact(db)
+    ai_service = StubAIService(error="model overloaded")
+    monkeypatch.setattr(scoring_queue_module, "get_ai_service", lambda: ai_service)
+    queue = InMemoryScoringQueue()
+    pool = ScoringWorkerPool(queue)
+
+    await queue.enqueue(db, [contact_id], force=True)
+    queue.publish(db)
+    for attempt in range(1, settings.SCORING_MAX_ATTEMPTS + 1):
+        [job] = await queue.claim()
+        assert job.attempts == attempt
+        await pool.process(job)
+
+    assert ai_service.calls == settings.SCORING_MAX_ATTEMPTS
+    assert await queue.depth() == 0
+    assert [(job.contact_id, error) for job, error in queue.dead] == [(contact_id, "model overloaded")]
+    # The fallback score is kept, flagged as failed
+    contact = await get_contact(contact_id)
+    assert (contact.ai_status, contact.ai_score) == ("failed", 50)
+
+
+async def test_deleted_contact_completes_without_scoring(database, monkeypatch):
+    ai_service = StubAIService()
+    monkeypatch.setattr(scoring_queue_module, "get_ai_service", lambda: ai_service)
+    queue = InMemoryScoringQueue()
+
+    await ScoringWorkerPool(queue).process(ClaimedJob(id=1, contact_id=999, attempts=1))
+
+    assert ai_service.calls == 0
+    assert queue.dead == []
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(settings, "SCORING_RETRY_BASE_DELAY", 2.0)
+    monkeypatch.setattr(settings, "SCORING_RETRY_MAX_DELAY", 10.0)
+
+    assert 1.0 <= ScoringWorkerPool.backoff(1) <= 2.0
+    assert 4.0 <= ScoringWorkerPool.backoff(3) <= 8.0
+    assert 5.0 <= ScoringWorkerPool.backoff(10) <= 10.0
@@ -0,0 +1,65 @@
+"""
+Contact Search Tests
+Substring fallback search and the answer when the search schema is missing
+"""
+import httpx
+import pytest_asyncio
+
+from app.core.database import engine
+from app.core.security import Principal, get_current_principal
+from app.main import app
+from app.models.contact import Contact
+from app.services.contact_service import ContactService, SearchUnavailableError, ensure_search_schema
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    app.dependency_overrides[get_current_principal] = lambda: Principal(id=1, is_active=True, is_superuser=False)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+async def test_fallback_search_matches_every_word(db):
+    db.add_all([
+        Contact(name="Ana", email="ana@acme.com", company="Acme", message="Need a chatbot for support"),
+        Contact(name="Bea", email="bea@example.com", message="Chatbot pricing?"),
+    ])
+    await db.commit()
+
+    rows, next_cursor = await ContactService(db).search_contacts("acme chatbot")
+
+    assert [row.name for row in rows] == ["Ana"]
+    assert next_cursor is None
+
+
+async def test_schema_setup_skips_other_databases(database):
+    # Nothing to create on SQLite; must not fail startup
+    await ensure_search_schema(engine)
+
+
+async def test_missing_search_schema_answers_503(client, monkeypatch):
+    async def unavailable(self, *args, **kwargs):
+        raise SearchUnavailableError("Contact search is not set up; run migrate.py")
+
+    monkeypatch.setattr(ContactService, "search_contacts", unavailable)
+
+    response = await client.get("/api/v1/contacts/search", params={"q": "acme"})
+
+    assert response.status_code == 503
+    assert "migrate.py" in response.json()["detail"]
+
+
+async def test_snippet_escapes_the_submitted_message(db):
+    db.add(Contact(
+        name="Eve", email="eve@example.com",
+        message='<img src=x onerror="alert(1)"> chatbot & <script>steal()</script>',
+    ))
+    await db.commit()
+
+    [row], _ = await ContactService(db).search_contacts("chatbot")
+
+    assert "<" not in row.snippet and ">" not in row.snippet
+    assert row.snippet == (
+        "&lt;img src=x onerror=&quot;alert(1)&quot;&gt; chatbot &amp; &lt;script&gt;steal()&lt;/script&gt;"
+    )
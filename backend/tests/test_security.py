@@ -0,0 +1,138 @@
+"""
+Security Tests
+The bcrypt thread pool and its load shedding, and the verified token cache
+"""
+from datetime import timedelta
+from types import SimpleNamespace
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from jose import jwt
+from passlib.hash import bcrypt
+from sqlalchemy import select
+
+from app.core import cache as cache_module
+from app.core import security
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.security import (
+    PasswordHasher,
+    PasswordHasherBusyError,
+    create_access_token,
+    decode_token,
+    password_hasher,
+    verify_password,
+)
+from app.main import app
+from app.models.user import User
+
+
+@pytest_asyncio.fixture
+async def client(database):
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        yield client
+
+
+async def add_user(db, hashed_password: str) -> User:
+    user = User(email="ana@example.com", hashed_password=hashed_password, is_active=True)
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def login(client, password: str = "secret") -> httpx.Response:
+    return await client.post("/api/v1/auth/login", data={"username": "ana@example.com", "password": password})
+
+
+async def test_hasher_rejects_beyond_its_queue():
+    hasher = PasswordHasher(workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = [asyncio.create_task(hasher._run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(PasswordHasherBusyError):
+            await hasher._run(release.wait)
+
+        release.set()
+        await asyncio.gather(*running)
+    finally:
+        hasher.shutdown()
+
+    stats = hasher.stats()
+    assert (stats["completed"], stats["rejected"], stats["pending"]) == (2, 1, 0)
+
+
+async def test_login_answers_503_when_the_queue_is_full(client, db, monkeypatch):
+    await add_user(db, "not checked")
+    monkeypatch.setattr(password_hasher, "_pending", password_hasher.max_pending)
+
+    response = await login(client)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+async def test_login_rehashes_outdated_hashes(client, db):
+    user = await add_user(db, bcrypt.using(rounds=4).hash("secret"))
+    rehashed = password_hasher.rehashed
+
+    response = await login(client)
+
+    assert response.status_code == 200
+    assert password_hasher.rehashed == rehashed + 1
+    stored = (await db.execute(select(User.hashed_password).where(User.id == user.id))).scalar_one()
+    assert bcrypt.from_string(stored).rounds == settings.BCRYPT_ROUNDS
+    assert verify_password("secret", stored)
+
+    # A wrong password is not rehashed
+    assert (await login(client, "wrong")).status_code == 401
+    assert password_hasher.rehashed == rehashed + 1
+
+
+@pytest.fixture
+def token_clock(monkeypatch):
+    """Fresh token cache on a fake monotonic clock, counting signature checks"""
+    clock = SimpleNamespace(now=1000.0, decoded=0)
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: clock.now, time=time.time))
+    monkeypatch.setattr(security, "token_cache", LRUCache(100))
+
+    def counting_decode(*args, **kwargs):
+        clock.decoded += 1
+        return jwt.decode(*args, **kwargs)
+
+    monkeypatch.setattr(security, "jwt", SimpleNamespace(encode=jwt.encode, decode=counting_decode))
+    return clock
+
+
+def test_cached_token_expires_with_its_exp(token_clock):
+    token = create_access_token({"sub": "1"}, timedelta(seconds=60))
+    remaining = jwt.get_unverified_claims(token)["exp"] - time.time()
+
+    assert decode_token(token)["sub"] == "1"
+    token_clock.now += remaining - 1
+    assert decode_token(token)["sub"] == "1"
+    assert token_clock.decoded == 1
+
+    # Past exp the entry is gone and the token is verified again
+    token_clock.now += 2
+    decode_token(token)
+    assert token_clock.decoded == 2
+    assert security.token_cache.stats()["expirations"] == 1
+
+
+def test_invalid_and_expired_tokens_are_not_cached(token_clock):
+    expired = create_access_token({"sub": "1"}, timedelta(seconds=-1))
+    no_subject = create_access_token({}, timedelta(seconds=60))
+
+    for token in (expired, no_subject, "not a token"):
+        with pytest.raises(HTTPException) as exc_info:
+            decode_token(token)
+        assert exc_info.value.status_code == 401
+
+    assert len(security.token_cache) == 0